@@ -0,0 +1,96 @@
+"""Mesure de la construction et de la recherche de l'index approché (``nutriflow.fuzzy``).
+
+Usage ::
+
+    python benchmarks/bench_fuzzy.py [--size 100000] [--queries 5000] [--learned 1000]
+
+Construit un index de ``size`` termes aléatoires, y ajoute ``learned`` termes
+un par un (aliments appris du catalogue) puis cherche des variantes
+comportant une faute de frappe. Échoue (code 1) si la construction complète
+dépasse 20 s, si l'ajout d'un terme ou la recherche moyenne dépasse 1 ms.
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from nutriflow.fuzzy import FuzzyIndex  # noqa: E402
+
+# Temps moyen maximal d'une recherche (secondes)
+BUDGET = 0.001
+# Temps maximal d'une construction complète (démarrage ou refonte en
+# arrière-plan, jamais pendant une requête)
+BUILD_BUDGET = 20.0
+# Temps moyen maximal de l'ajout d'un terme appris (pendant une requête)
+ADD_BUDGET = 0.001
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word))
+    kind = rng.choice(("sub", "ins", "del"))
+    letter = rng.choice(string.ascii_lowercase)
+    if kind == "sub":
+        return word[:i] + letter + word[i + 1 :]
+    if kind == "ins":
+        return word[:i] + letter + word[i:]
+    return word[:i] + word[i + 1 :]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=5_000)
+    parser.add_argument("--learned", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    terms = set()
+    while len(terms) < args.size + args.learned:
+        terms.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12))))
+    terms = list(terms)
+    learned = terms[args.size :]
+
+    start = time.perf_counter()
+    index = FuzzyIndex(terms[: args.size])
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for term in learned:
+        index.add([term])
+    per_add = (time.perf_counter() - start) / max(len(learned), 1)
+
+    queries = [_typo(t, rng) for t in rng.sample(terms, args.queries)]
+    start = time.perf_counter()
+    found = sum(1 for q in queries if index.lookup(q))
+    per_query = (time.perf_counter() - start) / len(queries)
+
+    print(f"Index : {args.size} termes construits en {build:.2f} s")
+    print(f"Ajout : {len(learned)} termes appris, {per_add * 1e6:.1f} µs par terme")
+    print(
+        f"Recherche : {per_query * 1e6:.1f} µs en moyenne "
+        f"({found}/{len(queries)} corrigées)"
+    )
+    failed = False
+    if build > BUILD_BUDGET:
+        print(f"❌ Au-delà du budget de {BUILD_BUDGET:.0f} s par construction")
+        failed = True
+    if per_add > ADD_BUDGET:
+        print(f"❌ Au-delà du budget de {ADD_BUDGET * 1000:.0f} ms par ajout")
+        failed = True
+    if per_query > BUDGET:
+        print(f"❌ Au-delà du budget de {BUDGET * 1000:.0f} ms par recherche")
+        failed = True
+    if failed:
+        return 1
+    print("✅ Dans le budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
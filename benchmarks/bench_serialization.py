@@ -0,0 +1,145 @@
+"""Mesure du temps de sérialisation JSON et du gain de compression par endpoint.
+
+Usage ::
+
+    python benchmarks/bench_serialization.py [--repeat 200]
+
+Pour des réponses représentatives (détails produit avec une longue liste
+d'ingrédients, une année d'historique, une période calendrier, bilan du
+jour), compare l'encodeur JSON standard de FastAPI et ``FastJSONResponse``
+(orjson), puis affiche la taille brute et compressée (gzip) de chaque
+réponse.
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "bench")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from nutriflow.api import router  # noqa: E402
+from nutriflow.api.responses import FastJSONResponse, orjson  # noqa: E402
+
+
+def _product_details() -> dict:
+    ingredients = [
+        {
+            "id": f"en:ingredient-{i}",
+            "text": f"ingrédient numéro {i}",
+            "percent_estimate": 100 / (i + 1),
+            "percent_min": 0,
+            "percent_max": 100 / (i + 1),
+            "vegan": "maybe",
+            "vegetarian": "yes",
+            "rank": i + 1,
+        }
+        for i in range(250)
+    ]
+    return {
+        "barcode": "3274080005003",
+        "name": "Produit de test",
+        "brand": "Marque",
+        "categories": ", ".join(f"catégorie {i}" for i in range(30)),
+        "energy_kcal_per_100g": 412.0,
+        "ingredients_text_fr": ", ".join(i["text"] for i in ingredients),
+        "ingredients_list": ingredients,
+        "labels_tags": "en:organic, en:fair-trade",
+        "additives_tags": "en:e330, en:e322",
+    }
+
+
+def _history() -> list:
+    today = date.today()
+    return [
+        router.DailySummary(
+            date=(today - timedelta(days=i)).isoformat(),
+            calories_consumed=1800.0 + i % 300,
+            calories_burned=250.0,
+            tdee=2100.0,
+            calorie_balance=-50.0 + i % 100,
+            goal_feedback="Balance parfaite pour maintenir votre poids",
+        )
+        for i in range(366)
+    ]
+
+
+def _range() -> router.DailySummaryRange:
+    start = date.today() - timedelta(days=30)
+    dates = [(start + timedelta(days=i)).isoformat() for i in range(31)]
+    return router.DailySummaryRange(
+        start=dates[0],
+        end=dates[-1],
+        dates=dates,
+        columns={c: [1800.5] * len(dates) for c in router.RANGE_COLUMNS},
+        has_data="/////w==",
+    )
+
+
+def _daily_summary() -> router.DailyNutritionSummary:
+    return router.DailyNutritionSummary(
+        calories_consumed=1650,
+        proteins_consumed=95,
+        carbs_consumed=180,
+        fats_consumed=60,
+        calories_goal=2100,
+        proteins_goal=112,
+        carbs_goal=260,
+        fats_goal=58,
+        calories_burned=300,
+        bmr=1650,
+        tdee=2100,
+        calorie_balance=-150,
+        goal_feedback="Léger déficit - surveillez votre énergie et hydratation",
+    )
+
+
+PAYLOADS = {
+    "GET /api/products/{barcode}/details": _product_details,
+    "GET /api/history?limit=366": _history,
+    "GET /api/daily-summary/range": _range,
+    "GET /api/daily-summary": _daily_summary,
+}
+
+
+def _time(render, content, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        render(content)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    standard = JSONResponse(None).render
+    fast = FastJSONResponse(None).render
+    print(f"orjson : {'oui' if orjson is not None else 'non (encodeur standard)'}")
+    print(
+        f"{'Endpoint':40} {'json (µs)':>10} {'orjson (µs)':>12} "
+        f"{'octets':>9} {'gzip':>8}"
+    )
+    for name, build in PAYLOADS.items():
+        content = jsonable_encoder(build())
+        body = fast(content)
+        print(
+            f"{name:40} {_time(standard, content, args.repeat) * 1e6:10.1f} "
+            f"{_time(fast, content, args.repeat) * 1e6:12.1f} "
+            f"{len(body):9d} {len(gzip.compress(body)):8d}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,33 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
-from nutriflow.api.router import router as nutriflow_router
+from nutriflow.api.router import router as nutriflow_router, precompute_static_responses
+from nutriflow.api.responses import FastJSONResponse
+from nutriflow import concurrency, services
 
 # Charge .env
 load_dotenv()
 
+# Taille minimale (octets) d'une réponse compressée
+COMPRESS_MIN_SIZE = int(os.getenv("NUTRIFLOW_COMPRESS_MIN_SIZE", "1000"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Lexique FR→EN chargé au démarrage plutôt qu'à la première requête
+    services.warm_up()
+    # Corps JSON de /api/sports et /api/units sérialisés une fois pour toutes
+    precompute_static_responses()
+    # Rechargement à chaud du lexique quand le CSV change
+    services.start_lexicon_watcher()
+    yield
+    services.stop_lexicon_watcher()
+    concurrency.shutdown()
+
+
 app = FastAPI(
     title="NutriFlow API",
     description="""
@@ -39,6 +60,8 @@ Voir chaque endpoint pour le détail des paramètres et exemples.
 > NutriFlow est pensé pour un usage progressif et personnalisé, adapté à tous les objectifs nutritionnels.
 """,
     version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # CORS (origines autorisées configurables)
@@ -55,6 +78,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression des réponses : brotli si ``brotli-asgi`` est installé (gzip
+# reste servi aux clients qui ne l'acceptent pas), sinon gzip
+try:
+    from brotli_asgi import BrotliMiddleware
+
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+
 # Monte le router sous /api
 app.include_router(nutriflow_router, prefix="/api", tags=["NutriFlow"])
 
@@ -0,0 +1,26 @@
+"""Classe de réponse JSON par défaut de l'API.
+
+La sérialisation passe par ``orjson`` quand il est installé (plusieurs fois
+plus rapide que le module ``json`` sur les grosses réponses : détails produit
+avec la liste d'ingrédients, historique), sinon par l'encodeur standard.
+"""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(
+            content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
@@ -1,14 +1,31 @@
-from typing import List, Dict, Optional
-from datetime import date
-from fastapi import APIRouter, HTTPException, Query
+import os
+import re
+import json
+import asyncio
+import time
+import base64
+import hashlib
+import secrets
+from typing import Annotated, Any, List, Dict, Optional
+from datetime import date, datetime, timedelta
+import httpx
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from nutriflow.db.supabase import (
     insert_activity,
     get_meal,
 )
 import nutriflow.db.supabase as db
+from nutriflow.db import product_index, food_catalog
+from nutriflow.api.responses import FastJSONResponse
+from nutriflow.concurrency import bounded_map, gather, server_timing, MAX_CONCURRENCY
+from nutriflow import autocomplete, caching, events
+from nutriflow.quantities import parse_ingredients
 from nutriflow.services import (
     analyze_ingredients_nutritionix,
+    analyze_ingredients_batch,
     get_off_search_nutrition,
     get_off_nutrition_by_barcode,
     analyze_exercise_nutritionix,
@@ -20,9 +37,24 @@ from nutriflow.services import (
     calculate_macro_goals,
     SPORTS_MAPPING,
     get_unit_variants,
+    normalize_unit,
     normalize_units_text,
+    clean_text,
+    nutrient_densities,
+    scale_nutrients,
+    resolve_food_from_catalog,
+    get_lexicon,
+    reload_mapping,
+    on_lexicon_reload,
+    translation_cache_stats,
+    DEFAULT_LOCALE,
+    get_locale_lexicon,
+    lexicon_packs_info,
     add_meal_item,
+    summary_topic,
     update_daily_summary,
+    defer_daily_summaries,
+    flush_daily_summaries,
 )
 
 # ID utilisateur générique pour les tests/démo (doit être un UUID valide)
@@ -67,14 +99,9 @@ def compute_goals(user: Dict, tdee: float) -> Dict[str, float]:
     }
 
 
-def _analyze_item(name: str, qty: float, unit: str) -> Dict[str, float]:
-    """Analyse un ingrédient via Nutritionix et retourne les infos utiles."""
-    query = normalize_units_text(f"{qty} {unit} {name}")
-    foods = analyze_ingredients_nutritionix(query)
-    if not foods:
-        raise HTTPException(status_code=400, detail="Analyse Nutritionix vide")
-    food = foods[0]
-    return {
+def _food_values(food: Dict, qty: float) -> Dict[str, float]:
+    """Valeurs d'une ligne de repas à partir d'un aliment Nutritionix."""
+    values = {
         "nom_aliment": food.get("food_name"),
         "quantite": food.get("serving_weight_grams", qty),
         "unite": "g",
@@ -83,6 +110,155 @@ def _analyze_item(name: str, qty: float, unit: str) -> Dict[str, float]:
         "glucides_g": food.get("nf_total_carbohydrate", 0),
         "lipides_g": food.get("nf_total_fat", 0),
     }
+    values.update(nutrient_densities(values, food.get("serving_weight_grams")))
+    return values
+
+
+def _item_query(name: str, qty: float, unit: str) -> str:
+    return normalize_units_text(f"{qty} {unit} {name}")
+
+
+def _analyze_item(name: str, qty: float, unit: str) -> Dict[str, float]:
+    """Analyse un ingrédient et retourne les infos utiles.
+
+    L'aliment est d'abord cherché dans le catalogue local ; Nutritionix n'est
+    appelé que s'il est inconnu, et sa réponse enrichit alors le catalogue.
+    """
+    food = resolve_food_from_catalog(name, qty, unit)
+    if food is None:
+        return _analyze_item_remote(name, qty, unit)
+    return _food_values(food, qty)
+
+
+def _analyze_item_remote(name: str, qty: float, unit: str) -> Dict[str, float]:
+    """Analyse un ingrédient absent du catalogue via Nutritionix."""
+    foods = analyze_ingredients_nutritionix(_item_query(name, qty, unit))
+    if not foods:
+        raise HTTPException(status_code=400, detail="Analyse Nutritionix vide")
+    food = foods[0]
+    if len(foods) == 1:
+        food_catalog.learn(food, aliases=[name])
+    return _food_values(food, qty)
+
+
+def _analyze_items(items: List[tuple]) -> List[Dict[str, float]]:
+    """Analyse plusieurs ingrédients ``(nom, quantité, unité)`` d'un coup.
+
+    Les aliments connus du catalogue sont résolus localement ; les autres
+    partent ensemble dans une seule requête Nutritionix. Un ingrédient que la
+    réponse groupée ne permet pas d'identifier est analysé individuellement.
+    """
+    results: List[Optional[Dict[str, float]]] = [None] * len(items)
+    pending = []
+    for i, (name, qty, unit) in enumerate(items):
+        food = resolve_food_from_catalog(name, qty, unit)
+        if food is not None:
+            results[i] = _food_values(food, qty)
+        else:
+            pending.append(i)
+    if len(pending) > 1:
+        queries = [_item_query(*items[i]) for i in pending]
+        for i, food in zip(pending, analyze_ingredients_batch(queries)):
+            if food is not None:
+                name, qty, _ = items[i]
+                food_catalog.learn(food, aliases=[name])
+                results[i] = _food_values(food, qty)
+    for i in pending:
+        if results[i] is None:
+            # Déjà cherché dans le catalogue : pas de seconde recherche
+            results[i] = _analyze_item_remote(*items[i])
+    return results
+
+
+def _locale_kwargs(locale: Optional[str]) -> Dict[str, str]:
+    """Paramètre ``locale`` à transmettre aux analyses (omis pour le français)."""
+    return {} if not locale or locale == DEFAULT_LOCALE else {"locale": locale}
+
+
+def _resolve_ingredients_locally(text: str) -> Optional[List[Dict]]:
+    """Résout une saisie libre entièrement depuis le catalogue local.
+
+    Retourne ``None`` dès qu'un ingrédient est inconnu du catalogue ou que sa
+    quantité n'est pas convertible en grammes : la saisie complète est alors
+    confiée à Nutritionix.
+    """
+    foods = []
+    for item in parse_ingredients(text):
+        if item.quantity is None:
+            return None
+        food = resolve_food_from_catalog(item.food, item.quantity, item.unit or "piece")
+        if food is None:
+            return None
+        foods.append(food)
+    return foods or None
+
+
+def _rescale_item(existing: Optional[Dict], item: "MealItemUpdate") -> Optional[Dict]:
+    """Recalcule localement un aliment dont seule la quantité (en g) change.
+
+    Utilise les valeurs pour 100 g stockées sur la ligne ; retourne ``None``
+    si le nom change, si l'unité n'est pas le gramme ou si les densités
+    manquent, auquel cas une nouvelle analyse Nutritionix est nécessaire.
+    """
+    if not existing or item.quantite is None:
+        return None
+    if item.nom_aliment is not None and clean_text(item.nom_aliment).lower().strip() != (
+        clean_text(existing.get("nom_aliment") or "").lower().strip()
+    ):
+        return None
+    if normalize_unit(item.unite or existing.get("unite") or "") != "g":
+        return None
+    scaled = scale_nutrients(existing, item.quantite)
+    if scaled is None:
+        return None
+    return {"quantite": item.quantite, "unite": "g", **scaled}
+
+
+def _data_etag(
+    resource: str, user_id: str, day: Optional[str] = None, *params: object
+) -> str:
+    """ETag de la ressource ``resource`` pour un utilisateur (et un jour si
+    ``day`` est donné).
+
+    Combine le ``last_updated`` du bilan en base et les compteurs de
+    modifications locaux ; ``params`` distingue les variantes d'une requête.
+    """
+    try:
+        stamp = db.get_summary_last_updated(user_id, day)
+    except Exception:
+        stamp = None
+    return caching.weak_etag(
+        resource, user_id, day, stamp, *caching.version(user_id, day), *params
+    )
+
+
+def _resolve_product(barcode: str) -> Optional[Dict]:
+    """Cherche un produit dans l'index local puis, à défaut, sur OpenFoodFacts.
+
+    Un produit trouvé en ligne est ajouté à l'index pour les lectures et
+    recherches suivantes.
+    """
+    prod = product_index.get_product(barcode)
+    if prod:
+        return prod
+    prod = get_off_nutrition_by_barcode(barcode)
+    if prod:
+        product_index.remember_product(prod)
+    return prod
+
+
+def _product_summary(prod: Dict) -> "ProductSummary":
+    return ProductSummary(
+        barcode=prod.get("barcode") or "",
+        name=prod.get("name") or "",
+        image_url=prod.get("image_url"),
+        brand=prod.get("brand"),
+        energy_kcal_per_100g=prod.get("energy_kcal_per_100g"),
+        proteins_per_100g=prod.get("proteins_per_100g"),
+        carbs_per_100g=prod.get("carbs_per_100g"),
+        fat_per_100g=prod.get("fat_per_100g"),
+        nutriscore=prod.get("nutriscore_grade"),
+    )
 
 
 # ----- Services Query Models -----
@@ -97,6 +273,9 @@ class IngredientQuery(BaseModel):
     date_str: Optional[str] = Field(
         None, description="Date YYYY-MM-DD pour enregistrer le repas"
     )
+    locale: str = Field(
+        DEFAULT_LOCALE, description="Langue de la description (fr, es, it...)"
+    )
 
 
 class BarcodeQuery(BaseModel):
@@ -129,6 +308,17 @@ class BarcodeQueryUserInput(BaseModel):
     )
 
 
+class BarcodeBatchQuery(BaseModel):
+    """Liste de codes-barres à résoudre en un seul appel."""
+
+    barcodes: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=200,
+        description="Codes-barres des produits (au moins 8 chiffres chacun)",
+    )
+
+
 class ExerciseQuery(BaseModel):
     query: str = Field(
         ..., min_length=1, description="Description de l'activité sportive en français"
@@ -141,6 +331,9 @@ class ExerciseQuery(BaseModel):
         pattern=r"^(male|female)$",
         description="Genre de l'utilisateur ('male' ou 'female')",
     )
+    locale: str = Field(
+        DEFAULT_LOCALE, description="Langue de la description (fr, es, it...)"
+    )
 
 
 class BMRQuery(BaseModel):
@@ -261,6 +454,21 @@ class OFFProduct(BaseModel):
     salt_per_100g: Optional[float]
 
 
+class BarcodeBatchResult(BaseModel):
+    barcode: str
+    status: str = Field(
+        ..., description="cached, fetched, not_found, invalid ou error"
+    )
+    product: Optional[Dict] = None
+    error: Optional[str] = None
+
+
+class FoodNameSuggestion(BaseModel):
+    name: str = Field(..., description="Nom de l'aliment tel que saisi")
+    en: Optional[str] = Field(None, description="Traduction anglaise connue")
+    count: int = Field(..., description="Fréquence (historique, lexique, produits)")
+
+
 class ExerciseResult(BaseModel):
     name: str = Field(..., description="Nom de l'exercice")
     duration_min: float = Field(..., description="Durée en minutes")
@@ -349,15 +557,38 @@ class GoalsResponse(BaseModel):
     objectif: str
 
 
+class DailySummaryRange(BaseModel):
+    """Bilans d'une période au format colonnes : ``columns[c][i]`` est la
+    valeur de la colonne ``c`` le jour ``dates[i]`` (``None`` sans bilan)."""
+
+    start: str
+    end: str
+    dates: List[str]
+    columns: Dict[str, List[Optional[object]]]
+    has_data: str = Field(
+        ...,
+        description="Bitmap base64 des jours ayant un repas ou une activité "
+        "(bit i = jour i, bit de poids faible en premier)",
+    )
+
+
 # ----- Endpoints -----
 @router.post("/ingredients", response_model=NutritionixResponse)
 def ingredients(data: IngredientQuery):
     """
     Analyse une description d'ingrédients et renvoie la liste des aliments et totaux.
     """
+    # Langue inconnue : 400 avant toute analyse
+    get_locale_lexicon(data.locale)
     try:
-        normalized = normalize_units_text(data.query)
-        foods_raw = analyze_ingredients_nutritionix(normalized)
+        foods_raw = None
+        if data.locale == DEFAULT_LOCALE:
+            foods_raw = _resolve_ingredients_locally(data.query)
+        if foods_raw is None:
+            normalized = normalize_units_text(data.query, data.locale)
+            foods_raw = analyze_ingredients_nutritionix(
+                normalized, **_locale_kwargs(data.locale)
+            )
         df = convert_nutritionix_to_df(foods_raw)
         totals_dict = calculate_totals(df)
         foods = [
@@ -408,7 +639,7 @@ def barcode(data: BarcodeQueryUserInput):
     Ajoute ou met à jour automatiquement ce produit dans la table products
     pour alimenter la fiche détaillée.
     """
-    prod = get_off_nutrition_by_barcode(data.barcode)
+    prod = _resolve_product(data.barcode)
     if not prod:
         raise HTTPException(status_code=404, detail="Produit non trouvé")
 
@@ -436,6 +667,10 @@ def barcode(data: BarcodeQueryUserInput):
             "proteines_g": _mul(prod.get("proteins_per_100g")),
             "glucides_g": _mul(prod.get("carbs_per_100g")),
             "lipides_g": _mul(prod.get("fat_per_100g")),
+            "calories_100g": prod.get("energy_kcal_per_100g"),
+            "proteines_100g": prod.get("proteins_per_100g"),
+            "glucides_100g": prod.get("carbs_per_100g"),
+            "lipides_100g": prod.get("fat_per_100g"),
             "barcode": data.barcode,
             "source": "openfoodfacts",
         },
@@ -453,6 +688,48 @@ def barcode(data: BarcodeQueryUserInput):
     )
 
 
+@router.post("/barcode/batch", response_model=List[BarcodeBatchResult])
+def barcode_batch(data: BarcodeBatchQuery):
+    """
+    Résout plusieurs codes-barres en un aller-retour.
+    Les produits déjà présents dans la table products sont servis localement,
+    les autres sont résolus en parallèle (index local puis OpenFoodFacts,
+    concurrence bornée) et enregistrés en un seul upsert groupé.
+    """
+    barcodes = list(dict.fromkeys(data.barcodes))
+    valid = [b for b in barcodes if re.fullmatch(r"\d{8,}", b)]
+
+    cached = {p["barcode"]: p for p in db.get_products(valid)}
+    misses = [b for b in valid if b not in cached]
+    fetched = bounded_map(_resolve_product, misses, MAX_CONCURRENCY)
+
+    new_rows = [p for p in fetched.values() if isinstance(p, dict)]
+    if new_rows:
+        db.upsert_products(new_rows)
+
+    results = []
+    for code in barcodes:
+        if code in cached:
+            results.append(
+                BarcodeBatchResult(barcode=code, status="cached", product=cached[code])
+            )
+        elif code not in fetched:
+            results.append(BarcodeBatchResult(barcode=code, status="invalid"))
+        elif isinstance(fetched[code], Exception):
+            results.append(
+                BarcodeBatchResult(
+                    barcode=code, status="error", error=str(fetched[code])
+                )
+            )
+        elif fetched[code]:
+            results.append(
+                BarcodeBatchResult(barcode=code, status="fetched", product=fetched[code])
+            )
+        else:
+            results.append(BarcodeBatchResult(barcode=code, status="not_found"))
+    return results
+
+
 @router.get("/products/{barcode}/details")
 def product_details(barcode: str):
     """Retourne toutes les infos enrichies depuis Supabase."""
@@ -467,9 +744,10 @@ def search(
     query: str = Query(..., min_length=1, description="Terme de recherche produit"),
 ):
     """
-    Recherche un produit sur OpenFoodFacts par terme.
+    Recherche un produit par terme : index local en priorité, puis OpenFoodFacts.
     """
-    prod = get_off_search_nutrition(query)
+    local = product_index.search_products(query, limit=1)
+    prod = local[0] if local else get_off_search_nutrition(query)
     if not prod:
         raise HTTPException(status_code=404, detail="Produit non trouvé")
     return OFFProduct(
@@ -484,16 +762,129 @@ def search(
     )
 
 
+@router.get("/search/products", response_model=List[ProductSummary])
+def search_products(
+    query: str = Query(..., min_length=1, description="Terme de recherche produit"),
+    page: int = Query(1, ge=1, description="Numéro de page"),
+    page_size: int = Query(20, ge=1, le=100, description="Résultats par page"),
+):
+    """
+    Recherche plein texte paginée dans l'index produits local (préfixes,
+    sans accents, classement par pertinence). Si l'index ne renvoie rien,
+    la première page retombe sur la recherche OpenFoodFacts.
+    """
+    results = product_index.search_products(
+        query, limit=page_size, offset=(page - 1) * page_size
+    )
+    if not results and page == 1:
+        prod = get_off_search_nutrition(query)
+        results = [prod] if prod else []
+    return [_product_summary(p) for p in results]
+
+
+@router.get("/foods/autocomplete", response_model=List[FoodNameSuggestion])
+def autocomplete_foods(
+    q: str = Query(..., min_length=1, description="Début du nom de l'aliment"),
+    limit: int = Query(10, ge=1, le=50, description="Nombre de suggestions"),
+    user_id: str = TEST_USER_ID,
+):
+    """
+    Suggère des noms d'aliments connus (historique de l'utilisateur, lexique
+    FR→EN, produits indexés) classés par fréquence.
+    """
+    index = autocomplete.get_autocomplete(user_id)
+    return [FoodNameSuggestion(**s) for s in index.suggest(q, limit)]
+
+
+@router.get("/metrics")
+def get_metrics():
+    """Indicateurs internes des caches locaux (catalogue d'aliments, lexique...)."""
+    return {
+        "food_catalog": food_catalog.stats(),
+        "lexicon": get_lexicon().info(),
+        "translation_cache": translation_cache_stats(),
+        "lexicon_packs": lexicon_packs_info(),
+        "events": events.stats(),
+    }
+
+
+@router.post("/admin/lexicon/reload")
+def reload_lexicon(x_admin_token: Optional[str] = Header(None)):
+    """Recharge le lexique FR→EN depuis son CSV sans redémarrer le worker.
+
+    L'en-tête ``X-Admin-Token`` doit reprendre ``NUTRIFLOW_ADMIN_TOKEN`` ;
+    sans jeton configuré, l'endpoint est désactivé (403).
+    """
+    expected = os.getenv("NUTRIFLOW_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(
+            status_code=403, detail="Administration désactivée (NUTRIFLOW_ADMIN_TOKEN)"
+        )
+    if not secrets.compare_digest(
+        (x_admin_token or "").encode("utf-8"), expected.encode("utf-8")
+    ):
+        raise HTTPException(status_code=403, detail="Jeton d'administration invalide")
+    try:
+        lex = reload_mapping()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rechargement impossible : {e}")
+    return lex.info()
+
+
+# Listes de référence : ne changent qu'au rechargement du lexique
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+
+# Réponses précalculées : nom -> (version, corps JSON, ETag)
+_STATIC_RESPONSES: Dict[str, tuple] = {}
+_SPORTS_VERSION = hashlib.sha1(
+    "\n".join(SPORTS_MAPPING).encode("utf-8")
+).hexdigest()[:12]
+
+
+def _static_body(name: str, version: str, build) -> tuple:
+    """Corps JSON et ETag de la réponse ``name``, sérialisés une seule fois
+    par ``version`` (celle du lexique pour les unités)."""
+    cached = _STATIC_RESPONSES.get(name)
+    if cached is None or cached[0] != version:
+        body = FastJSONResponse(build()).body
+        cached = (version, body, f'"{name}-{version}"')
+        _STATIC_RESPONSES[name] = cached
+    return cached[1], cached[2]
+
+
+def _static_response(request: Request, name: str, version: str, build) -> Response:
+    body, etag = _static_body(name, version, build)
+    headers = {"ETag": etag, "Cache-Control": STATIC_CACHE_CONTROL}
+    if caching.matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def precompute_static_responses() -> None:
+    """Sérialise d'avance les listes de référence (démarrage, rechargement)."""
+    _static_body("sports", _SPORTS_VERSION, lambda: list(SPORTS_MAPPING))
+    _static_body("units", get_lexicon().version, get_unit_variants)
+
+
+on_lexicon_reload(lambda lex: precompute_static_responses())
+
+
 @router.get("/sports", response_model=List[str])
-def get_supported_sports() -> List[str]:
+def get_supported_sports(request: Request) -> List[str]:
     """Retourne la liste des activités sportives reconnues."""
-    return list(SPORTS_MAPPING.keys())
+    return _static_response(
+        request, "sports", _SPORTS_VERSION, lambda: list(SPORTS_MAPPING)
+    )
 
 
 @router.get("/units", response_model=Dict[str, str])
-def get_units() -> Dict[str, str]:
-    """Retourne le mapping des unités françaises vers l'anglais."""
-    return get_unit_variants()
+def get_units(request: Request) -> Dict[str, str]:
+    """Retourne le mapping des unités françaises vers l'anglais.
+
+    Le corps est précalculé pour chaque version du lexique : un rechargement
+    du mapping change l'ETag et la réponse.
+    """
+    return _static_response(request, "units", get_lexicon().version, get_unit_variants)
 
 
 @router.post("/exercise", response_model=List[ExerciseResult])
@@ -508,6 +899,7 @@ def exercise(data: ExerciseQuery, preview: bool = False):
             height_cm=data.height_cm,
             age=data.age,
             gender=data.gender,
+            **_locale_kwargs(data.locale),
         )
 
         if not preview:
@@ -576,34 +968,51 @@ def tdee(data: TDEEQuery):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/user/goals", response_model=GoalsResponse)
-def get_goals():
-    """Retourne les objectifs personnalisés calories et macros de l'utilisateur."""
-    user_id = TEST_USER_ID
-    user = db.get_user(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Utilisateur introuvable")
-
-    today = date.today().isoformat()
-    activities = db.get_activities(user_id, today)
-    calories_brulees = (
-        sum(a.get("calories_brulees", 0) for a in activities) if activities else 0.0
-    )
-
-    tdee_base = calculer_tdee(
+def _user_tdee_base(user: Dict) -> float:
+    """TDEE de base (avant ajustement à l'objectif) d'un profil."""
+    return calculer_tdee(
         user["poids_kg"],
         user["taille_cm"],
         user["age"],
         user["sexe"],
         user.get("activity_factor", 1.2),
     )
+
+
+def _calories_burned(activities: Optional[List[Dict]]) -> float:
+    return sum(a.get("calories_brulees", 0) for a in activities) if activities else 0.0
+
+
+def _build_goals(
+    user: Dict, activities: Optional[List[Dict]], tdee_base: Optional[float] = None
+) -> "GoalsResponse":
+    """Objectifs du jour à partir du profil et des activités déjà chargés."""
+    if tdee_base is None:
+        tdee_base = _user_tdee_base(user)
     tdee_user = ajuster_tdee(
         tdee_base, user.get("goal") or user.get("objectif", "maintien")
     )
-    tdee = tdee_user + calories_brulees
-
+    tdee = tdee_user + _calories_burned(activities)
     goals = compute_goals(user, tdee)
     objectif = (user.get("goal") or user.get("objectif") or "maintien").lower()
+    return GoalsResponse(**goals, tdee=tdee, objectif=objectif)
+
+
+@router.get("/user/goals", response_model=GoalsResponse)
+def get_goals(request: Request, response: Response):
+    """Retourne les objectifs personnalisés calories et macros de l'utilisateur."""
+    user_id = TEST_USER_ID
+    today = date.today().isoformat()
+    etag = _data_etag("goals", user_id, today)
+    not_modified = caching.conditional(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+
+    user = db.get_user(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Utilisateur introuvable")
+
+    goals = _build_goals(user, db.get_activities(user_id, today))
 
     # Optionnel : historiser dans daily_summary si les colonnes existent
     try:
@@ -615,34 +1024,33 @@ def get_goals():
             {
                 "user_id": user_id,
                 "date": today,
-                "target_calories": goals["target_kcal"],
-                "target_proteins_g": goals["prot_g"],
-                "target_fats_g": goals["fat_g"],
-                "target_carbs_g": goals["carbs_g"],
+                "target_calories": goals.target_kcal,
+                "target_proteins_g": goals.prot_g,
+                "target_fats_g": goals.fat_g,
+                "target_carbs_g": goals.carbs_g,
             },
             on_conflict=["user_id", "date"],
         ).execute()
     except Exception:
         pass
 
-    return GoalsResponse(**goals, tdee=tdee, objectif=objectif)
+    return goals
 
 
-@router.get("/daily-summary", response_model=DailyNutritionSummary)
-def daily_summary(
-    date_str: str = Query(default=None, description="Date au format YYYY-MM-DD"),
-):
-    """Retourne l'apport actuel et les objectifs calories/macros pour la date donnée."""
-    user_id = TEST_USER_ID
-    d = date_str if date_str else str(date.today())
-
-    totals = db.get_daily_nutrition(user_id, d) or {}
+def _build_daily_summary(
+    user: Optional[Dict],
+    totals: Optional[Dict],
+    calories_burned: float,
+    tdee_base: Optional[float] = None,
+) -> DailyNutritionSummary:
+    """Bilan du jour à partir des données déjà chargées (profil, totaux
+    nutritionnels, calories brûlées)."""
+    totals = totals or {}
     calories_cons = totals.get("total_calories") or 0
     prot_cons = totals.get("total_proteins_g") or 0
     carb_cons = totals.get("total_carbs_g") or 0
     fat_cons = totals.get("total_fats_g") or 0
 
-    user = db.get_user(user_id)
     if not user:
         return DailyNutritionSummary(
             calories_consumed=calories_cons,
@@ -664,13 +1072,8 @@ def daily_summary(
             user["age"],
             user["sexe"],
         )
-        tdee_base = calculer_tdee(
-            user["poids_kg"],
-            user["taille_cm"],
-            user["age"],
-            user["sexe"],
-            user.get("activity_factor", 1.2),
-        )
+        if tdee_base is None:
+            tdee_base = _user_tdee_base(user)
         tdee_val = ajuster_tdee(tdee_base, user.get("goal", "maintien"))
     except Exception:
         bmr = None
@@ -679,22 +1082,6 @@ def daily_summary(
     cal_goal = tdee_val
     macros_goal = calculate_macro_goals(user.get("poids_kg"), cal_goal)
 
-    # Récupérer les données d'activités pour calories_burned
-    try:
-        supabase = db.get_supabase_client()
-        activities = (
-            supabase.table("activities")
-            .select("calories_brulees")
-            .eq("user_id", user_id)
-            .eq("date", d)
-            .execute()
-        )
-        calories_burned = sum(
-            a.get("calories_brulees", 0) for a in (activities.data or [])
-        )
-    except Exception:
-        calories_burned = 0
-
     # Calculer calorie_balance
     calorie_balance = None
     if cal_goal and calories_cons is not None:
@@ -745,6 +1132,210 @@ def daily_summary(
     )
 
 
+def _fetch_calories_burned(user_id: str, d: str) -> float:
+    """Calories brûlées d'une journée (0 si les activités sont illisibles)."""
+    try:
+        supabase = db.get_supabase_client()
+        activities = (
+            supabase.table("activities")
+            .select("calories_brulees")
+            .eq("user_id", user_id)
+            .eq("date", d)
+            .execute()
+        )
+        return sum(a.get("calories_brulees", 0) for a in (activities.data or []))
+    except Exception:
+        return 0
+
+
+def _compute_daily_summary(
+    user_id: str, d: str, timings: Optional[Dict[str, float]] = None
+) -> DailyNutritionSummary:
+    """Lit en parallèle les totaux, le profil et les activités du jour puis
+    calcule le bilan ; ``timings`` reçoit la durée (ms) de chaque étape."""
+    if timings is None:
+        timings = {}
+    start = time.perf_counter()
+    fetched = gather(
+        {
+            "totals": lambda: db.get_daily_nutrition(user_id, d),
+            "user": lambda: db.get_user(user_id),
+            "activities": lambda: _fetch_calories_burned(user_id, d),
+        },
+        timings=timings,
+    )
+    for name in ("totals", "user"):
+        if isinstance(fetched[name], Exception):
+            raise fetched[name]
+    calories_burned = fetched["activities"]
+    if isinstance(calories_burned, Exception):
+        calories_burned = 0
+    timings["fetch"] = (time.perf_counter() - start) * 1000
+
+    build_start = time.perf_counter()
+    summary = _build_daily_summary(fetched["user"], fetched["totals"], calories_burned)
+    timings["build"] = (time.perf_counter() - build_start) * 1000
+    return summary
+
+
+@router.get("/daily-summary", response_model=DailyNutritionSummary)
+def daily_summary(
+    request: Request,
+    response: Response,
+    date_str: str = Query(default=None, description="Date au format YYYY-MM-DD"),
+):
+    """Retourne l'apport actuel et les objectifs calories/macros pour la date donnée.
+
+    Les totaux, le profil et les activités sont lus en parallèle : la latence
+    est celle de la lecture la plus lente. La durée de chaque étape est
+    exposée dans l'en-tête ``Server-Timing``. Un client qui renvoie l'ETag
+    reçu obtient 304 tant que les données du jour n'ont pas changé.
+    """
+    user_id = TEST_USER_ID
+    d = date_str if date_str else str(date.today())
+
+    start = time.perf_counter()
+    timings: Dict[str, float] = {}
+    etag = _data_etag("daily-summary", user_id, d)
+    not_modified = caching.conditional(request, response, etag)
+    timings["etag"] = (time.perf_counter() - start) * 1000
+    if not_modified is not None:
+        not_modified.headers["Server-Timing"] = server_timing(timings)
+        return not_modified
+    summary = _compute_daily_summary(user_id, d, timings)
+    timings["total"] = (time.perf_counter() - start) * 1000
+    response.headers["Server-Timing"] = server_timing(timings)
+    return summary
+
+
+# Intervalle (s) des commentaires « ping » qui maintiennent le flux SSE ouvert
+SSE_HEARTBEAT = float(os.getenv("NUTRIFLOW_SSE_HEARTBEAT", "15"))
+
+
+async def _summary_events(
+    user_id: str,
+    d: str,
+    sub: events.Subscription,
+    is_disconnected,
+    heartbeat: float = SSE_HEARTBEAT,
+):
+    """Flux SSE : le bilan courant, puis le nouveau bilan après chaque
+    recalcul notifié ; un ping entre deux notifications."""
+    seq = 0
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            seq += 1
+            try:
+                summary = await run_in_threadpool(_compute_daily_summary, user_id, d)
+                yield f"event: summary\nid: {seq}\ndata: {summary.model_dump_json()}\n\n"
+            except Exception as e:
+                print(f"❌ Flux du bilan {user_id}/{d} : {e}")
+                yield f"event: error\nid: {seq}\ndata: {json.dumps({'detail': str(e)})}\n\n"
+            while True:
+                try:
+                    await sub.get(heartbeat)
+                    # Plusieurs recalculs rapprochés : un seul envoi
+                    sub.drain()
+                    break
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield ": ping\n\n"
+    finally:
+        events.unsubscribe(sub)
+
+
+@router.get("/daily-summary/stream")
+async def daily_summary_stream(
+    request: Request,
+    date_str: Optional[str] = None,
+    user_id: str = TEST_USER_ID,
+):
+    """Flux Server-Sent Events du bilan d'un jour.
+
+    Envoie le bilan courant à la connexion, puis le bilan recalculé après
+    chaque modification des repas ou activités de ce jour (événement
+    ``summary``, même contenu que ``GET /daily-summary``).
+    """
+    d = date_str if date_str else str(date.today())
+    sub = events.subscribe(summary_topic(user_id, d))
+    return StreamingResponse(
+        _summary_events(user_id, d, sub, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Colonnes renvoyées par /daily-summary/range et durée maximale d'une période
+RANGE_COLUMNS = (
+    "calories_consumed",
+    "proteins_consumed",
+    "carbs_consumed",
+    "fats_consumed",
+    "calories_burned",
+    "tdee",
+    "calorie_balance",
+    "goal_feedback",
+)
+MAX_RANGE_DAYS = 366
+
+
+def _bitmap(flags: List[bool]) -> str:
+    """Encode une liste de booléens en bitmap base64 (bit de poids faible
+    en premier)."""
+    data = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            data[i // 8] |= 1 << (i % 8)
+    return base64.b64encode(bytes(data)).decode("ascii")
+
+
+@router.get("/daily-summary/range", response_model=DailySummaryRange)
+def daily_summary_range(
+    start: str = Query(..., description="Premier jour (YYYY-MM-DD)"),
+    end: str = Query(..., description="Dernier jour inclus (YYYY-MM-DD)"),
+    user_id: str = TEST_USER_ID,
+):
+    """Bilans de chaque jour de [start, end] en une seule requête.
+
+    Pensé pour les vues calendrier : la réponse est en colonnes, chaque jour
+    de la période y figure (valeurs ``None`` s'il n'a pas de bilan) et
+    ``has_data`` indique les jours ayant au moins un repas ou une activité
+    (un bilan recalculé après suppression de tout le contenu du jour n'en
+    fait pas partie).
+    """
+    try:
+        first = date.fromisoformat(start)
+        last = date.fromisoformat(end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Date invalide (YYYY-MM-DD)")
+    days = (last - first).days + 1
+    if days <= 0:
+        raise HTTPException(status_code=400, detail="La fin précède le début")
+    if days > MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400, detail=f"Période limitée à {MAX_RANGE_DAYS} jours"
+        )
+
+    rows = db.get_daily_summaries_range(
+        user_id,
+        first.isoformat(),
+        last.isoformat(),
+        ",".join(("date", "has_data") + RANGE_COLUMNS),
+    )
+    by_date = {str(r.get("date"))[:10]: r for r in rows}
+    dates = [(first + timedelta(days=i)).isoformat() for i in range(days)]
+    found = [by_date.get(d) for d in dates]
+    return DailySummaryRange(
+        start=dates[0],
+        end=dates[-1],
+        dates=dates,
+        columns={c: [r.get(c) if r else None for r in found] for c in RANGE_COLUMNS},
+        has_data=_bitmap([bool(r and r.get("has_data")) for r in found]),
+    )
+
+
 @router.post("/daily-summary/update")
 def recalc_daily_summary(
     date_str: str = Query(default=None, description="Date au format YYYY-MM-DD"),
@@ -753,7 +1344,8 @@ def recalc_daily_summary(
     user_id = TEST_USER_ID
     d = date.fromisoformat(date_str) if date_str else date.today()
     try:
-        return update_daily_summary(user_id=user_id, date=d)
+        # Recalcul explicite : jamais différé, même dans un lot
+        return update_daily_summary(user_id=user_id, date=d, defer=False)
     except HTTPException:
         raise
     except Exception:
@@ -763,31 +1355,84 @@ def recalc_daily_summary(
         )
 
 
+# Colonnes lues pour l'historique (celles de ``DailySummary``) et taille
+# maximale d'une page
+HISTORY_COLUMNS = ",".join(DailySummary.model_fields)
+MAX_HISTORY_PAGE = 366
+
+
+def _history_entry(rec: Dict) -> DailySummary:
+    return DailySummary(
+        date=rec["date"],
+        calories_consumed=rec.get("calories_consumed", 0),
+        calories_burned=rec.get("calories_burned", 0),
+        tdee=rec.get("tdee", 0),
+        calorie_balance=rec.get("calorie_balance", 0),
+        goal_feedback=rec.get("goal_feedback", ""),
+    )
+
+
+def _stream_history(user_id: str, page_size: int, before: Optional[str]):
+    """Parcourt tout l'historique par pages (pagination par clé) et émet
+    une ligne JSON par bilan."""
+    while True:
+        recs = db.get_daily_summaries(user_id, page_size, before, HISTORY_COLUMNS)
+        for rec in recs:
+            yield _history_entry(rec).model_dump_json() + "\n"
+        if len(recs) < page_size:
+            return
+        before = recs[-1]["date"]
+
+
 @router.get("/history", response_model=List[DailySummary])
 def get_history(
-    limit: int = Query(default=30, description="Nombre de jours à retourner"),
+    request: Request,
+    response: Response,
+    limit: Annotated[
+        int,
+        Query(
+            ge=1,
+            le=MAX_HISTORY_PAGE,
+            description="Nombre de jours à retourner (taille de page en ndjson)",
+        ),
+    ] = 30,
     user_id: str = TEST_USER_ID,
+    before: Optional[str] = None,
+    fmt: Annotated[str, Query(alias="format", description="json ou ndjson")] = "json",
 ):
-    """Retourne l'historique des bilans journaliers pour l'utilisateur connecté (max: limit)."""
-    recs = db.get_daily_summaries(user_id, limit)
-    return [
-        DailySummary(
-            date=rec["date"],
-            calories_consumed=rec.get("calories_consumed", 0),
-            calories_burned=rec.get("calories_burned", 0),
-            tdee=rec.get("tdee", 0),
-            calorie_balance=rec.get("calorie_balance", 0),
-            goal_feedback=rec.get("goal_feedback", ""),
+    """Retourne l'historique des bilans journaliers pour l'utilisateur connecté (max: limit).
+
+    Les bilans sont triés du plus récent au plus ancien. ``before`` (date
+    exclue) demande la page suivante : sa valeur est fournie par l'en-tête
+    ``X-Next-Cursor`` de la page précédente, absent sur la dernière page.
+    Avec ``format=ndjson``, tout l'historique antérieur à ``before`` est
+    envoyé en flux, une ligne JSON par jour, lu par pages de ``limit``.
+    """
+    if fmt not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format doit valoir json ou ndjson")
+    if before is not None:
+        try:
+            before = date.fromisoformat(before).isoformat()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Curseur invalide (YYYY-MM-DD)")
+
+    etag = _data_etag("history", user_id, None, limit, before, fmt)
+    not_modified = caching.conditional(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    if fmt == "ndjson":
+        return StreamingResponse(
+            _stream_history(user_id, limit, before),
+            media_type="application/x-ndjson",
+            headers={"ETag": etag, "Cache-Control": caching.REVALIDATE},
         )
-        for rec in recs
-    ]
+    recs = db.get_daily_summaries(user_id, limit, before, HISTORY_COLUMNS)
+    if len(recs) == limit:
+        response.headers["X-Next-Cursor"] = str(recs[-1]["date"])
+    return [_history_entry(rec) for rec in recs]
 
 
-@router.get("/user/profile", response_model=UserProfile)
-def get_user_profile(user_id: str = TEST_USER_ID):
-    user = db.get_user(user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+def _profile_from_user(user: Dict) -> UserProfile:
     return UserProfile(
         poids_kg=user["poids_kg"],
         taille_cm=user["taille_cm"],
@@ -800,6 +1445,88 @@ def get_user_profile(user_id: str = TEST_USER_ID):
     )
 
 
+DASHBOARD_FIELDS = ("summary", "meals", "activities", "goals", "profile")
+
+
+@router.get("/dashboard")
+def dashboard(
+    date_str: str = Query(default=None, description="Date au format YYYY-MM-DD"),
+    fields: Optional[str] = Query(
+        default=None,
+        description="Sections à retourner, séparées par des virgules "
+        "(summary, meals, activities, goals, profile) ; toutes par défaut",
+    ),
+    user_id: str = TEST_USER_ID,
+):
+    """Données de l'écran d'accueil en une seule requête.
+
+    Le profil, les totaux nutritionnels, les activités et les repas ne sont
+    lus qu'une fois, en parallèle, puis partagés entre les sections ; le TDEE
+    n'est calculé qu'une fois.
+    """
+    d = date_str if date_str else str(date.today())
+    wanted = [f.strip() for f in (fields or "").split(",") if f.strip()]
+    wanted = wanted or list(DASHBOARD_FIELDS)
+    unknown = [f for f in wanted if f not in DASHBOARD_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Champs inconnus : {', '.join(unknown)}"
+        )
+    wanted = set(wanted)
+
+    calls = {}
+    if wanted & {"summary", "goals", "profile"}:
+        calls["user"] = lambda: db.get_user(user_id)
+    if "summary" in wanted:
+        calls["totals"] = lambda: db.get_daily_nutrition(user_id, d)
+    if wanted & {"summary", "goals", "activities"}:
+        calls["activities"] = lambda: db.get_activities(user_id, d)
+    if "meals" in wanted:
+        calls["meals"] = lambda: _meals_with_items(user_id, d)
+    fetched = gather(calls)
+    for name in ("user", "meals"):
+        if isinstance(fetched.get(name), Exception):
+            raise fetched[name]
+    # Totaux ou activités indisponibles : le bilan reste calculable
+    totals = fetched.get("totals")
+    if isinstance(totals, Exception):
+        totals = None
+    activities = fetched.get("activities")
+    if isinstance(activities, Exception):
+        activities = []
+    user = fetched.get("user")
+
+    tdee_base = None
+    if user:
+        try:
+            tdee_base = _user_tdee_base(user)
+        except Exception:
+            tdee_base = None
+
+    result: Dict[str, object] = {"date": d}
+    if "summary" in wanted:
+        result["summary"] = _build_daily_summary(
+            user, totals, _calories_burned(activities), tdee_base
+        )
+    if "meals" in wanted:
+        result["meals"] = fetched["meals"]
+    if "activities" in wanted:
+        result["activities"] = activities
+    if "goals" in wanted:
+        result["goals"] = _build_goals(user, activities, tdee_base) if user else None
+    if "profile" in wanted:
+        result["profile"] = _profile_from_user(user) if user else None
+    return result
+
+
+@router.get("/user/profile", response_model=UserProfile)
+def get_user_profile(user_id: str = TEST_USER_ID):
+    user = db.get_user(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+    return _profile_from_user(user)
+
+
 @router.post("/user/profile/update", response_model=UserProfile)
 def update_user_profile(data: UserProfileUpdate, user_id: str = TEST_USER_ID):
     user = db.get_user(user_id)
@@ -851,7 +1578,11 @@ def update_user_profile(data: UserProfileUpdate, user_id: str = TEST_USER_ID):
             .eq("date", today)
             .execute()
         )
-        payload = {"bmr": bmr, "tdee": daily_tdee}
+        payload = {
+            "bmr": bmr,
+            "tdee": daily_tdee,
+            "last_updated": datetime.utcnow().isoformat(),
+        }
         if existing.data:
             (
                 supabase.table("daily_summary")
@@ -872,6 +1603,7 @@ def update_user_profile(data: UserProfileUpdate, user_id: str = TEST_USER_ID):
     if maj:
         db.update_user(user_id, maj)
         user.update(maj)
+    caching.bump(user_id)
     return UserProfile(
         poids_kg=user["poids_kg"],
         taille_cm=user["taille_cm"],
@@ -947,18 +1679,32 @@ def create_meal_item(payload: MealItemCreatePayload):
     return {"id": item_id}
 
 
+def _meals_with_items(user_id: str, date_str: str) -> List[Dict]:
+    """Repas d'une journée avec leurs ingrédients, chargés en parallèle."""
+    meals = db.get_meals(user_id, date_str) or []
+    items = bounded_map(db.get_meal_items, [m["id"] for m in meals])
+    result = []
+    for m in meals:
+        meal_items = items.get(m["id"])
+        if isinstance(meal_items, Exception):
+            raise meal_items
+        result.append({"id": m["id"], "type": m.get("type"), "ingredients": meal_items})
+    return result
+
+
 @router.get("/meals")
 def list_meals(
+    request: Request,
+    response: Response,
     user_id: str = TEST_USER_ID,
     date_str: str = Query(default=str(date.today()), description="Date YYYY-MM-DD"),
 ):
     """Liste les repas d'un utilisateur pour une date donnée avec leurs ingrédients."""
-    meals = db.get_meals(user_id, date_str)
-    result = []
-    for m in meals:
-        items = db.get_meal_items(m["id"])
-        result.append({"id": m["id"], "type": m.get("type"), "ingredients": items})
-    return result
+    etag = _data_etag("meals", user_id, date_str)
+    not_modified = caching.conditional(request, response, etag)
+    if not_modified is not None:
+        return not_modified
+    return _meals_with_items(user_id, date_str)
 
 
 @router.patch("/meals/{meal_id}")
@@ -979,19 +1725,28 @@ def edit_meal(meal_id: str, payload: MealPatchPayload):
     if meal_data:
         db.update_meal(meal_id, meal_data)
 
-    if payload.add:
-        for item in payload.add:
-            analysed = _analyze_item(item.nom_aliment, item.quantite, item.unite)
-            add_meal_item(
-                user_id=user_id,
-                date_str=meal_date,
-                meal_type=meal_type,
-                item_data={**analysed, "source": "manual"},
-            )
-    if payload.update:
-        for item in payload.update:
-            analysed = _analyze_item(item.nom_aliment, item.quantite, item.unite)
-            db.update_meal_item(item.id, {**analysed})
+    # Les ajouts et les mises à jour non recalculables localement sont
+    # analysés ensemble : une seule requête Nutritionix par modification.
+    updates = []
+    to_analyze = [(item.nom_aliment, item.quantite, item.unite) for item in payload.add or []]
+    for item in payload.update or []:
+        existing = db.get_meal_item(item.id)
+        changes = _rescale_item(existing, item)
+        if changes is None:
+            name = item.nom_aliment or (existing or {}).get("nom_aliment")
+            to_analyze.append((name, item.quantite, item.unite))
+        updates.append((item, changes))
+    analysed = iter(_analyze_items(to_analyze))
+
+    for item in payload.add or []:
+        add_meal_item(
+            user_id=user_id,
+            date_str=meal_date,
+            meal_type=meal_type,
+            item_data={**next(analysed), "source": "manual"},
+        )
+    for item, changes in updates:
+        db.update_meal_item(item.id, changes if changes is not None else next(analysed))
     if payload.delete:
         for item_id in payload.delete:
             db.delete_meal_item(item_id)
@@ -1056,6 +1811,12 @@ def remove_activity(activity_id: str):
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
     db.delete_activity(activity_id)
+    try:
+        update_daily_summary(
+            activity.get("user_id", TEST_USER_ID), activity.get("date")
+        )
+    except Exception:
+        pass
     return {"detail": "Activity deleted"}
 
 
@@ -1098,3 +1859,315 @@ async def get_nutrition_recommendations(
             status_code=500,
             detail=f"Erreur lors de la génération des recommandations: {str(e)}",
         )
+
+
+# ----- Batch -----
+
+
+class BatchOperation(BaseModel):
+    id: Optional[str] = Field(
+        default=None, description="Identifiant libre repris dans le résultat"
+    )
+    method: str = Field(default="GET", description="GET, POST, PATCH ou DELETE")
+    path: str = Field(..., description="Chemin de l'API, query string comprise")
+    body: Optional[Any] = Field(default=None, description="Corps JSON éventuel")
+    headers: Dict[str, str] = Field(default_factory=dict)
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+
+class BatchResult(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = Field(default_factory=dict)
+    body: Optional[Any] = None
+
+
+BATCH_MAX_OPERATIONS = int(os.getenv("NUTRIFLOW_BATCH_MAX_OPERATIONS", "20"))
+_BATCH_METHODS = ("GET", "POST", "PATCH", "PUT", "DELETE")
+# Endpoints sans réponse bornée ou récursifs, refusés dans un lot
+_BATCH_EXCLUDED = ("/api/batch", "/api/daily-summary/stream")
+# En-têtes de la sous-réponse repris dans le résultat
+_BATCH_HEADERS = ("etag", "cache-control", "x-next-cursor", "server-timing")
+
+
+async def _run_operation(client, op: BatchOperation) -> BatchResult:
+    res = await client.request(
+        op.method,
+        op.path,
+        json=op.body,
+        headers={**op.headers, "accept-encoding": "identity"},
+    )
+    if res.headers.get("content-type", "").startswith("application/json"):
+        body = res.json()
+    else:
+        body = res.text or None
+    return BatchResult(
+        id=op.id,
+        status=res.status_code,
+        headers={h: res.headers[h] for h in _BATCH_HEADERS if h in res.headers},
+        body=body,
+    )
+
+
+async def _flush_pending(pending: set) -> None:
+    """Recalcule les bilans différés jusqu'ici et vide ``pending``."""
+    if pending:
+        days = set(pending)
+        pending.clear()
+        await run_in_threadpool(flush_daily_summaries, days)
+
+
+@router.post("/batch", response_model=List[BatchResult])
+async def batch(payload: BatchRequest, request: Request):
+    """Exécute plusieurs appels de l'API en un seul aller-retour.
+
+    Les opérations sont traitées dans l'ordre : les lectures (GET)
+    consécutives s'exécutent en parallèle, chaque écriture attend les
+    opérations qui la précèdent. Les recalculs de ``daily_summary``
+    déclenchés par les écritures sont regroupés : ils sont faits une fois
+    par jour avant la lecture suivante et à la fin du lot (même si une
+    opération échoue). Le résultat reprend l'ordre des opérations.
+    """
+    ops = payload.operations
+    if len(ops) > BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lot limité à {BATCH_MAX_OPERATIONS} opérations",
+        )
+    for op in ops:
+        op.method = op.method.upper()
+        if op.method not in _BATCH_METHODS:
+            raise HTTPException(status_code=400, detail=f"Méthode invalide : {op.method}")
+        path = op.path.split("?", 1)[0]
+        if not path.startswith("/api/") or path in _BATCH_EXCLUDED:
+            raise HTTPException(status_code=400, detail=f"Chemin refusé : {op.path}")
+
+    results: List[BatchResult] = []
+    transport = httpx.ASGITransport(app=request.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://batch") as client:
+        with defer_daily_summaries() as pending:
+            try:
+                i = 0
+                while i < len(ops):
+                    if ops[i].method != "GET":
+                        results.append(await _run_operation(client, ops[i]))
+                        i += 1
+                        continue
+                    # Les lectures voient les bilans des écritures précédentes
+                    await _flush_pending(pending)
+                    j = i
+                    while j < len(ops) and ops[j].method == "GET":
+                        j += 1
+                    results.extend(
+                        await asyncio.gather(
+                            *(_run_operation(client, op) for op in ops[i:j])
+                        )
+                    )
+                    i = j
+            finally:
+                await _flush_pending(pending)
+    return results
+
+
+# ----- Synchronisation hors ligne -----
+
+
+class SyncEntityChanges(BaseModel):
+    upserted: List[Dict[str, Any]] = Field(default_factory=list)
+    deleted: List[str] = Field(default_factory=list)
+
+
+class SyncChanges(BaseModel):
+    since: str
+    next: str
+    has_more: bool
+    changes: Dict[str, SyncEntityChanges]
+
+
+class SyncOperation(BatchOperation):
+    op_id: str = Field(..., description="Identifiant unique généré par le client")
+
+
+class SyncPushRequest(BaseModel):
+    operations: List[SyncOperation]
+
+
+class SyncResult(BatchResult):
+    op_id: str
+    replayed: bool = False
+
+
+MAX_SYNC_PAGE = 1000
+SYNC_MAX_OPERATIONS = int(os.getenv("NUTRIFLOW_SYNC_MAX_OPERATIONS", "100"))
+# Délai (s) au-delà duquel une réservation sans résultat est reprise
+SYNC_CLAIM_TIMEOUT = int(os.getenv("NUTRIFLOW_SYNC_CLAIM_TIMEOUT", "60"))
+_SYNC_METHODS = ("POST", "PATCH", "PUT", "DELETE")
+
+
+def _parse_sync_token(token: Optional[str]) -> tuple:
+    """Jeton ``"<txid>-<seq>"`` (``"0"`` au départ) en couple d'entiers."""
+    if not token or token == "0":
+        return 0, 0
+    try:
+        txid, seq = (int(part) for part in token.split("-"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Jeton since invalide")
+    if txid < 0 or seq < 0:
+        raise HTTPException(status_code=400, detail="Jeton since invalide")
+    return txid, seq
+
+
+def _sync_token(entry: Dict) -> str:
+    return f"{entry['txid']}-{entry['seq']}"
+
+
+@router.get("/sync/changes", response_model=SyncChanges)
+def sync_changes(since: str = "0", limit: int = 500, user_id: str = TEST_USER_ID):
+    """Modifications des repas, aliments et activités depuis le jeton ``since``.
+
+    Le journal ``sync_changes`` est lu à partir du jeton : le coût dépend du
+    nombre de modifications, pas de l'historique. Plusieurs modifications
+    d'une même ligne sont fusionnées (la dernière l'emporte) ; une ligne
+    modifiée est renvoyée dans son état courant, une ligne supprimée par son
+    identifiant seul. ``since=0`` renvoie tout le journal (première
+    synchronisation). Le client repasse ``next`` à l'appel suivant, tant que
+    ``has_more`` est vrai.
+
+    Une modification n'apparaît qu'une fois terminées toutes les transactions
+    plus anciennes qu'elle : le flux ne saute jamais une écriture validée en
+    retard.
+    """
+    cursor = _parse_sync_token(since)
+    limit = max(1, min(limit, MAX_SYNC_PAGE))
+
+    log = db.get_sync_changes(user_id, cursor, limit)
+    latest: Dict[tuple, str] = {}
+    for entry in log:
+        key = (entry["entity"], str(entry["entity_id"]))
+        latest.pop(key, None)
+        latest[key] = entry["op"]
+
+    changes = {entity: SyncEntityChanges() for entity in db.SYNC_ENTITIES}
+    wanted: Dict[str, List[str]] = {entity: [] for entity in db.SYNC_ENTITIES}
+    for (entity, entity_id), op in latest.items():
+        if entity not in changes:
+            continue
+        if op == "delete":
+            changes[entity].deleted.append(entity_id)
+        else:
+            wanted[entity].append(entity_id)
+
+    fetched = bounded_map(
+        lambda entity: db.get_rows_by_ids(entity, wanted[entity]),
+        [entity for entity, ids in wanted.items() if ids],
+    )
+    for entity, rows in fetched.items():
+        if isinstance(rows, Exception):
+            raise HTTPException(status_code=500, detail=str(rows))
+        found = {str(row["id"]): row for row in rows}
+        for entity_id in wanted[entity]:
+            row = found.get(entity_id)
+            if row is None:
+                # Supprimée depuis : la tombstone arrivera dans une page suivante
+                changes[entity].deleted.append(entity_id)
+            else:
+                changes[entity].upserted.append(row)
+
+    return SyncChanges(
+        since=since or "0",
+        next=_sync_token(log[-1]) if log else (since or "0"),
+        has_more=len(log) >= limit,
+        changes=changes,
+    )
+
+
+def _stored_result(op: SyncOperation, applied: Dict[str, Any]) -> SyncResult:
+    if applied.get("status") is None:
+        # Réservée par un autre envoi encore en cours : le client réessaiera
+        return SyncResult(
+            id=op.id, op_id=op.op_id, status=409, body={"detail": "Opération en cours"}
+        )
+    return SyncResult(
+        id=op.id,
+        op_id=op.op_id,
+        status=applied["status"],
+        body=applied.get("response"),
+        replayed=True,
+    )
+
+
+@router.post("/sync/push", response_model=List[SyncResult])
+async def sync_push(
+    payload: SyncPushRequest, request: Request, user_id: str = TEST_USER_ID
+):
+    """Applique, dans l'ordre, les écritures mises en file hors ligne.
+
+    Chaque opération porte un ``op_id`` unique. Une opération déjà appliquée
+    n'est pas rejouée : son résultat enregistré est renvoyé
+    (``replayed: true``), ce qui permet au client de renvoyer sa file sans
+    risque après une coupure. Une opération en échec serveur (5xx) n'est pas
+    enregistrée et pourra être renvoyée, de même qu'une opération réservée
+    puis abandonnée (arrêt du processus) depuis plus de
+    ``NUTRIFLOW_SYNC_CLAIM_TIMEOUT`` secondes. Comme pour ``/batch``, les
+    recalculs de ``daily_summary`` sont regroupés en fin d'envoi.
+    """
+    ops = payload.operations
+    if len(ops) > SYNC_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Envoi limité à {SYNC_MAX_OPERATIONS} opérations",
+        )
+    for op in ops:
+        op.method = op.method.upper()
+        if op.method not in _SYNC_METHODS:
+            raise HTTPException(status_code=400, detail=f"Méthode invalide : {op.method}")
+        path = op.path.split("?", 1)[0]
+        if (
+            not path.startswith("/api/")
+            or path in _BATCH_EXCLUDED
+            or path.startswith("/api/sync/")
+        ):
+            raise HTTPException(status_code=400, detail=f"Chemin refusé : {op.path}")
+
+    applied = await run_in_threadpool(
+        db.get_applied_ops, user_id, [op.op_id for op in ops]
+    )
+    results: List[SyncResult] = []
+    transport = httpx.ASGITransport(app=request.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://sync") as client:
+        with defer_daily_summaries() as pending:
+            try:
+                for op in ops:
+                    stored = applied.get(op.op_id)
+                    if stored is not None and stored.get("status") is not None:
+                        results.append(_stored_result(op, stored))
+                        continue
+                    claimed = await run_in_threadpool(
+                        db.claim_op, user_id, op.op_id, SYNC_CLAIM_TIMEOUT
+                    )
+                    if not claimed:
+                        # Doublon dans l'envoi ou envoi concurrent
+                        stored = await run_in_threadpool(
+                            db.get_applied_ops, user_id, [op.op_id]
+                        )
+                        results.append(_stored_result(op, stored.get(op.op_id, {})))
+                        continue
+                    try:
+                        res = await _run_operation(client, op)
+                    except Exception:
+                        await run_in_threadpool(db.release_op, user_id, op.op_id)
+                        raise
+                    if res.status >= 500:
+                        await run_in_threadpool(db.release_op, user_id, op.op_id)
+                    else:
+                        await run_in_threadpool(
+                            db.complete_op, user_id, op.op_id, res.status, res.body
+                        )
+                        applied[op.op_id] = {"status": res.status, "response": res.body}
+                    results.append(SyncResult(op_id=op.op_id, **res.model_dump()))
+            finally:
+                await _flush_pending(pending)
+    return results
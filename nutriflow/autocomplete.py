@@ -0,0 +1,280 @@
+"""Autocomplétion des noms d'aliments.
+
+Un index de base, partagé par tous les utilisateurs, est construit à partir
+des aliments du lexique FR→EN et des noms de produits de l'index local ; il
+n'est reconstruit que si l'un ou l'autre a changé. L'historique des ``meal_items``
+de chaque utilisateur forme un petit index superposé au premier, gardé dans
+un cache LRU borné. Les suggestions des préfixes courts (jusqu'à
+``PREFIX_CACHE_DEPTH`` caractères) sont précalculées ; au-delà, une
+recherche dichotomique dans le tableau trié des noms normalisés suffit.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from nutriflow import fuzzy
+
+# Longueur maximale des préfixes dont les suggestions sont précalculées
+PREFIX_CACHE_DEPTH = int(os.getenv("NUTRIFLOW_AUTOCOMPLETE_DEPTH", "3"))
+
+# Nombre de suggestions conservées par préfixe précalculé
+PREFIX_CACHE_SIZE = 20
+
+# Durée de vie (secondes) de l'historique d'un utilisateur ; l'index de base
+# vérifie aussi ses sources à cet intervalle
+INDEX_TTL = float(os.getenv("NUTRIFLOW_AUTOCOMPLETE_TTL", "300"))
+
+# Nombre d'historiques d'utilisateurs gardés en mémoire (LRU)
+USER_CACHE_SIZE = int(os.getenv("NUTRIFLOW_AUTOCOMPLETE_USERS", "256"))
+
+# Nombre maximal de noms de produits repris de l'index local
+PRODUCT_NAMES_LIMIT = int(os.getenv("NUTRIFLOW_AUTOCOMPLETE_PRODUCTS", "5000"))
+
+# Poids d'une occurrence dans l'historique de l'utilisateur face à une simple
+# entrée du lexique : ce qu'il mange souvent doit remonter en premier.
+HISTORY_WEIGHT = 5
+
+# Entrées du lexique qui ne sont pas des aliments : types de repas (par leur
+# traduction) et mots outils
+MEAL_TYPES_EN = frozenset({"breakfast", "lunch", "dinner", "snack"})
+FUNCTION_WORDS = frozenset(
+    {"a", "au", "aux", "d", "de", "des", "du", "en", "et", "l", "la", "le", "les", "un", "une"}
+)
+
+
+def _normalize(text: str) -> str:
+    from nutriflow.services import clean_text
+
+    return " ".join(clean_text(text).lower().split())
+
+
+class FoodAutocomplete:
+    """Index de suggestions classées par fréquence."""
+
+    def __init__(
+        self,
+        counts: Dict[str, int],
+        translations: Optional[Dict[str, str]] = None,
+        depth: int = PREFIX_CACHE_DEPTH,
+    ):
+        # nom normalisé -> (nom affiché, fréquence)
+        entries: Dict[str, Tuple[str, int]] = {}
+        for name, count in counts.items():
+            key = _normalize(name)
+            if not key:
+                continue
+            display, previous = entries.get(key, (name.strip(), 0))
+            entries[key] = (display, previous + count)
+        self._entries = entries
+        self._translations = translations or {}
+        self._keys: List[str] = sorted(entries)
+        self._depth = depth
+
+        buckets: Dict[str, List[str]] = {}
+        for key in self._keys:
+            for n in range(1, min(depth, len(key)) + 1):
+                buckets.setdefault(key[:n], []).append(key)
+        self._prefix_cache = {
+            prefix: sorted(keys, key=self._rank)[:PREFIX_CACHE_SIZE]
+            for prefix, keys in buckets.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _rank(self, key: str):
+        return (-self._entries[key][1], key)
+
+    def _suggestion(self, key: str) -> Dict:
+        display, count = self._entries[key]
+        return {"name": display, "en": self._translations.get(key), "count": count}
+
+    def entry(self, key: str) -> Optional[Tuple[str, int]]:
+        """``(nom affiché, fréquence)`` d'un nom normalisé."""
+        return self._entries.get(key)
+
+    def translation(self, key: str) -> Optional[str]:
+        return self._translations.get(key)
+
+    def matching(self, norm: str, limit: int) -> List[str]:
+        """Les ``limit`` meilleurs noms normalisés commençant par ``norm``."""
+        if len(norm) <= self._depth and limit <= PREFIX_CACHE_SIZE:
+            keys = self._prefix_cache.get(norm, [])
+        else:
+            lo = bisect_left(self._keys, norm)
+            hi = bisect_left(self._keys, norm + "\uffff", lo)
+            keys = sorted(self._keys[lo:hi], key=self._rank)
+        return keys[:limit]
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Retourne au plus ``limit`` suggestions commençant par ``prefix``."""
+        norm = _normalize(prefix)
+        if not norm:
+            return []
+        return [self._suggestion(k) for k in self.matching(norm, limit)]
+
+
+class UserAutocomplete:
+    """Index de base partagé complété par l'historique d'un utilisateur."""
+
+    def __init__(self, base: FoodAutocomplete, history: FoodAutocomplete):
+        self.base = base
+        self.history = history
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        norm = _normalize(prefix)
+        if not norm:
+            return []
+        own = self.history.matching(norm, len(self.history))
+        # Les ``limit`` meilleurs noms hors historique figurent forcément
+        # parmi les ``limit + len(own)`` premiers de l'index de base
+        candidates = dict.fromkeys([*own, *self.base.matching(norm, limit + len(own))])
+        merged = []
+        for key in candidates:
+            base_entry = self.base.entry(key)
+            own_entry = self.history.entry(key)
+            display = (base_entry or own_entry)[0]
+            count = (base_entry[1] if base_entry else 0) + (
+                own_entry[1] if own_entry else 0
+            )
+            merged.append((-count, key, display))
+        merged.sort()
+        return [
+            {"name": display, "en": self.base.translation(key), "count": -neg}
+            for neg, key, display in merged[:limit]
+        ]
+
+
+def _is_food(fr: str, en: str) -> bool:
+    key = _normalize(fr)
+    return bool(key) and (
+        en.strip().lower() not in MEAL_TYPES_EN
+        and key not in FUNCTION_WORDS
+        and key not in fuzzy.STOPWORDS
+    )
+
+
+def build_base() -> FoodAutocomplete:
+    """Construit l'index partagé (aliments du lexique et produits indexés)."""
+    from nutriflow.db import product_index
+    from nutriflow import services
+
+    counts: Dict[str, int] = {}
+    translations: Dict[str, str] = {}
+
+    for fr, en in services.get_food_mapping().items():
+        if not _is_food(fr, en):
+            continue
+        counts[fr] = counts.get(fr, 0) + 1
+        translations[_normalize(fr)] = en
+
+    for name in product_index.list_product_names(PRODUCT_NAMES_LIMIT):
+        counts[name] = counts.get(name, 0) + 1
+
+    return FoodAutocomplete(counts, translations)
+
+
+def _history_counts(user_id: str) -> Dict[str, int]:
+    import nutriflow.db.supabase as db
+
+    counts: Dict[str, int] = {}
+    try:
+        for name in db.get_user_food_names(user_id):
+            if name:
+                counts[name] = counts.get(name, 0) + HISTORY_WEIGHT
+    except Exception as e:
+        print(f"❌ Historique indisponible pour l'autocomplétion : {e}")
+    return counts
+
+
+def build_autocomplete(user_id: str) -> UserAutocomplete:
+    """Construit l'index d'un utilisateur à partir de toutes les sources."""
+    return UserAutocomplete(get_base(), FoodAutocomplete(_history_counts(user_id)))
+
+
+_lock = threading.Lock()
+# (version des sources, date de vérification, index de base)
+_BASE: Optional[Tuple[tuple, float, FoodAutocomplete]] = None
+# utilisateur -> (date de construction, fréquences, index de l'historique)
+_HISTORIES: "OrderedDict[str, Tuple[float, Dict[str, int], FoodAutocomplete]]" = (
+    OrderedDict()
+)
+
+
+def _base_version() -> tuple:
+    from nutriflow.db import product_index
+    from nutriflow import services
+
+    return (
+        services.get_lexicon().version,
+        product_index.get_index_path(),
+        product_index.generation(),
+    )
+
+
+def get_base() -> FoodAutocomplete:
+    """Index partagé, reconstruit seulement si le lexique ou l'index des
+    produits a changé (sources vérifiées toutes les ``INDEX_TTL`` s)."""
+    global _BASE
+    now = time.monotonic()
+    cached = _BASE
+    if cached and now - cached[1] < INDEX_TTL:
+        return cached[2]
+    version = _base_version()
+    if cached and cached[0] == version:
+        _BASE = (version, now, cached[2])
+        return cached[2]
+    index = build_base()
+    _BASE = (version, now, index)
+    return index
+
+
+def _history(user_id: str) -> FoodAutocomplete:
+    now = time.monotonic()
+    with _lock:
+        cached = _HISTORIES.get(user_id)
+        if cached and now - cached[0] < INDEX_TTL:
+            _HISTORIES.move_to_end(user_id)
+            return cached[2]
+    counts = _history_counts(user_id)
+    index = FoodAutocomplete(counts)
+    with _lock:
+        _HISTORIES[user_id] = (now, counts, index)
+        _HISTORIES.move_to_end(user_id)
+        while len(_HISTORIES) > USER_CACHE_SIZE:
+            _HISTORIES.popitem(last=False)
+    return index
+
+
+def get_autocomplete(user_id: str) -> UserAutocomplete:
+    """Retourne l'index de l'utilisateur (base partagée + historique)."""
+    return UserAutocomplete(get_base(), _history(user_id))
+
+
+def record(user_id: str, name: str) -> None:
+    """Ajoute un aliment saisi à l'historique en mémoire de l'utilisateur,
+    sans relire toute sa liste d'aliments."""
+    if not name:
+        return
+    with _lock:
+        cached = _HISTORIES.get(user_id)
+        if cached is None:
+            return
+        built_at, counts, _ = cached
+        counts = {**counts, name: counts.get(name, 0) + HISTORY_WEIGHT}
+        _HISTORIES[user_id] = (built_at, counts, FoodAutocomplete(counts))
+
+
+def invalidate(user_id: Optional[str] = None) -> None:
+    """Oublie l'historique d'un utilisateur (ou tous les index)."""
+    global _BASE
+    with _lock:
+        if user_id is None:
+            _HISTORIES.clear()
+            _BASE = None
+        else:
+            _HISTORIES.pop(user_id, None)
@@ -0,0 +1,87 @@
+"""Requêtes conditionnelles (ETag / If-None-Match) pour les lectures sondées.
+
+Le frontend interroge régulièrement le bilan du jour, les repas, les
+objectifs et l'historique. Chaque réponse porte un ETag faible calculé à
+partir de valeurs qui changent à chaque modification des données :
+
+- la colonne ``last_updated`` de ``daily_summary``, réécrite par chaque
+  recalcul du bilan (valable quel que soit le processus qui a écrit) ;
+- un compteur de modifications par utilisateur et par jour, incrémenté par
+  ce processus avant même l'écriture en base.
+
+Si le client renvoie le même ETag, l'endpoint répond 304 sans recalculer.
+"""
+
+import hashlib
+import threading
+import uuid
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+# Distingue les ETags de deux démarrages (les compteurs repartent de zéro)
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+_lock = threading.Lock()
+_user_versions: Dict[str, int] = {}
+_day_versions: Dict[Tuple[str, str], int] = {}
+
+# Réponses dynamiques : le client doit revalider à chaque lecture
+REVALIDATE = "private, no-cache"
+
+
+def bump(user_id: str, date: Optional[str] = None) -> None:
+    """Signale une modification des données d'un utilisateur (et d'un jour)."""
+    with _lock:
+        _user_versions[user_id] = _user_versions.get(user_id, 0) + 1
+        if date:
+            key = (user_id, str(date)[:10])
+            _day_versions[key] = _day_versions.get(key, 0) + 1
+
+
+def version(user_id: str, date: Optional[str] = None) -> Tuple[int, int]:
+    """Compteurs ``(utilisateur, jour)`` courants."""
+    with _lock:
+        day = _day_versions.get((user_id, str(date)[:10]), 0) if date else 0
+        return _user_versions.get(user_id, 0), day
+
+
+def weak_etag(*parts: object) -> str:
+    digest = hashlib.sha1(
+        "|".join(str(p) for p in (_BOOT_ID, *parts)).encode("utf-8")
+    ).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparaison faible d'un en-tête ``If-None-Match`` avec ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def conditional(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str = REVALIDATE,
+) -> Optional[Response]:
+    """Pose ``ETag`` et ``Cache-Control`` sur la réponse.
+
+    Retourne une réponse 304 si le client possède déjà cette version,
+    ``None`` sinon (l'endpoint calcule alors la réponse complète).
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
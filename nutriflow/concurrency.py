@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar, Union
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Nombre maximal d'appels externes simultanés (OpenFoodFacts, Supabase...)
+MAX_CONCURRENCY = int(os.getenv("NUTRIFLOW_MAX_CONCURRENCY", "8"))
+
+# Pool partagé par toutes les requêtes, créé au premier usage et arrêté par
+# ``shutdown`` (fin du lifespan de l'application)
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+
+
+def _mark_worker() -> None:
+    _worker.active = True
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=MAX_CONCURRENCY,
+                thread_name_prefix="nutriflow",
+                initializer=_mark_worker,
+            )
+        return _executor
+
+
+def shutdown() -> None:
+    """Arrête le pool partagé (recréé si un appel survient ensuite)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+# Fin des éléments à soumettre
+_DONE = object()
+
+
+def bounded_map(
+    fn: Callable[[T], R], items: Iterable[T], max_workers: int = MAX_CONCURRENCY
+) -> Dict[T, Union[R, Exception]]:
+    """Applique ``fn`` à chaque élément en parallèle, au plus ``max_workers``
+    appels à la fois.
+
+    Retourne un dictionnaire ``{élément: résultat}``. Une exception levée par
+    ``fn`` est renvoyée comme valeur plutôt que propagée, afin qu'un échec
+    isolé n'annule pas tout le lot.
+
+    Les appels passent par le pool partagé (``MAX_CONCURRENCY`` threads au
+    total). Appelé depuis un thread de ce pool, ``bounded_map`` s'exécute
+    séquentiellement : attendre des tâches du même pool pourrait le bloquer.
+    """
+    unique: List[T] = list(dict.fromkeys(items))
+    if not unique:
+        return {}
+
+    def _safe(item: T):
+        try:
+            return fn(item)
+        except Exception as e:
+            return e
+
+    workers = max(1, min(max_workers, len(unique)))
+    if workers == 1 or getattr(_worker, "active", False):
+        return {item: _safe(item) for item in unique}
+
+    pool = get_executor()
+    results: Dict[T, Union[R, Exception]] = {}
+    remaining = iter(unique)
+    # ``range`` d'abord : ``zip`` ne consomme pas d'élément en trop
+    running = {pool.submit(_safe, item): item for _, item in zip(range(workers), remaining)}
+    while running:
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[running.pop(future)] = future.result()
+            item = next(remaining, _DONE)
+            if item is not _DONE:
+                running[pool.submit(_safe, item)] = item
+    return {item: results[item] for item in unique}
+
+
+def gather(
+    calls: Dict[str, Callable[[], R]],
+    max_workers: int = MAX_CONCURRENCY,
+    timings: Optional[Dict[str, float]] = None,
+) -> Dict[str, Union[R, Exception]]:
+    """Exécute en parallèle des appels indépendants nommés.
+
+    ``calls`` associe un nom à une fonction sans argument ; le résultat est
+    ``{nom: résultat}``. Comme pour ``bounded_map``, une exception est
+    renvoyée comme valeur : l'appelant décide si elle est bloquante.
+    Si ``timings`` est fourni, la durée (ms) de chaque appel y est ajoutée.
+    """
+    if not calls:
+        return {}
+
+    def _call(name: str):
+        start = time.perf_counter()
+        try:
+            return calls[name]()
+        finally:
+            if timings is not None:
+                timings[name] = (time.perf_counter() - start) * 1000
+
+    if len(calls) == 1:
+        (name,) = calls
+        try:
+            return {name: _call(name)}
+        except Exception as e:
+            return {name: e}
+    results = bounded_map(_call, calls, max_workers)
+    return {name: results[name] for name in calls}
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Formate des durées (ms) pour l'en-tête HTTP ``Server-Timing``."""
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings.items())
@@ -0,0 +1,248 @@
+"""Catalogue local des aliments appris de Nutritionix (SQLite).
+
+Chaque aliment renvoyé par Nutritionix est enregistré avec ses nutriments
+par gramme et le poids de sa portion de référence. Il est retrouvé ensuite
+par son nom anglais ou par le nom français saisi par l'utilisateur, ce qui
+évite un nouvel appel à Nutritionix pour un aliment déjà connu.
+
+Les alias sont rangés par langue : un nom français identique à un nom
+anglais (« orange », « pain »...) ne détourne jamais l'alias anglais vers un
+autre aliment, et inversement.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Emplacement par défaut du catalogue
+DEFAULT_CATALOG_PATH = os.getenv(
+    "NUTRIFLOW_FOOD_CATALOG",
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "food_catalog.sqlite"),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS foods (
+    id INTEGER PRIMARY KEY,
+    en_name TEXT NOT NULL UNIQUE,
+    serving_qty REAL,
+    serving_unit TEXT,
+    serving_weight_grams REAL,
+    kcal_per_g REAL NOT NULL,
+    protein_per_g REAL NOT NULL,
+    carbs_per_g REAL NOT NULL,
+    fat_per_g REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    food_id INTEGER NOT NULL REFERENCES foods (id) ON DELETE CASCADE,
+    PRIMARY KEY (alias, lang)
+);
+"""
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "learned": 0}
+
+# Fonctions appelées après chaque apprentissage avec le chemin du catalogue
+# et les alias français enregistrés (index dérivés à compléter)
+_LEARN_LISTENERS: List[Callable[[str, List[str]], None]] = []
+
+
+def get_catalog_path() -> str:
+    return os.path.abspath(DEFAULT_CATALOG_PATH)
+
+
+def connect(path: Optional[str] = None, create: bool = True) -> Optional[sqlite3.Connection]:
+    """Retourne une connexion (une par thread) vers le catalogue."""
+    path = os.path.abspath(path or get_catalog_path())
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is not None:
+        return conn
+    if not create and not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conns[path] = conn
+    return conn
+
+
+def close(path: Optional[str] = None) -> None:
+    path = os.path.abspath(path or get_catalog_path())
+    conn = getattr(_local, "conns", {}).pop(path, None)
+    if conn is not None:
+        conn.close()
+
+
+def normalize_name(name: str) -> str:
+    from nutriflow.services import clean_text
+
+    return " ".join(clean_text(name or "").lower().split())
+
+
+def _count(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += n
+
+
+def learn(food: Dict, aliases: Iterable[str] = (), path: Optional[str] = None) -> bool:
+    """Enregistre un aliment Nutritionix et ses alias (noms FR saisis).
+
+    Retourne ``False`` si l'aliment n'a pas de poids de portion exploitable.
+    """
+    name = normalize_name(food.get("food_name", ""))
+    grams = food.get("serving_weight_grams") or 0
+    if not name or grams <= 0:
+        return False
+    row = (
+        name,
+        food.get("serving_qty"),
+        food.get("serving_unit"),
+        grams,
+        (food.get("nf_calories") or 0) / grams,
+        (food.get("nf_protein") or 0) / grams,
+        (food.get("nf_total_carbohydrate") or 0) / grams,
+        (food.get("nf_total_fat") or 0) / grams,
+        time.time(),
+    )
+    try:
+        conn = connect(path)
+        conn.execute(
+            """
+            INSERT INTO foods (en_name, serving_qty, serving_unit, serving_weight_grams,
+                kcal_per_g, protein_per_g, carbs_per_g, fat_per_g, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(en_name) DO UPDATE SET
+                serving_qty = excluded.serving_qty,
+                serving_unit = excluded.serving_unit,
+                serving_weight_grams = excluded.serving_weight_grams,
+                kcal_per_g = excluded.kcal_per_g,
+                protein_per_g = excluded.protein_per_g,
+                carbs_per_g = excluded.carbs_per_g,
+                fat_per_g = excluded.fat_per_g,
+                updated_at = excluded.updated_at
+            """,
+            row,
+        )
+        food_id = conn.execute(
+            "SELECT id FROM foods WHERE en_name = ?", (name,)
+        ).fetchone()[0]
+        french = sorted({k for k in (normalize_name(a) for a in aliases) if k})
+        conn.executemany(
+            "INSERT INTO aliases (alias, lang, food_id) VALUES (?, ?, ?) "
+            "ON CONFLICT(alias, lang) DO UPDATE SET food_id = excluded.food_id",
+            [(name, "en", food_id), *((k, "fr", food_id) for k in french)],
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"❌ Erreur catalogue aliments : {e}")
+        return False
+    _count("learned")
+    for listener in list(_LEARN_LISTENERS):
+        try:
+            listener(os.path.abspath(path or get_catalog_path()), french)
+        except Exception as e:
+            print(f"❌ Erreur après apprentissage d'un aliment : {e}")
+    return True
+
+
+def on_learn(listener: Callable[[str, List[str]], None]) -> None:
+    """Enregistre ``listener``, appelé avec le chemin du catalogue et les
+    alias français après chaque aliment appris."""
+    if listener not in _LEARN_LISTENERS:
+        _LEARN_LISTENERS.append(listener)
+
+
+def lookup(
+    name: str,
+    path: Optional[str] = None,
+    count: bool = True,
+    lang: Optional[str] = None,
+) -> Optional[Dict]:
+    """Retrouve un aliment par nom FR ou EN, ``None`` s'il est inconnu.
+
+    Sans ``lang``, un alias français l'emporte sur un nom anglais identique.
+    Avec ``count=False``, la recherche n'est pas comptée dans les
+    statistiques : l'appelant compte lui-même une recherche en plusieurs
+    essais via ``count_lookup``.
+    """
+    key = normalize_name(name)
+    row = None
+    if key:
+        try:
+            conn = connect(path, create=False)
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT f.* FROM aliases a JOIN foods f ON f.id = a.food_id "
+                    "WHERE a.alias = ? AND a.lang = COALESCE(?, a.lang) "
+                    "ORDER BY a.lang = 'fr' DESC LIMIT 1",
+                    (key, lang),
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"❌ Erreur catalogue aliments : {e}")
+    if count:
+        count_lookup(row is not None)
+    return dict(row) if row else None
+
+
+def count_lookup(hit: bool) -> None:
+    _count("hits" if hit else "misses")
+
+
+def list_names(path: Optional[str] = None, lang: Optional[str] = None) -> List[str]:
+    """Noms connus du catalogue, ceux d'une seule langue si ``lang`` est donné."""
+    try:
+        conn = connect(path, create=False)
+        if conn is None:
+            return []
+        rows = conn.execute(
+            "SELECT DISTINCT alias FROM aliases WHERE lang = COALESCE(?, lang)", (lang,)
+        )
+        return [r[0] for r in rows]
+    except sqlite3.Error as e:
+        print(f"❌ Erreur catalogue aliments : {e}")
+        return []
+
+
+def to_nutritionix_food(entry: Dict, grams: float) -> Dict:
+    """Construit un aliment au format Nutritionix pour ``grams`` grammes."""
+    return {
+        "food_name": entry["en_name"],
+        "serving_qty": grams,
+        "serving_unit": "g",
+        "serving_weight_grams": grams,
+        "nf_calories": entry["kcal_per_g"] * grams,
+        "nf_protein": entry["protein_per_g"] * grams,
+        "nf_total_carbohydrate": entry["carbs_per_g"] * grams,
+        "nf_total_fat": entry["fat_per_g"] * grams,
+        "source": "catalog",
+    }
+
+
+def stats(path: Optional[str] = None) -> Dict:
+    """Métriques du catalogue : taille et taux de réussite des recherches."""
+    size = aliases = 0
+    try:
+        conn = connect(path, create=False)
+        if conn is not None:
+            size = conn.execute("SELECT COUNT(*) FROM foods").fetchone()[0]
+            aliases = conn.execute("SELECT COUNT(*) FROM aliases").fetchone()[0]
+    except sqlite3.Error:
+        pass
+    with _stats_lock:
+        counters = dict(_stats)
+    lookups = counters["hits"] + counters["misses"]
+    return {
+        "size": size,
+        "aliases": aliases,
+        **counters,
+        "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+    }
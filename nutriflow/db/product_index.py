@@ -0,0 +1,239 @@
+"""Index local des produits OpenFoodFacts (SQLite, clé = code-barres).
+
+Alimenté par ``python -m nutriflow.ingest_off`` à partir de l'export
+OpenFoodFacts et par les produits résolus en ligne, il permet de résoudre un
+code-barres sans appel réseau. Une table FTS5 sur le nom et la marque
+(normalisés via ``clean_text``) sert la recherche plein texte.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+# Emplacement par défaut de l'index local
+DEFAULT_INDEX_PATH = os.getenv(
+    "NUTRIFLOW_PRODUCT_INDEX",
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "products.sqlite"),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    barcode TEXT NOT NULL UNIQUE,
+    last_modified_t INTEGER,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    name, brand, tokenize = 'unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts (rowid, name, brand) VALUES (
+        new.id,
+        nf_clean(json_extract(new.data, '$.name')),
+        nf_clean(json_extract(new.data, '$.brand'))
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE ON products BEGIN
+    DELETE FROM products_fts WHERE rowid = old.id;
+    INSERT INTO products_fts (rowid, name, brand) VALUES (
+        new.id,
+        nf_clean(json_extract(new.data, '$.name')),
+        nf_clean(json_extract(new.data, '$.brand'))
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+    DELETE FROM products_fts WHERE rowid = old.id;
+END;
+"""
+
+# Poids BM25 des colonnes (nom, marque) pour le classement des résultats
+_FTS_WEIGHTS = (10.0, 2.0)
+
+_local = threading.local()
+
+
+def get_index_path() -> str:
+    return os.path.abspath(DEFAULT_INDEX_PATH)
+
+
+def connect(path: Optional[str] = None, create: bool = True) -> Optional[sqlite3.Connection]:
+    """Retourne une connexion (une par thread) vers l'index.
+
+    Si ``create`` est faux et que le fichier n'existe pas, retourne ``None``
+    au lieu de créer un index vide.
+    """
+    path = os.path.abspath(path or get_index_path())
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is not None:
+        return conn
+    if not create and not os.path.exists(path):
+        return None
+    from nutriflow.services import clean_text
+
+    conn = sqlite3.connect(path)
+    conn.create_function(
+        "nf_clean", 1, lambda v: clean_text(v).lower() if v else "", deterministic=True
+    )
+    conn.executescript(_SCHEMA)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conns[path] = conn
+    return conn
+
+
+def close(path: Optional[str] = None) -> None:
+    """Ferme la connexion du thread courant vers l'index."""
+    path = os.path.abspath(path or get_index_path())
+    conn = getattr(_local, "conns", {}).pop(path, None)
+    if conn is not None:
+        conn.close()
+
+
+def get_product(barcode: str, path: Optional[str] = None) -> Optional[Dict]:
+    """Lit un produit dans l'index local, ``None`` s'il est absent."""
+    try:
+        conn = connect(path, create=False)
+        if conn is None:
+            return None
+        row = conn.execute(
+            "SELECT data FROM products WHERE barcode = ?", (barcode,)
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"❌ Erreur index produits : {e}")
+        return None
+    return json.loads(row[0]) if row else None
+
+
+def upsert_products(
+    conn: sqlite3.Connection, records: Iterable[Dict], last_modified: Iterable[Optional[int]]
+) -> int:
+    """Insère ou remplace des produits.
+
+    Une fiche existante n'est remplacée que si la nouvelle version est plus
+    récente (``last_modified_t``), ce qui rend les rechargements delta
+    idempotents. Retourne le nombre de lignes écrites.
+    """
+    rows = [
+        (r["barcode"], lm, json.dumps(r, ensure_ascii=False))
+        for r, lm in zip(records, last_modified)
+    ]
+    cur = conn.executemany(
+        """
+        INSERT INTO products (barcode, last_modified_t, data) VALUES (?, ?, ?)
+        ON CONFLICT(barcode) DO UPDATE SET
+            last_modified_t = excluded.last_modified_t,
+            data = excluded.data
+        WHERE products.last_modified_t IS NULL
+           OR excluded.last_modified_t IS NULL
+           OR excluded.last_modified_t > products.last_modified_t
+        """,
+        rows,
+    )
+    conn.commit()
+    return max(cur.rowcount, 0)
+
+
+def remember_product(record: Dict, path: Optional[str] = None) -> None:
+    """Ajoute à l'index un produit résolu en ligne (cache local)."""
+    if not record or not record.get("barcode"):
+        return
+    try:
+        upsert_products(connect(path), [record], [None])
+    except sqlite3.Error as e:
+        print(f"❌ Erreur index produits : {e}")
+
+
+def _fts_query(text: str) -> str:
+    """Construit une requête FTS5 : chaque mot est cherché en préfixe."""
+    from nutriflow.services import clean_text
+
+    tokens = re.findall(r"\w+", clean_text(text).lower())
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def search_products(
+    query: str, limit: int = 20, offset: int = 0, path: Optional[str] = None
+) -> List[Dict]:
+    """Recherche plein texte (préfixe, sans accents) classée par pertinence."""
+    match = _fts_query(query)
+    if not match:
+        return []
+    try:
+        conn = connect(path, create=False)
+        if conn is None:
+            return []
+        rows = conn.execute(
+            """
+            SELECT p.data FROM products_fts f
+            JOIN products p ON p.id = f.rowid
+            WHERE products_fts MATCH ?
+            ORDER BY bm25(products_fts, ?, ?)
+            LIMIT ? OFFSET ?
+            """,
+            (match, *_FTS_WEIGHTS, limit, offset),
+        ).fetchall()
+    except sqlite3.Error as e:
+        print(f"❌ Erreur recherche produits : {e}")
+        return []
+    return [json.loads(r[0]) for r in rows]
+
+
+def list_product_names(limit: int, path: Optional[str] = None) -> List[str]:
+    """Retourne les noms des produits les plus récemment indexés."""
+    try:
+        conn = connect(path, create=False)
+        if conn is None:
+            return []
+        rows = conn.execute(
+            "SELECT json_extract(data, '$.name') FROM products "
+            "ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    except sqlite3.Error as e:
+        print(f"❌ Erreur index produits : {e}")
+        return []
+    return [r[0] for r in rows if r[0]]
+
+
+def generation(path: Optional[str] = None) -> int:
+    """Identifiant du dernier produit indexé (0 si l'index est vide ou
+    absent) : change à chaque ajout de produit."""
+    try:
+        conn = connect(path, create=False)
+        if conn is None:
+            return 0
+        row = conn.execute("SELECT max(id) FROM products").fetchone()
+    except sqlite3.Error as e:
+        print(f"❌ Erreur index produits : {e}")
+        return 0
+    return row[0] or 0
+
+
+def get_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, value),
+    )
+    conn.commit()
+
+
+def count_products(path: Optional[str] = None) -> int:
+    conn = connect(path, create=False)
+    if conn is None:
+        return 0
+    return conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
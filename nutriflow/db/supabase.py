@@ -1,4 +1,5 @@
 import os
+from datetime import datetime, timedelta, timezone
 from supabase import create_client
 from postgrest.exceptions import APIError
 
@@ -23,6 +24,34 @@ def insert_meal(user_id, date, type_repas, note=""):
     return response.data[0]["id"]
 
 
+# Colonnes de meal_items ajoutées par migration : ignorées si la base ne les
+# connaît pas encore (erreur PostgREST PGRST204).
+OPTIONAL_MEAL_ITEM_COLUMNS = (
+    "source",
+    "calories_100g",
+    "proteines_100g",
+    "glucides_100g",
+    "lipides_100g",
+)
+
+
+def _execute_meal_item_write(build, payload):
+    """Exécute ``build(payload)`` en retirant les colonnes optionnelles absentes."""
+    while True:
+        try:
+            return build(payload).execute()
+        except APIError as e:
+            missing = [
+                col
+                for col in OPTIONAL_MEAL_ITEM_COLUMNS
+                if col in payload and col in str(e)
+            ]
+            if getattr(e, "code", "") != "PGRST204" or not missing:
+                raise
+            for col in missing:
+                payload.pop(col, None)
+
+
 def insert_meal_item(
     meal_id,
     nom_aliment,
@@ -35,6 +64,10 @@ def insert_meal_item(
     marque=None,
     barcode=None,
     source=None,
+    calories_100g=None,
+    proteines_100g=None,
+    glucides_100g=None,
+    lipides_100g=None,
 ):
     supabase = get_supabase_client()
     payload = {
@@ -49,15 +82,14 @@ def insert_meal_item(
         "lipides_g": lipides_g,
         "barcode": barcode,
         "source": source,
+        "calories_100g": calories_100g,
+        "proteines_100g": proteines_100g,
+        "glucides_100g": glucides_100g,
+        "lipides_100g": lipides_100g,
     }
-    try:
-        response = supabase.table("meal_items").insert(payload).execute()
-    except APIError as e:
-        if getattr(e, "code", "") == "PGRST204" and "source" in str(e):
-            payload.pop("source", None)
-            response = supabase.table("meal_items").insert(payload).execute()
-        else:
-            raise
+    response = _execute_meal_item_write(
+        lambda p: supabase.table("meal_items").insert(p), payload
+    )
     if not response.data:
         raise Exception("Erreur insertion meal_item")
     return response.data[0]["id"]
@@ -106,6 +138,18 @@ def get_meal_items(meal_id):
     return response.data or []
 
 
+def get_user_food_names(user_id):
+    """Récupère les noms de tous les aliments déjà saisis par un utilisateur."""
+    supabase = get_supabase_client()
+    response = (
+        supabase.table("meal_items")
+        .select("nom_aliment, meals!inner(user_id)")
+        .eq("meals.user_id", user_id)
+        .execute()
+    )
+    return [it.get("nom_aliment") for it in (response.data or [])]
+
+
 def get_meal_item(item_id):
     """Récupère un aliment d'un repas par son identifiant."""
     supabase = get_supabase_client()
@@ -130,7 +174,9 @@ def update_meal(meal_id, data):
 def update_meal_item(item_id, data):
     """Met à jour un aliment d'un repas."""
     supabase = get_supabase_client()
-    response = supabase.table("meal_items").update(data).eq("id", item_id).execute()
+    response = _execute_meal_item_write(
+        lambda p: supabase.table("meal_items").update(p).eq("id", item_id), dict(data)
+    )
     return response.data[0] if response.data else None
 
 
@@ -240,15 +286,42 @@ def get_daily_summary(user_id, date):
     return response.data[0] if response.data else None
 
 
-def get_daily_summaries(user_id, limit=30):
-    """Récupère les bilans journaliers les plus récents pour un utilisateur."""
+def get_summary_last_updated(user_id, date=None):
+    """Horodatage ``last_updated`` du bilan d'un jour, ou du plus récent des
+    bilans de l'utilisateur si ``date`` est omise."""
+    supabase = get_supabase_client()
+    query = supabase.table("daily_summary").select("last_updated").eq("user_id", user_id)
+    if date:
+        query = query.eq("date", date)
+    response = query.order("last_updated", desc=True).limit(1).execute()
+    return response.data[0].get("last_updated") if response.data else None
+
+
+def get_daily_summaries(user_id, limit=30, before=None, columns="*"):
+    """Récupère les bilans journaliers les plus récents pour un utilisateur.
+
+    ``before`` (date exclue) pagine par clé : la page suivante commence au
+    jour précédant la dernière date reçue.
+    """
+    supabase = get_supabase_client()
+    query = supabase.table("daily_summary").select(columns).eq("user_id", user_id)
+    if before:
+        query = query.lt("date", before)
+    response = query.order("date", desc=True).limit(limit).execute()
+    return response.data or []
+
+
+def get_daily_summaries_range(user_id, start, end, columns="*"):
+    """Récupère les bilans journaliers d'un utilisateur entre ``start`` et
+    ``end`` inclus, par date croissante."""
     supabase = get_supabase_client()
     response = (
         supabase.table("daily_summary")
-        .select("*")
+        .select(columns)
         .eq("user_id", user_id)
-        .order("date", desc=True)
-        .limit(limit)
+        .gte("date", start)
+        .lte("date", end)
+        .order("date")
         .execute()
     )
     return response.data or []
@@ -327,6 +400,28 @@ def get_product(barcode: str):
     return response.data[0] if response.data else None
 
 
+def get_products(barcodes):
+    """Récupère en une requête les produits connus parmi ``barcodes``."""
+    if not barcodes:
+        return []
+    supabase = get_supabase_client()
+    response = (
+        supabase.table("products").select("*").in_("barcode", list(barcodes)).execute()
+    )
+    return response.data or []
+
+
+def upsert_products(products):
+    """Insère ou met à jour plusieurs produits en un seul appel."""
+    if not products:
+        return []
+    supabase = get_supabase_client()
+    response = (
+        supabase.table("products").upsert(products, on_conflict="barcode").execute()
+    )
+    return response.data or []
+
+
 def update_user(user_id, data):
     supabase = get_supabase_client()
     response = supabase.table("users").update(data).eq("id", user_id).execute()
@@ -494,3 +589,107 @@ def update_macro_objectives(user_id: str, date: str):
         "target_carbs_g": gluc_obj,
         "target_fats_g": lip_obj,
     }
+
+
+# ----- Synchronisation hors ligne -----
+
+# Tables suivies par le journal ``sync_changes``
+SYNC_ENTITIES = ("meals", "meal_items", "activities")
+
+
+def get_sync_changes(user_id, since=(0, 0), limit=500):
+    """Entrées du journal postérieures au jeton ``since`` = ``(txid, seq)``.
+
+    Seules les entrées définitives (vue ``sync_changes_visible``) sont lues,
+    dans l'ordre ``(txid, seq)``.
+    """
+    txid, seq = since
+    supabase = get_supabase_client()
+    response = (
+        supabase.table("sync_changes_visible")
+        .select("seq,txid,entity,entity_id,op")
+        .eq("user_id", user_id)
+        .or_(f"txid.gt.{int(txid)},and(txid.eq.{int(txid)},seq.gt.{int(seq)})")
+        .order("txid")
+        .order("seq")
+        .limit(limit)
+        .execute()
+    )
+    return response.data or []
+
+
+def get_rows_by_ids(table, ids):
+    """Lignes de ``table`` dont l'identifiant figure dans ``ids``."""
+    if not ids:
+        return []
+    supabase = get_supabase_client()
+    response = supabase.table(table).select("*").in_("id", list(ids)).execute()
+    return response.data or []
+
+
+def get_applied_ops(user_id, op_ids):
+    """Opérations hors ligne déjà enregistrées, par ``op_id``."""
+    if not op_ids:
+        return {}
+    supabase = get_supabase_client()
+    response = (
+        supabase.table("sync_applied_ops")
+        .select("op_id,status,response")
+        .eq("user_id", user_id)
+        .in_("op_id", list(op_ids))
+        .execute()
+    )
+    return {row["op_id"]: row for row in response.data or []}
+
+
+def claim_op(user_id, op_id, timeout=60):
+    """Réserve ``op_id`` avant de l'appliquer ; ``False`` s'il l'est déjà.
+
+    Une réservation sans résultat plus vieille que ``timeout`` secondes
+    (processus arrêté avant la fin de l'opération) est reprise.
+    """
+    supabase = get_supabase_client()
+    now = datetime.now(timezone.utc)
+    try:
+        supabase.table("sync_applied_ops").insert(
+            {"user_id": user_id, "op_id": op_id, "claimed_at": now.isoformat()}
+        ).execute()
+    except APIError as e:
+        if getattr(e, "code", "") != "23505":
+            raise
+        cutoff = now - timedelta(seconds=timeout)
+        response = (
+            supabase.table("sync_applied_ops")
+            .update({"claimed_at": now.isoformat()})
+            .eq("user_id", user_id)
+            .eq("op_id", op_id)
+            .is_("status", "null")
+            .lt("claimed_at", cutoff.isoformat())
+            .execute()
+        )
+        return bool(response.data)
+    return True
+
+
+def complete_op(user_id, op_id, status, response_body):
+    """Enregistre le résultat d'une opération appliquée."""
+    supabase = get_supabase_client()
+    (
+        supabase.table("sync_applied_ops")
+        .update({"status": status, "response": response_body})
+        .eq("user_id", user_id)
+        .eq("op_id", op_id)
+        .execute()
+    )
+
+
+def release_op(user_id, op_id):
+    """Libère une réservation (échec à réessayer plus tard)."""
+    supabase = get_supabase_client()
+    (
+        supabase.table("sync_applied_ops")
+        .delete()
+        .eq("user_id", user_id)
+        .eq("op_id", op_id)
+        .execute()
+    )
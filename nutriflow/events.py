@@ -0,0 +1,106 @@
+"""Pub/sub en mémoire pour pousser les mises à jour aux clients connectés.
+
+Un abonné (une connexion SSE) reçoit les messages publiés sur un sujet, par
+exemple ``("summary", user_id, date)``. La publication est possible depuis
+n'importe quel thread (les endpoints synchrones tournent dans le pool de
+threads) : le message est remis à la boucle asyncio de chaque abonné.
+
+Chaque abonné a une file bornée : si le client ne suit pas, les messages
+les plus anciens sont abandonnés plutôt que d'accumuler de la mémoire. Les
+messages publiés ici sont des notifications (« le bilan a changé ») dont
+seule la plus récente compte.
+
+Le pub/sub est local au processus : avec plusieurs workers, un client n'est
+notifié que des modifications traitées par le worker qui porte sa connexion.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, Hashable, List, Set
+
+# Taille de la file de chaque abonné
+QUEUE_SIZE = int(os.getenv("NUTRIFLOW_EVENTS_QUEUE_SIZE", "8"))
+
+_lock = threading.Lock()
+_subscribers: Dict[Hashable, Set["Subscription"]] = {}
+_stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+
+class Subscription:
+    """File de messages d'un abonné, liée à sa boucle asyncio."""
+
+    def __init__(self, topic: Hashable, maxsize: int = QUEUE_SIZE):
+        self.topic = topic
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+        self.dropped = 0
+
+    def _offer(self, message: Any) -> None:
+        # Exécuté dans la boucle de l'abonné : pas de concurrence sur la file
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            _count("dropped")
+        self.queue.put_nowait(message)
+        _count("delivered")
+
+    async def get(self, timeout: float) -> Any:
+        """Prochain message, ``asyncio.TimeoutError`` après ``timeout`` s."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def drain(self) -> List[Any]:
+        """Retire et retourne les messages déjà en attente."""
+        messages = []
+        while not self.queue.empty():
+            messages.append(self.queue.get_nowait())
+        return messages
+
+
+def _count(key: str) -> None:
+    with _lock:
+        _stats[key] += 1
+
+
+def subscribe(topic: Hashable, maxsize: int = QUEUE_SIZE) -> Subscription:
+    """Abonne la tâche asyncio courante à ``topic``."""
+    sub = Subscription(topic, maxsize)
+    with _lock:
+        _subscribers.setdefault(topic, set()).add(sub)
+    return sub
+
+
+def unsubscribe(sub: Subscription) -> None:
+    with _lock:
+        subs = _subscribers.get(sub.topic)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del _subscribers[sub.topic]
+
+
+def has_subscribers(topic: Hashable) -> bool:
+    with _lock:
+        return bool(_subscribers.get(topic))
+
+
+def publish(topic: Hashable, message: Any = None) -> int:
+    """Publie ``message`` sur ``topic`` ; retourne le nombre d'abonnés."""
+    with _lock:
+        subs = list(_subscribers.get(topic, ()))
+        _stats["published"] += 1
+    for sub in subs:
+        try:
+            sub.loop.call_soon_threadsafe(sub._offer, message)
+        except RuntimeError:
+            # Boucle fermée : la connexion est en cours de fermeture
+            unsubscribe(sub)
+    return len(subs)
+
+
+def stats() -> Dict[str, int]:
+    with _lock:
+        return {
+            **_stats,
+            "subscribers": sum(len(s) for s in _subscribers.values()),
+        }
@@ -0,0 +1,319 @@
+"""Correction orthographique des noms d'aliments.
+
+Les fautes de frappe (« yaourth », « poullet ») et les accents manquants
+font échouer la recherche exacte dans le lexique et le catalogue. Un
+``FuzzyIndex`` retrouve le terme connu le plus proche selon la distance
+d'édition.
+
+Principe (« symmetric delete ») : chaque terme est indexé avec toutes ses
+variantes privées d'au plus ``MAX_DISTANCE`` caractères ; une requête génère
+les mêmes variantes et les candidats communs sont vérifiés par une distance
+de Levenshtein bornée.
+Les variantes sont stockées sous forme d'empreintes entières triées dans un
+``array`` : la recherche se fait par dichotomie et l'index reste compact
+(environ 8 octets par variante).
+
+Les termes appris en cours de route (catalogue) sont ajoutés à un index
+existant sans le reconstruire ; leurs variantes vont dans une table
+d'appoint, refondue dans le tableau trié en arrière-plan quand elle grossit.
+"""
+
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+# Bits réservés à l'identifiant du terme dans chaque entrée de l'index
+_ID_BITS = 22
+_ID_MASK = (1 << _ID_BITS) - 1
+_HASH_MASK = (1 << (63 - _ID_BITS)) - 1
+
+# Longueur minimale d'un mot pour tenter une correction : en dessous, une
+# seule faute mène trop souvent à un autre mot existant
+MIN_WORD_LENGTH = 5
+# À partir de cette longueur, deux fautes sont tolérées
+LONG_WORD_LENGTH = 8
+# Nombre maximal de fautes corrigées
+MAX_DISTANCE = 2
+
+# Termes ajoutés au-delà desquels la table d'appoint est refondue dans un
+# nouvel index (en nombre absolu et en proportion de l'index)
+COMPACT_MIN_TERMS = 1000
+COMPACT_RATIO = 0.1
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+# Mots outils jamais corrigés (les plus courts sont déjà ignorés)
+STOPWORDS = frozenset(
+    {
+        "avec", "sans", "pour", "dans", "sous", "comme", "entre", "environ",
+        "quelques", "plusieurs", "chaque", "autre", "autres", "moitie",
+        "morceau", "morceaux", "portion", "portions", "grand", "grande",
+        "grands", "grandes", "petits", "petites", "moyen", "moyenne",
+        "maison", "light", "allege", "allegee",
+    }
+)
+
+
+def _max_distance(length: int) -> int:
+    if length < MIN_WORD_LENGTH:
+        return 0
+    return 1 if length < LONG_WORD_LENGTH else MAX_DISTANCE
+
+
+def max_distance_for(term: str) -> int:
+    """Nombre de fautes tolérées selon la longueur du mot."""
+    return _max_distance(len(term))
+
+
+def _index_depth(term: str) -> int:
+    """Suppressions à indexer pour un terme : une requête plus longue de
+    ``MAX_DISTANCE`` caractères peut encore le retrouver."""
+    return _max_distance(len(term) + MAX_DISTANCE)
+
+
+def _deletes(term: str, depth: int = 1) -> set:
+    """Le terme et toutes ses variantes privées d'au plus ``depth``
+    caractères."""
+    variants = {term}
+    frontier = {term}
+    for _ in range(depth):
+        frontier = {
+            word[:i] + word[i + 1 :] for word in frontier for i in range(len(word))
+        } - variants
+        variants |= frontier
+    return variants
+
+
+def _fingerprint(text: str) -> int:
+    return hash(text) & _HASH_MASK
+
+
+def levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Distance d'édition, ou ``max_distance + 1`` dès qu'elle est dépassée."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for j, cb in enumerate(b, 1):
+        current = [j]
+        best = j
+        for i, ca in enumerate(a, 1):
+            cost = min(
+                previous[i] + 1,
+                current[i - 1] + 1,
+                previous[i - 1] + (ca != cb),
+            )
+            current.append(cost)
+            if cost < best:
+                best = cost
+        if best > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    """Index de termes tolérant aux fautes de frappe."""
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = sorted({t for t in terms if t})
+        if len(self.terms) > _ID_MASK:
+            raise ValueError("Trop de termes pour l'index approché")
+        self._known = set(self.terms)
+        entries = [
+            (_fingerprint(variant) << _ID_BITS) | term_id
+            for term_id, term in enumerate(self.terms)
+            for variant in _deletes(term, _index_depth(term))
+        ]
+        entries.sort()
+        self._entries = array("q", entries)
+        # Variantes des termes ajoutés après construction : empreinte → ids
+        self._extra: Dict[int, List[int]] = {}
+        self._sorted_size = len(self.terms)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self._known
+
+    @property
+    def added(self) -> int:
+        """Nombre de termes ajoutés depuis la construction."""
+        return len(self.terms) - self._sorted_size
+
+    def add(self, terms: Iterable[str]) -> List[str]:
+        """Ajoute des termes sans reconstruire l'index ; retourne les
+        termes réellement nouveaux.
+
+        Les recherches concurrentes restent possibles : un terme n'est
+        visible qu'une fois toutes ses variantes indexées.
+        """
+        new = []
+        with self._lock:
+            for term in terms:
+                if not term or term in self._known:
+                    continue
+                if len(self.terms) > _ID_MASK:
+                    raise ValueError("Trop de termes pour l'index approché")
+                term_id = len(self.terms)
+                self.terms.append(term)
+                for variant in _deletes(term, _index_depth(term)):
+                    self._extra.setdefault(_fingerprint(variant), []).append(term_id)
+                self._known.add(term)
+                new.append(term)
+        return new
+
+    def _candidates(self, term: str, max_distance: int) -> set:
+        ids = set()
+        entries = self._entries
+        extra = self._extra
+        for variant in _deletes(term, max_distance):
+            fingerprint = _fingerprint(variant)
+            start = fingerprint << _ID_BITS
+            pos = bisect_left(entries, start)
+            end = start + _ID_MASK
+            while pos < len(entries) and entries[pos] <= end:
+                ids.add(entries[pos] & _ID_MASK)
+                pos += 1
+            if extra:
+                ids.update(extra.get(fingerprint, ()))
+        return ids
+
+    def lookup(self, term: str, max_distance: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """Retourne ``(terme connu, distance)`` le plus proche.
+
+        ``None`` si aucun terme n'est assez proche ou si plusieurs candidats
+        sont à égalité : dans le doute, on ne corrige pas.
+        """
+        if term in self._known:
+            return term, 0
+        if max_distance is None:
+            max_distance = max_distance_for(term)
+        max_distance = min(max_distance, MAX_DISTANCE)
+        if max_distance <= 0:
+            return None
+        best: Optional[str] = None
+        best_distance = max_distance + 1
+        tie = False
+        for term_id in self._candidates(term, max_distance):
+            candidate = self.terms[term_id]
+            distance = levenshtein(term, candidate, max_distance)
+            if distance < best_distance:
+                best, best_distance, tie = candidate, distance, False
+            elif distance == best_distance:
+                tie = True
+        if best is None or best_distance > max_distance or tie:
+            return None
+        return best, best_distance
+
+
+def correct(
+    text: str, indexes: List[FuzzyIndex], known: Collection[str] = frozenset()
+) -> str:
+    """Corrige chaque mot inconnu d'un texte déjà nettoyé (minuscules, sans
+    accents) avec le terme le plus proche parmi ``indexes``.
+
+    La correction n'est qu'un recours : un mot court, un mot outil, un mot
+    présent tel quel dans un index ou dans ``known`` (vocabulaire de la
+    langue) est conservé. Le pluriel d'un terme connu (« tranches ») n'est
+    pas une faute.
+    """
+
+    def _is_known(word: str) -> bool:
+        forms = (word, word[:-1]) if word.endswith(("s", "x")) else (word,)
+        return any(
+            form in STOPWORDS
+            or form in known
+            or any(form in idx for idx in indexes)
+            for form in forms
+        )
+
+    def _replace(m: re.Match) -> str:
+        word = m.group(0)
+        if len(word) < MIN_WORD_LENGTH or _is_known(word):
+            return word
+        matches = [found for found in (idx.lookup(word) for idx in indexes) if found]
+        if not matches:
+            return word
+        best = min(d for _, d in matches)
+        terms = {t for t, d in matches if d == best}
+        return terms.pop() if len(terms) == 1 else word
+
+    return _WORD_RE.sub(_replace, text)
+
+
+def vocabulary(names: Iterable[str]) -> set:
+    """Mots à indexer à partir de noms d'aliments."""
+    words = set()
+    for name in names:
+        words.update(_WORD_RE.findall(name))
+    return words
+
+
+_INDEXES: Dict[str, Tuple[object, FuzzyIndex]] = {}
+_INDEXES_LOCK = threading.Lock()
+# Index en cours de refonte en arrière-plan
+_COMPACTING: set = set()
+
+
+def get_index(name: str, version: object, build) -> FuzzyIndex:
+    """Retourne l'index ``name``, reconstruit si ``version`` a changé.
+
+    ``build`` est appelé sans argument et retourne les termes à indexer.
+    Les termes appris ensuite s'ajoutent via ``add_terms`` sans changer de
+    version.
+    """
+    cached = _INDEXES.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    index = FuzzyIndex(build())
+    with _INDEXES_LOCK:
+        _INDEXES[name] = (version, index)
+    return index
+
+
+def add_terms(name: str, version: object, terms: Iterable[str]) -> List[str]:
+    """Ajoute ``terms`` à l'index ``name`` s'il est construit pour
+    ``version`` ; retourne les termes ajoutés.
+
+    Quand la table d'appoint dépasse ``COMPACT_MIN_TERMS`` termes et
+    ``COMPACT_RATIO`` de l'index, l'index est reconstruit dans un thread à
+    part et substitué à l'ancien, sans bloquer les recherches.
+    """
+    with _INDEXES_LOCK:
+        cached = _INDEXES.get(name)
+        if cached is None or cached[0] != version:
+            return []
+        index = cached[1]
+        added = index.add(terms)
+        if (
+            index.added >= max(COMPACT_MIN_TERMS, COMPACT_RATIO * len(index))
+            and name not in _COMPACTING
+        ):
+            _COMPACTING.add(name)
+            threading.Thread(
+                target=_compact, args=(name, version, index), daemon=True
+            ).start()
+    return added
+
+
+def _compact(name: str, version: object, index: FuzzyIndex) -> None:
+    """Reconstruit ``index`` avec ses termes ajoutés puis le substitue."""
+    try:
+        size = len(index)
+        rebuilt = FuzzyIndex(index.terms[:size])
+        with _INDEXES_LOCK:
+            if _INDEXES.get(name) == (version, index):
+                # Termes ajoutés pendant la reconstruction
+                rebuilt.add(index.terms[size:])
+                _INDEXES[name] = (version, rebuilt)
+    except Exception as e:
+        print(f"❌ Erreur de reconstruction de l'index {name} : {e}")
+    finally:
+        with _INDEXES_LOCK:
+            _COMPACTING.discard(name)
@@ -0,0 +1,166 @@
+"""Ingestion de l'export OpenFoodFacts dans l'index produits local.
+
+Usage ::
+
+    python -m nutriflow.ingest_off openfoodfacts-products.jsonl.gz
+    python -m nutriflow.ingest_off en.openfoodfacts.org.products.csv.gz --delta
+
+Le fichier est lu ligne à ligne (JSONL ou CSV tabulé, compressé gzip ou
+non) : la mémoire utilisée reste bornée par la taille d'un lot, quelle que
+soit la taille de l'export.
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import sys
+from typing import Dict, Iterator, Optional
+
+from nutriflow.db import product_index
+from nutriflow.services import off_product_to_record
+
+# Colonnes du CSV OpenFoodFacts contenant des listes séparées par des virgules
+_CSV_TAG_COLUMNS = (
+    "labels_tags",
+    "additives_tags",
+    "allergens_tags",
+    "traces_tags",
+    "nova_groups_tags",
+    "categories_tags",
+)
+
+# Clé de la table meta mémorisant le dernier ``last_modified_t`` ingéré
+WATERMARK_KEY = "off_last_modified_t"
+
+
+def _open_text(path: str) -> io.TextIOBase:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _csv_value(value: str):
+    """Convertit une cellule CSV en nombre quand c'est possible."""
+    if value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def csv_row_to_product(row: Dict[str, str]) -> Dict:
+    """Reconstitue une fiche au format de l'API OpenFoodFacts depuis une
+    ligne de l'export CSV (nutriments ``*_100g`` à plat)."""
+    product: Dict = {"nutriments": {}}
+    for key, value in row.items():
+        if key is None or value is None:
+            continue
+        if key.endswith("_100g"):
+            parsed = _csv_value(value)
+            if parsed is not None:
+                product["nutriments"][key] = parsed
+        elif key in _CSV_TAG_COLUMNS:
+            product[key] = [t for t in value.split(",") if t]
+        elif value != "":
+            product[key] = value
+    for key in ("nutriscore_score", "ecoscore_score", "nova_group"):
+        if key in product:
+            product[key] = _csv_value(product[key])
+    return product
+
+
+def iter_dump_products(path: str) -> Iterator[Dict]:
+    """Itère sur les fiches produits d'un export JSONL ou CSV."""
+    name = path[:-3] if path.endswith(".gz") else path
+    with _open_text(path) as f:
+        if name.endswith(".csv"):
+            csv.field_size_limit(sys.maxsize)
+            for row in csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                yield csv_row_to_product(row)
+        else:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def ingest_dump(
+    path: str,
+    index_path: Optional[str] = None,
+    delta: bool = False,
+    batch_size: int = 5000,
+) -> Dict[str, int]:
+    """Charge un export OpenFoodFacts dans l'index local.
+
+    En mode ``delta``, seules les fiches modifiées depuis le dernier
+    chargement (``last_modified_t``) sont prises en compte.
+    """
+    conn = product_index.connect(index_path)
+    since = _to_int(product_index.get_meta(conn, WATERMARK_KEY)) if delta else None
+    watermark = since or 0
+    stats = {"read": 0, "skipped": 0, "written": 0}
+
+    records, modified = [], []
+    for product in iter_dump_products(path):
+        stats["read"] += 1
+        code = str(product.get("code") or "").strip()
+        last_modified = _to_int(product.get("last_modified_t"))
+        if not code or (since is not None and last_modified is not None and last_modified <= since):
+            stats["skipped"] += 1
+            continue
+        product["code"] = code
+        records.append(off_product_to_record(product))
+        modified.append(last_modified)
+        if last_modified and last_modified > watermark:
+            watermark = last_modified
+        if len(records) >= batch_size:
+            stats["written"] += product_index.upsert_products(conn, records, modified)
+            records, modified = [], []
+    if records:
+        stats["written"] += product_index.upsert_products(conn, records, modified)
+
+    if watermark:
+        product_index.set_meta(conn, WATERMARK_KEY, str(watermark))
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Ingère un export OpenFoodFacts dans l'index produits local."
+    )
+    parser.add_argument("dump", help="Fichier JSONL ou CSV (éventuellement .gz)")
+    parser.add_argument(
+        "--index", default=None, help="Chemin de l'index SQLite (défaut : data/products.sqlite)"
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Ne charge que les fiches modifiées depuis le dernier chargement",
+    )
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    stats = ingest_dump(args.dump, args.index, args.delta, args.batch_size)
+    print(
+        f"📦 Ingestion terminée : {stats['read']} lues, "
+        f"{stats['written']} écrites, {stats['skipped']} ignorées"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
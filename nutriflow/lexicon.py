@@ -0,0 +1,438 @@
+"""Lexique de traduction FR→EN compilé.
+
+Le mapping CSV (``data/fr_en_mapping.csv``) est validé, dédoublonné puis
+compilé en un dictionnaire de locutions découpées en mots : la traduction
+d'un texte se fait alors en une seule passe, sans ``str.replace`` répété
+ni remplacement à l'intérieur d'un mot.
+
+Le mapping validé est enregistré dans un artefact JSON à côté du CSV (voir
+``artifact_path``), rechargé au démarrage tant que le CSV n'a pas été
+modifié : le dictionnaire de locutions est recompilé à partir de ce mapping
+sans relire ni revalider le CSV. Construction explicite ::
+
+    python -m nutriflow.lexicon data/fr_en_mapping.csv
+
+Un ``Lexicon`` est immuable et porte un identifiant de version (empreinte
+de son contenu) : un rechargement construit un nouvel objet qui remplace
+l'ancien d'un seul coup, sans état intermédiaire visible des lecteurs.
+``LexiconWatcher`` déclenche ce rechargement quand le CSV change.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Version du format de l'artefact ; l'incrémenter force sa reconstruction
+ARTIFACT_FORMAT = 3
+
+# Extension de l'artefact compilé, ajoutée au nom du CSV
+ARTIFACT_SUFFIX = ".lexicon"
+
+# Mots et signes de ponctuation ; les espaces ne comptent pas
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def _clean_key(text: str) -> str:
+    from nutriflow.services import clean_text
+
+    return " ".join(clean_text(text).lower().split())
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text)
+
+
+class PhraseMatcher:
+    """Remplace des locutions (suites de mots) par leur traduction.
+
+    À chaque position du texte, la locution la plus longue est retenue ; les
+    locutions ne sont reconnues que sur des mots entiers.
+    """
+
+    def __init__(self, phrases: Dict[str, str]):
+        self.table: Dict[str, str] = {}
+        lengths = set()
+        first = set()
+        for fr, en in phrases.items():
+            tokens = tokenize(fr)
+            if not tokens:
+                continue
+            key = " ".join(tokens)
+            # Réutilise la chaîne d'origine quand elle est déjà découpée
+            self.table[fr if key == fr else key] = en
+            lengths.add(len(tokens))
+            first.add(tokens[0])
+        self.lengths: Tuple[int, ...] = tuple(sorted(lengths, reverse=True))
+        self.first = frozenset(first)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def translate(self, text: str) -> str:
+        matches = list(_TOKEN_RE.finditer(text))
+        tokens = [m.group(0) for m in matches]
+        out, last, i, n = [], 0, 0, len(tokens)
+        while i < n:
+            if tokens[i] in self.first:
+                for size in self.lengths:
+                    if i + size > n:
+                        continue
+                    en = self.table.get(" ".join(tokens[i : i + size]))
+                    if en is not None:
+                        out.append(text[last : matches[i].start()])
+                        out.append(en)
+                        last = matches[i + size - 1].end()
+                        i += size
+                        break
+                else:
+                    i += 1
+            else:
+                i += 1
+        out.append(text[last:])
+        return "".join(out)
+
+
+class Lexicon:
+    """Mapping FR→EN compilé : locutions et table des unités."""
+
+    def __init__(self, mapping: Dict[str, str], source: Optional[str] = None, source_mtime: Optional[float] = None):
+        self.mapping = mapping
+        self.source = source
+        self.source_mtime = source_mtime
+        self.version = content_version(mapping)
+        self.loaded_at = time.time()
+        self.matcher = PhraseMatcher(mapping)
+        self._split_units()
+
+    def _split_units(self) -> None:
+        from nutriflow.services import UNIT_EN
+
+        self.units = {fr: en for fr, en in self.mapping.items() if en in UNIT_EN}
+        self.foods = {fr: en for fr, en in self.mapping.items() if en not in UNIT_EN}
+
+    def __len__(self) -> int:
+        return len(self.mapping)
+
+    def translate(self, text: str) -> str:
+        return self.matcher.translate(text)
+
+    def info(self) -> Dict:
+        """Description du lexique pour les métriques."""
+        return {
+            "version": self.version,
+            "entries": len(self.mapping),
+            "units": len(self.units),
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+        }
+
+
+def content_version(mapping: Dict[str, str]) -> str:
+    """Empreinte courte du contenu : identique d'un worker à l'autre."""
+    digest = hashlib.sha1()
+    for fr, en in sorted(mapping.items()):
+        digest.update(f"{fr}\t{en}\n".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def read_mapping_csv(filepath: str) -> Dict[str, str]:
+    """Lit un CSV "fr,en" ou "fr;en", valide et dédoublonne ses lignes.
+
+    La colonne source est ``fr`` ou, pour les packs d'autres langues, la
+    première colonne autre que ``en`` (``es``, ``it``...). Les clés sont
+    nettoyées (``clean_text``, minuscules). Les lignes incomplètes sont
+    ignorées ; en cas de doublon, la dernière ligne l'emporte.
+    """
+    with open(filepath, "r", encoding="utf-8-sig", newline="") as f:
+        first_line = f.readline()
+        delimiter = ";" if first_line.count(";") >= first_line.count(",") else ","
+        f.seek(0)
+        reader = csv.DictReader(f, delimiter=delimiter)
+        columns = [c.strip() for c in reader.fieldnames or []]
+        sources = [c for c in columns if c != "en"]
+        if "en" not in columns or not sources:
+            raise ValueError(f"Colonnes 'fr' et 'en' attendues dans {filepath}")
+        source = "fr" if "fr" in sources else sources[0]
+        reader.fieldnames = columns
+        mapping: Dict[str, str] = {}
+        invalid = conflicts = 0
+        for row in reader:
+            fr = _clean_key(row.get(source) or "")
+            en = (row.get("en") or "").strip()
+            if not fr or not en:
+                invalid += 1
+                continue
+            if mapping.get(fr, en) != en:
+                conflicts += 1
+            mapping[fr] = en
+    if invalid or conflicts:
+        print(
+            f"⚠️ Mapping {os.path.basename(filepath)} : {invalid} ligne(s) invalide(s), "
+            f"{conflicts} doublon(s) contradictoire(s)"
+        )
+    return mapping
+
+
+def artifact_path(csv_path: str) -> str:
+    return csv_path + ARTIFACT_SUFFIX
+
+
+def build(csv_path: str) -> Lexicon:
+    """Compile le CSV en lexique."""
+    return Lexicon(read_mapping_csv(csv_path), csv_path, os.path.getmtime(csv_path))
+
+
+def save(lexicon: Lexicon, path: str) -> None:
+    """Écrit l'artefact de façon atomique (fichier temporaire puis renommage).
+
+    Seules des données sont stockées (le mapping validé, en JSON) : lire un
+    artefact n'exécute jamais de code, quel que soit son emplacement.
+    """
+    state = {
+        "format": ARTIFACT_FORMAT,
+        "source_mtime": lexicon.source_mtime,
+        "mapping": lexicon.mapping,
+    }
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+        # mkstemp crée le fichier en 0600 : l'artefact reste lisible par tous
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _load_artifact(path: str, csv_path: str, source_mtime: float) -> Optional[Lexicon]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(state, dict)
+        or state.get("format") != ARTIFACT_FORMAT
+        or state.get("source_mtime") != source_mtime
+    ):
+        return None
+    mapping = state.get("mapping")
+    if not isinstance(mapping, dict) or not all(
+        isinstance(k, str) and isinstance(v, str) for k, v in mapping.items()
+    ):
+        return None
+    return Lexicon(mapping, csv_path, source_mtime)
+
+
+def load(csv_path: str) -> Lexicon:
+    """Charge le lexique du CSV, depuis l'artefact s'il est à jour.
+
+    Un artefact absent ou plus ancien que le CSV est reconstruit puis
+    réécrit (au mieux : un répertoire en lecture seule n'empêche pas le
+    chargement).
+    """
+    mtime = os.path.getmtime(csv_path)
+    target = artifact_path(csv_path)
+    lexicon = _load_artifact(target, csv_path, mtime)
+    if lexicon is not None:
+        return lexicon
+    lexicon = build(csv_path)
+    try:
+        save(lexicon, target)
+    except OSError as e:
+        print(f"⚠️ Artefact du lexique non écrit : {e}")
+    return lexicon
+
+
+def empty(source: Optional[str] = None) -> Lexicon:
+    return Lexicon({}, source)
+
+
+# Répertoire des packs de langues : un sous-répertoire par locale contenant
+# ``mapping.csv`` (aliments et unités) et ``sports.csv`` (activités)
+PACKS_DIR = os.getenv(
+    "NUTRIFLOW_LEXICON_PACKS",
+    os.path.join(os.path.dirname(__file__), "..", "data", "lexicons"),
+)
+
+# Nombre maximal de packs gardés en mémoire par worker
+MAX_LOADED_PACKS = int(os.getenv("NUTRIFLOW_LEXICON_PACKS_MAX", "2"))
+
+# Durée (s) au-delà de laquelle un pack inutilisé est libéré
+PACK_IDLE_TTL = float(os.getenv("NUTRIFLOW_LEXICON_PACK_TTL", "900"))
+
+
+class LocalePack:
+    """Vocabulaire d'une langue : lexique des aliments et des activités."""
+
+    def __init__(self, locale: str, lexicon: Lexicon, sports: Dict[str, str]):
+        self.locale = locale
+        self.lexicon = lexicon
+        self.sports = sports
+        self.sports_matcher = PhraseMatcher(sports)
+        self.last_used = time.monotonic()
+
+    def info(self) -> Dict:
+        return {"locale": self.locale, **self.lexicon.info(), "sports": len(self.sports)}
+
+
+class PackRegistry:
+    """Packs de langues chargés à la demande, évincés s'ils ne servent plus.
+
+    Au plus ``max_loaded`` packs restent en mémoire (le moins récemment
+    utilisé est libéré en premier) et un pack inutilisé depuis ``idle_ttl``
+    secondes est libéré au prochain accès au registre.
+    """
+
+    def __init__(self, directory: str = PACKS_DIR, max_loaded: int = MAX_LOADED_PACKS, idle_ttl: float = PACK_IDLE_TTL):
+        self.directory = directory
+        self.max_loaded = max(1, max_loaded)
+        self.idle_ttl = idle_ttl
+        self._packs: "Dict[str, LocalePack]" = {}
+        self._lock = threading.Lock()
+
+    def available(self) -> List[str]:
+        try:
+            entries = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(
+            e for e in entries
+            if os.path.isfile(os.path.join(self.directory, e, "mapping.csv"))
+        )
+
+    def loaded(self) -> List[str]:
+        return list(self._packs)
+
+    def _load(self, locale: str) -> LocalePack:
+        folder = os.path.join(self.directory, locale)
+        mapping_path = os.path.join(folder, "mapping.csv")
+        if not re.fullmatch(r"[a-z]{2}(?:_[A-Z]{2})?", locale) or not os.path.isfile(mapping_path):
+            raise KeyError(locale)
+        sports_path = os.path.join(folder, "sports.csv")
+        sports = read_mapping_csv(sports_path) if os.path.isfile(sports_path) else {}
+        pack = LocalePack(locale, load(mapping_path), sports)
+        print(f"📚 Pack de langue '{locale}' chargé : {len(pack.lexicon)} entrées")
+        return pack
+
+    def _evict(self, now: float) -> None:
+        for locale, pack in list(self._packs.items()):
+            if now - pack.last_used > self.idle_ttl:
+                del self._packs[locale]
+        while len(self._packs) > self.max_loaded:
+            oldest = min(self._packs, key=lambda k: self._packs[k].last_used)
+            del self._packs[oldest]
+
+    def get(self, locale: str) -> LocalePack:
+        """Retourne le pack ``locale`` ; ``KeyError`` s'il n'existe pas."""
+        now = time.monotonic()
+        with self._lock:
+            pack = self._packs.get(locale)
+            if pack is not None and pack.lexicon.source_mtime == _mtime(pack.lexicon.source):
+                pack.last_used = now
+                self._evict(now)
+                return pack
+        pack = self._load(locale)
+        pack.last_used = now
+        with self._lock:
+            self._packs[locale] = pack
+            self._evict(now)
+        return pack
+
+    def clear(self) -> None:
+        with self._lock:
+            self._packs.clear()
+
+
+def _mtime(path: Optional[str]) -> Optional[float]:
+    try:
+        return os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+
+
+class LexiconWatcher:
+    """Surveille le CSV du lexique courant et le recharge quand il change.
+
+    ``get_current`` retourne le lexique en service et ``reload`` le
+    reconstruit puis le remplace ; la vérification (un ``stat`` du fichier)
+    a lieu toutes les ``interval`` secondes dans un thread dédié.
+    """
+
+    def __init__(self, get_current: Callable[[], Lexicon], reload: Callable[[], None], interval: float):
+        self.get_current = get_current
+        self.reload = reload
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def is_stale(self) -> bool:
+        current = self.get_current()
+        if not current.source:
+            return False
+        try:
+            mtime = os.path.getmtime(current.source)
+        except OSError:
+            return False
+        return mtime != current.source_mtime
+
+    def check(self) -> bool:
+        """Recharge si nécessaire ; retourne ``True`` en cas de rechargement."""
+        if not self.is_stale():
+            return False
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"❌ Rechargement du lexique impossible : {e}")
+            return False
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> None:
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="lexicon-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Compile le mapping CSV FR→EN en artefact JSON."
+    )
+    parser.add_argument("csv", nargs="?", default=None, help="Mapping CSV (défaut : data/fr_en_mapping.csv)")
+    parser.add_argument("--output", default=None, help="Chemin de l'artefact (défaut : <csv>.lexicon)")
+    args = parser.parse_args(argv)
+
+    from nutriflow.services import DEFAULT_MAPPING_PATH
+
+    csv_path = args.csv or DEFAULT_MAPPING_PATH
+    lexicon = build(csv_path)
+    output = args.output or artifact_path(csv_path)
+    save(lexicon, output)
+    print(
+        f"📦 Lexique compilé : {len(lexicon)} entrées "
+        f"({len(lexicon.units)} unités, version {lexicon.version}) → {output}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
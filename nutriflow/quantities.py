@@ -0,0 +1,331 @@
+"""Analyse des quantités et unités d'une saisie d'ingrédients.
+
+Une saisie libre (« 2 tranches de pain, 100g de riz et une pomme ») est
+découpée en triplets (quantité, unité, aliment). L'unité est ramenée à son
+nom anglais canonique (``slice``, ``g``…) via le mapping CSV, et la quantité
+convertie en grammes grâce aux tables de masses, volumes, portions et
+densités ci-dessous. Le résultat sert aussi bien aux moteurs nutritionnels
+locaux (catalogue, index produits) qu'à la construction d'une requête
+Nutritionix.
+
+Les expressions régulières sont compilées une seule fois par version du
+mapping des unités.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+# Unités de masse : grammes par unité
+MASS_G: Dict[str, float] = {"g": 1.0, "kg": 1000.0}
+
+# Unités de volume : millilitres par unité
+VOLUME_ML: Dict[str, float] = {
+    "ml": 1.0,
+    "cl": 10.0,
+    "l": 1000.0,
+    "tablespoon": 15.0,
+    "teaspoon": 5.0,
+    "cup": 240.0,
+    "glass": 200.0,
+}
+
+# Poids moyen (g) d'une portion quand il ne dépend pas de l'aliment
+PORTION_G: Dict[str, float] = {
+    "pinch": 0.5,
+    "slice": 30.0,
+    "clove": 5.0,
+    "ball": 60.0,
+    "stick": 10.0,
+    "fillet": 120.0,
+}
+
+# Densités (g/ml) des aliments mesurés en volume ; 1.0 par défaut
+DENSITY_G_ML: Dict[str, float] = {
+    "huile": 0.92,
+    "oil": 0.92,
+    "miel": 1.42,
+    "honey": 1.42,
+    "lait": 1.03,
+    "milk": 1.03,
+    "creme": 1.0,
+    "cream": 1.0,
+    "sucre": 0.85,
+    "sugar": 0.85,
+    "farine": 0.55,
+    "flour": 0.55,
+    "riz": 0.85,
+    "rice": 0.85,
+    "flocons d'avoine": 0.4,
+    "oats": 0.4,
+    "sel": 1.2,
+    "salt": 1.2,
+    "beurre": 0.96,
+    "butter": 0.96,
+    "confiture": 1.3,
+    "jam": 1.3,
+}
+
+# Poids moyen (g) d'une pièce pour les aliments comptés sans unité
+FOOD_UNIT_G: Dict[str, float] = {
+    "oeuf": 50.0,
+    "egg": 50.0,
+    "pomme": 150.0,
+    "apple": 150.0,
+    "banane": 120.0,
+    "banana": 120.0,
+    "orange": 130.0,
+    "poire": 170.0,
+    "pear": 170.0,
+    "kiwi": 75.0,
+    "avocat": 200.0,
+    "avocado": 200.0,
+    "tomate": 120.0,
+    "tomato": 120.0,
+    "carotte": 60.0,
+    "carrot": 60.0,
+    "oignon": 110.0,
+    "onion": 110.0,
+    "yaourt": 125.0,
+    "yogurt": 125.0,
+    "citron": 100.0,
+    "lemon": 100.0,
+}
+
+# Abréviations reconnues en plus du mapping CSV
+UNIT_ALIASES: Dict[str, str] = {
+    "gr": "g",
+    "grs": "g",
+    "tbsp": "tablespoon",
+    "tsp": "teaspoon",
+    "c. a soupe": "tablespoon",
+    "c. a cafe": "teaspoon",
+}
+
+# Nombres écrits en toutes lettres
+NUMBER_WORDS: Dict[str, float] = {
+    "un": 1,
+    "une": 1,
+    "deux": 2,
+    "trois": 3,
+    "quatre": 4,
+    "cinq": 5,
+    "six": 6,
+    "sept": 7,
+    "huit": 8,
+    "neuf": 9,
+    "dix": 10,
+    "douze": 12,
+    "demi": 0.5,
+    "demie": 0.5,
+}
+
+# Fractions unicode, remplacées avant ``clean_text`` qui les déformerait
+_FRACTIONS = {"½": "0.5", "¼": "0.25", "¾": "0.75"}
+
+# Séparateurs entre ingrédients ; une virgule entre deux chiffres est décimale
+_SPLIT_RE = re.compile(r"\s*(?:[;\n+]|,(?!\d)|(?<!\d),|\bet\b|\band\b)\s*", re.I)
+
+# Article ou préposition entre l'unité et l'aliment
+_LINK_RE = re.compile(r"^(?:de la |de l'|du |des |de |d'|of )", re.I)
+
+_QTY = (
+    r"(?P<qty>\d+(?:[.,]\d+)?(?:\s*/\s*\d+)?|(?:"
+    + "|".join(sorted(NUMBER_WORDS, key=len, reverse=True))
+    + r")(?!\w))"
+)
+
+
+class ParsedIngredient(BaseModel):
+    """Ingrédient extrait d'une saisie libre."""
+
+    quantity: Optional[float] = None
+    unit: Optional[str] = None
+    food: str
+    grams: Optional[float] = None
+
+    def to_query(self) -> str:
+        """Formate l'ingrédient pour une requête en langage naturel."""
+        parts = []
+        if self.quantity is not None:
+            parts.append(f"{self.quantity:g}")
+        if self.unit:
+            parts.append(self.unit)
+        parts.append(self.food)
+        return " ".join(parts)
+
+
+def pluralize_fr(word: str) -> Optional[str]:
+    """Pluriel d'une unité française (premier mot), ``None`` si invariable."""
+    head, sep, tail = word.partition(" ")
+    if len(head) <= 2 or head.endswith((".", "s", "x")):
+        return None
+    head += "x" if head.endswith(("au", "eu")) else "s"
+    return head + sep + tail
+
+
+def pluralize_en(unit: str) -> str:
+    """Pluriel d'une unité anglaise ; les symboles (g, ml…) sont invariables."""
+    if unit in MASS_G or unit in ("ml", "cl", "l"):
+        return unit
+    if unit.endswith(("s", "sh", "ch", "x")):
+        return unit + "es"
+    return unit + "s"
+
+
+# Motifs compilés par table d'unités (une par langue), au plus quelques-unes
+_compiled: Dict[int, tuple] = {}
+_MAX_COMPILED = 8
+
+
+def _unit_alternation(forms) -> str:
+    return "|".join(re.escape(f) for f in sorted(forms, key=len, reverse=True))
+
+
+def _compile_units(
+    variants: Optional[Dict[str, str]] = None,
+) -> Tuple[Dict[str, Tuple[str, bool]], re.Pattern, re.Pattern]:
+    """Compile (ou réutilise) les motifs d'une table d'unités (par défaut
+    celle du lexique français courant).
+
+    Retourne la table ``forme -> (unité EN, pluriel)``, le motif de
+    remplacement dans un texte et le motif d'analyse d'un ingrédient.
+    """
+    from nutriflow.services import UNIT_EN, get_unit_variants
+
+    if variants is None:
+        variants = get_unit_variants()
+    cached = _compiled.get(id(variants))
+    if cached is not None and cached[0] is variants:
+        return cached[1:]
+
+    forms: Dict[str, Tuple[str, bool]] = {}
+    for unit in UNIT_EN:
+        forms.setdefault(unit, (unit, False))
+        forms.setdefault(pluralize_en(unit), (unit, True))
+    for fr, en in {**UNIT_ALIASES, **variants}.items():
+        forms[fr] = (en, False)
+        plural = pluralize_fr(fr)
+        if plural and plural not in forms:
+            forms[plural] = (en, True)
+
+    alternation = _unit_alternation(forms)
+    # Une unité n'est reconnue que comme mot entier ; elle peut suivre
+    # directement un chiffre (« 100g »).
+    text_re = re.compile(rf"(?<![^\W\d])(?:{alternation})(?!\w)", re.I)
+    item_re = re.compile(
+        rf"^(?:{_QTY}\s*(?:(?P<unit>{alternation})(?!\w)\.?)?)?\s*(?P<food>.*)$",
+        re.I,
+    )
+    if len(_compiled) >= _MAX_COMPILED:
+        _compiled.clear()
+    _compiled[id(variants)] = (variants, forms, text_re, item_re)
+    return forms, text_re, item_re
+
+
+def normalize_units(text: str, variants: Optional[Dict[str, str]] = None) -> str:
+    """Remplace les unités françaises (ou de la table ``variants``) du texte
+    par leur nom anglais.
+
+    Seuls les mots entiers sont remplacés (« cas » mais pas « cassis ») ;
+    une unité au pluriel donne le pluriel anglais.
+    """
+    from nutriflow.services import clean_text
+
+    forms, text_re, _ = _compile_units(variants)
+
+    def _replace(m: re.Match) -> str:
+        en, plural = forms[m.group(0).lower()]
+        return pluralize_en(en) if plural else en
+
+    return text_re.sub(_replace, clean_text(text))
+
+
+def parse_quantity(value: str) -> Optional[float]:
+    """Convertit « 2 », « 1,5 », « 1/2 » ou « deux » en nombre."""
+    value = value.strip().lower()
+    if value in NUMBER_WORDS:
+        return float(NUMBER_WORDS[value])
+    if "/" in value:
+        num, _, den = value.partition("/")
+        try:
+            return float(num) / float(den)
+        except (ValueError, ZeroDivisionError):
+            return None
+    try:
+        return float(value.replace(",", "."))
+    except ValueError:
+        return None
+
+
+def _lookup_food(table: Dict[str, float], food: Optional[str]) -> Optional[float]:
+    """Cherche un aliment dans une table : nom complet, puis mot par mot
+    (forme singulière comprise)."""
+    if not food:
+        return None
+    from nutriflow.services import clean_text
+
+    name = " ".join(clean_text(food).lower().split())
+    if name in table:
+        return table[name]
+    for word in name.split():
+        for candidate in (word, word.rstrip("sx")):
+            if candidate in table:
+                return table[candidate]
+    return None
+
+
+def to_grams(quantity: Optional[float], unit: Optional[str], food: Optional[str] = None) -> Optional[float]:
+    """Convertit une quantité en grammes, ``None`` si c'est impossible.
+
+    ``unit`` est une unité anglaise canonique (``None`` pour un aliment
+    compté à la pièce).
+    """
+    if quantity is None:
+        return None
+    if unit in MASS_G:
+        return quantity * MASS_G[unit]
+    if unit in VOLUME_ML:
+        return quantity * VOLUME_ML[unit] * (_lookup_food(DENSITY_G_ML, food) or 1.0)
+    if unit in PORTION_G:
+        return quantity * PORTION_G[unit]
+    if unit in (None, "piece"):
+        weight = _lookup_food(FOOD_UNIT_G, food)
+        return quantity * weight if weight is not None else None
+    return None
+
+
+def parse_item(text: str) -> Optional[ParsedIngredient]:
+    """Analyse un ingrédient seul (« 2 tranches de pain »)."""
+    from nutriflow.services import clean_text
+
+    for char, value in _FRACTIONS.items():
+        text = text.replace(char, f" {value} ")
+    text = " ".join(clean_text(text).split())
+    if not text:
+        return None
+    forms, _, item_re = _compile_units()
+    m = item_re.match(text)
+    qty = parse_quantity(m.group("qty")) if m.group("qty") else None
+    unit = forms[m.group("unit").lower()][0] if m.group("unit") else None
+    food = _LINK_RE.sub("", m.group("food").strip()).strip()
+    if not food:
+        return None
+    if qty is None and unit is None:
+        return ParsedIngredient(food=food)
+    if qty is None:
+        qty = 1.0
+    return ParsedIngredient(
+        quantity=qty, unit=unit, food=food, grams=to_grams(qty, unit, food)
+    )
+
+
+def parse_ingredients(text: str) -> List[ParsedIngredient]:
+    """Découpe une saisie libre en ingrédients structurés."""
+    items = []
+    for part in _SPLIT_RE.split(text or ""):
+        item = parse_item(part)
+        if item is not None:
+            items.append(item)
+    return items
@@ -1,13 +1,21 @@
 import os
+import re
+import json
 import requests
 import pandas as pd
+import threading
 import unicodedata
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Dict, Optional, Set, Tuple
 from fastapi import HTTPException
 from datetime import date as dt_date, datetime
 from dotenv import load_dotenv
 
 import nutriflow.db.supabase as db
+from nutriflow.db import food_catalog
+from nutriflow import caching, events, fuzzy, lexicon, quantities
 
 # S'assurer que .env est chargé AVANT de récupérer les variables
 load_dotenv()
@@ -101,8 +109,21 @@ DEFAULT_MAPPING_PATH = os.path.join(
     os.path.dirname(__file__), "..", "data", "fr_en_mapping.csv"
 )
 
-# Dictionnaire chargé depuis le fichier CSV (initialement None)
-_CSV_MAPPING: Optional[Dict[str, str]] = None
+# Vocabulaire français courant, jamais corrigé par l'orthographe approchée
+DEFAULT_VOCABULARY_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "data", "fr_words.txt"
+)
+
+# Lexique compilé depuis le fichier CSV (chargé au premier appel ou au démarrage)
+_LEXICON: Optional[lexicon.Lexicon] = None
+_LEXICON_LOCK = threading.Lock()
+
+# Intervalle (s) de surveillance du CSV pour le rechargement à chaud (0 = désactivé)
+LEXICON_WATCH_INTERVAL = float(os.getenv("NUTRIFLOW_LEXICON_WATCH_INTERVAL", "5"))
+_LEXICON_WATCHER: Optional[lexicon.LexiconWatcher] = None
+
+# Fonctions appelées avec le nouveau lexique après chaque changement de version
+_RELOAD_LISTENERS: List[Callable[[lexicon.Lexicon], None]] = []
 
 # Ensemble des unités anglaises reconnues
 UNIT_EN: set = {
@@ -132,64 +153,121 @@ UNIT_EN: set = {
 
 def load_mapping_csv(filepath: str) -> Dict[str, str]:
     """Charge un CSV "fr,en" ou "fr;en" et retourne un dictionnaire."""
-    # On détecte automatiquement le séparateur utilisé
-    with open(filepath, "r", encoding="utf-8-sig") as f:
-        first_line = f.readline()
-    delimiter = ";" if first_line.count(";") >= first_line.count(",") else ","
+    return lexicon.read_mapping_csv(filepath)
+
+
+def _load_lexicon(path: str) -> lexicon.Lexicon:
+    if os.path.exists(path):
+        return lexicon.load(path)
+    return lexicon.empty(path)
+
+
+def get_lexicon() -> lexicon.Lexicon:
+    """Retourne le lexique FR→EN en service.
+
+    Le lexique est immuable : l'appelant peut conserver la référence le
+    temps d'un traitement sans risquer de voir un rechargement à moitié.
+    """
+    current = _LEXICON
+    if current is not None:
+        return current
+    with _LEXICON_LOCK:
+        if _LEXICON is None:
+            try:
+                _swap_lexicon(_load_lexicon(DEFAULT_MAPPING_PATH))
+            except Exception as e:
+                print(f"❌ Erreur chargement du mapping : {e}")
+                _swap_lexicon(lexicon.empty(DEFAULT_MAPPING_PATH))
+        return _LEXICON
 
-    df = pd.read_csv(filepath, sep=delimiter)
-    mapping = {}
-    for _, row in df.iterrows():
-        fr = clean_text(str(row["fr"]))
-        mapping[fr.lower().strip()] = str(row["en"]).strip()
-    return mapping
+
+def _swap_lexicon(new: lexicon.Lexicon) -> None:
+    """Met en service un lexique entièrement construit (affectation atomique)."""
+    global _LEXICON
+    _LEXICON = new
 
 
 def _ensure_mapping_loaded() -> None:
     """Charge le mapping CSV par défaut au premier appel."""
-    global _CSV_MAPPING
-    if _CSV_MAPPING is None:
-        if os.path.exists(DEFAULT_MAPPING_PATH):
+    get_lexicon()
+
+
+def reload_mapping(filepath: Optional[str] = None) -> lexicon.Lexicon:
+    """Recharge le mapping depuis ``filepath`` ou le CSV du lexique courant.
+
+    Le nouveau lexique est construit à part puis substitué à l'ancien ; en
+    cas d'erreur, l'ancien reste en service. Retourne le lexique chargé.
+    """
+    current = _LEXICON
+    path = filepath or (current.source if current and current.source else DEFAULT_MAPPING_PATH)
+    new = _load_lexicon(path)
+    with _LEXICON_LOCK:
+        previous = _LEXICON
+        _swap_lexicon(new)
+    if previous is None or previous.version != new.version:
+        clear_translation_cache()
+        print(f"📚 Lexique FR→EN {new.version} en service : {len(new)} entrées")
+        for listener in list(_RELOAD_LISTENERS):
             try:
-                _CSV_MAPPING = load_mapping_csv(DEFAULT_MAPPING_PATH)
-            except Exception:
-                _CSV_MAPPING = {}
-        else:
-            _CSV_MAPPING = {}
+                listener(new)
+            except Exception as e:
+                print(f"❌ Erreur après rechargement du lexique : {e}")
+    return new
 
 
-def reload_mapping(filepath: Optional[str] = None) -> None:
-    """Recharge le mapping depuis ``filepath`` ou le chemin par défaut."""
-    global _CSV_MAPPING, DEFAULT_MAPPING_PATH
-    path = filepath or DEFAULT_MAPPING_PATH
-    if filepath:
-        DEFAULT_MAPPING_PATH = filepath
-    if os.path.exists(path):
-        _CSV_MAPPING = load_mapping_csv(path)
-    else:
-        _CSV_MAPPING = {}
+def on_lexicon_reload(listener: Callable[[lexicon.Lexicon], None]) -> None:
+    """Enregistre ``listener``, appelé avec le nouveau lexique à chaque
+    changement de version (caches dérivés à reconstruire)."""
+    if listener not in _RELOAD_LISTENERS:
+        _RELOAD_LISTENERS.append(listener)
+
+
+def start_lexicon_watcher(interval: float = LEXICON_WATCH_INTERVAL) -> Optional[lexicon.LexiconWatcher]:
+    """Démarre la surveillance du CSV (rechargement à chaud)."""
+    global _LEXICON_WATCHER
+    if interval <= 0 or _LEXICON_WATCHER is not None:
+        return _LEXICON_WATCHER
+    _LEXICON_WATCHER = lexicon.LexiconWatcher(get_lexicon, reload_mapping, interval)
+    _LEXICON_WATCHER.start()
+    return _LEXICON_WATCHER
+
+
+def stop_lexicon_watcher() -> None:
+    global _LEXICON_WATCHER
+    if _LEXICON_WATCHER is not None:
+        _LEXICON_WATCHER.stop()
+        _LEXICON_WATCHER = None
 
 
 def get_unit_variants() -> Dict[str, str]:
-    """Retourne le mapping complet des unités FR → EN."""
-    _ensure_mapping_loaded()
-    return {fr: en for fr, en in (_CSV_MAPPING or {}).items() if en in UNIT_EN}
+    """Retourne le mapping complet des unités FR → EN.
+
+    Le dictionnaire appartient au lexique courant et ne doit pas être
+    modifié par l'appelant.
+    """
+    return get_lexicon().units
+
+
+def get_food_mapping() -> Dict[str, str]:
+    """Retourne les entrées du mapping CSV qui ne sont pas des unités."""
+    return get_lexicon().foods
 
 
 def normalize_unit(unit: str) -> str:
     """Normalise une unité française en anglais via le mapping."""
-    _ensure_mapping_loaded()
     key = clean_text(unit).lower().strip()
-    return (_CSV_MAPPING or {}).get(key, unit)
+    return get_lexicon().mapping.get(key, unit)
+
 
+def normalize_units_text(text: str, locale: Optional[str] = None) -> str:
+    """Remplace dans le texte toutes les unités françaises (ou de la langue
+    ``locale``) par leur équivalent anglais.
 
-def normalize_units_text(text: str) -> str:
-    """Remplace dans le texte toutes les unités françaises par leur équivalent anglais."""
-    _ensure_mapping_loaded()
-    mapping = get_unit_variants()
-    for fr, en in sorted(mapping.items(), key=lambda i: len(i[0]), reverse=True):
-        text = text.replace(fr, en)
-    return text
+    Seuls les mots entiers sont remplacés (voir ``quantities.normalize_units``).
+    """
+    if locale and locale != "fr":
+        return quantities.normalize_units(text, get_locale_pack(locale).lexicon.units)
+    return quantities.normalize_units(text)
 
 
 def clean_text(text: str) -> str:
@@ -280,38 +358,312 @@ MANUAL_CORRECTIONS: Dict[str, str] = {
 }
 
 
-def translate_fr_en(text_fr: str) -> str:
-    _ensure_mapping_loaded()
-    texte = clean_text(text_fr).lower()
-    # On applique d'abord le mapping issu du CSV
-    # On applique le mapping du CSV en remplaçant d'abord les clés les plus longues
-    for fr, en in sorted(
-        (_CSV_MAPPING or {}).items(), key=lambda item: len(item[0]), reverse=True
-    ):
-        texte = texte.replace(fr, en)
-    # Puis le mapping manuel, également trié par taille
-    for fr, en in sorted(
-        MANUAL_CORRECTIONS.items(), key=lambda item: len(item[0]), reverse=True
-    ):
-        texte = texte.replace(fr, en)
-    from googletrans import Translator
-
-    translator = Translator()
+_MANUAL_MATCHER: Optional[lexicon.PhraseMatcher] = None
+
+
+def _manual_matcher() -> lexicon.PhraseMatcher:
+    """Compile une fois les corrections manuelles (clés sans accents)."""
+    global _MANUAL_MATCHER
+    if _MANUAL_MATCHER is None:
+        _MANUAL_MATCHER = lexicon.PhraseMatcher(
+            {clean_text(fr).lower(): en.strip() for fr, en in MANUAL_CORRECTIONS.items()}
+        )
+    return _MANUAL_MATCHER
+
+
+def warm_up() -> None:
+    """Charge le lexique, compile les motifs et construit les index de
+    correction orthographique avant la première requête."""
+    lex = get_lexicon()
+    _manual_matcher()
+    _spelling_indexes()
+    quantities.normalize_units("")
+    print(f"📚 Lexique FR→EN {lex.version} chargé : {len(lex)} entrées")
+
+
+# Nombre de traductions FR→EN mémorisées (LRU)
+TRANSLATION_CACHE_SIZE = int(os.getenv("NUTRIFLOW_TRANSLATION_CACHE_SIZE", "4096"))
+
+_TRANSLATIONS: "OrderedDict[str, str]" = OrderedDict()
+_TRANSLATIONS_LOCK = threading.Lock()
+_translation_stats = {"hits": 0, "misses": 0}
+
+# Client de traduction réutilisé, créé au premier appel
+_TRANSLATOR = None
+_TRANSLATOR_LOCK = threading.Lock()
+
+
+def clear_translation_cache() -> None:
+    """Vide le cache des traductions (rechargement du lexique...)."""
+    with _TRANSLATIONS_LOCK:
+        _TRANSLATIONS.clear()
+
+
+def translation_cache_stats() -> Dict:
+    with _TRANSLATIONS_LOCK:
+        stats = dict(_translation_stats)
+        stats["size"] = len(_TRANSLATIONS)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def _get_translator():
+    """Retourne le client googletrans partagé, créé une seule fois."""
+    global _TRANSLATOR
+    translator = _TRANSLATOR
+    if translator is None:
+        with _TRANSLATOR_LOCK:
+            if _TRANSLATOR is None:
+                from googletrans import Translator
+
+                _TRANSLATOR = Translator()
+            translator = _TRANSLATOR
+    return translator
+
+
+def reset_translator() -> None:
+    """Oublie le client de traduction et les traductions mémorisées : le
+    prochain appel recrée le client (tests, changement de configuration)."""
+    global _TRANSLATOR
+    with _TRANSLATOR_LOCK:
+        _TRANSLATOR = None
+    clear_translation_cache()
+
+
+def _cache_get(key: str) -> Optional[str]:
+    with _TRANSLATIONS_LOCK:
+        cached = _TRANSLATIONS.get(key)
+        if cached is None:
+            _translation_stats["misses"] += 1
+            return None
+        _TRANSLATIONS.move_to_end(key)
+        _translation_stats["hits"] += 1
+        return cached
+
+
+def _cache_put(key: str, value: str) -> None:
+    with _TRANSLATIONS_LOCK:
+        _TRANSLATIONS[key] = value
+        if len(_TRANSLATIONS) > TRANSLATION_CACHE_SIZE:
+            _TRANSLATIONS.popitem(last=False)
+
+
+# Langue de saisie par défaut : le lexique français intégré (CSV, corrections
+# manuelles, SPORTS_MAPPING). Les autres langues sont des packs chargés à la
+# demande depuis ``data/lexicons/<locale>/``.
+DEFAULT_LOCALE = "fr"
+
+_PACKS = lexicon.PackRegistry()
+
+
+def _is_default_locale(locale: Optional[str]) -> bool:
+    return not locale or locale == DEFAULT_LOCALE
+
+
+def available_locales() -> List[str]:
+    return [DEFAULT_LOCALE, *(l for l in _PACKS.available() if l != DEFAULT_LOCALE)]
+
+
+def get_locale_pack(locale: str) -> lexicon.LocalePack:
+    """Retourne le pack d'une langue autre que le français (chargé à la
+    demande) ; HTTP 400 si la langue n'est pas prise en charge."""
     try:
-        result = translator.translate(texte, src="fr", dest="en")
+        return _PACKS.get(locale)
+    except KeyError:
+        raise HTTPException(
+            status_code=400, detail=f"Langue non prise en charge : {locale}"
+        )
+
+
+def get_locale_lexicon(locale: Optional[str] = DEFAULT_LOCALE) -> lexicon.Lexicon:
+    if _is_default_locale(locale):
+        return get_lexicon()
+    return get_locale_pack(locale).lexicon
+
+
+def lexicon_packs_info() -> Dict:
+    return {"available": available_locales(), "loaded": _PACKS.loaded()}
+
+
+def _spelling_indexes(locale: Optional[str] = DEFAULT_LOCALE) -> List[fuzzy.FuzzyIndex]:
+    """Index approchés du lexique de la langue (CSV et corrections
+    manuelles) et, en français, des alias français du catalogue.
+
+    Les noms anglais du catalogue n'y figurent jamais : la saisie est
+    corrigée vers des mots de sa propre langue uniquement.
+    """
+    lex = get_locale_lexicon(locale)
+    manual = _manual_matcher().table if _is_default_locale(locale) else {}
+    lexicon_index = fuzzy.get_index(
+        f"lexicon:{locale or DEFAULT_LOCALE}",
+        lex.version,
+        lambda: fuzzy.vocabulary([*lex.mapping, *manual]),
+    )
+    if not _is_default_locale(locale):
+        return [lexicon_index]
+    path = food_catalog.get_catalog_path()
+    catalog_index = fuzzy.get_index(
+        "catalog", path, lambda: fuzzy.vocabulary(food_catalog.list_names(path, lang="fr"))
+    )
+    return [lexicon_index, catalog_index]
+
+
+def _index_learned_names(path: str, names: List[str]) -> None:
+    """Complète l'index approché du catalogue avec les alias appris, sans
+    le reconstruire."""
+    fuzzy.add_terms("catalog", path, fuzzy.vocabulary(names))
+
+
+food_catalog.on_learn(_index_learned_names)
+
+
+_VOCABULARY: Optional[frozenset] = None
+
+
+def _french_vocabulary() -> frozenset:
+    """Mots français valides de ``data/fr_words.txt`` (chargés une fois)."""
+    global _VOCABULARY
+    if _VOCABULARY is None:
+        words = set()
+        try:
+            with open(DEFAULT_VOCABULARY_PATH, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        words.add(clean_text(line).lower())
+        except OSError as e:
+            print(f"⚠️ Vocabulaire français indisponible : {e}")
+        _VOCABULARY = frozenset(words)
+    return _VOCABULARY
+
+
+def correct_spelling(texte: str, locale: Optional[str] = DEFAULT_LOCALE) -> str:
+    """Corrige les fautes de frappe d'un texte nettoyé (« poullet » →
+    « poulet ») d'après les noms du lexique et les alias français du
+    catalogue.
+
+    Seuls les mots inconnus de ces index et du vocabulaire français courant
+    sont corrigés : « poivre » (proche de « poire ») ou « frais » restent
+    tels quels et seront traduits par le traducteur externe.
+    """
+    known = _french_vocabulary() if _is_default_locale(locale) else frozenset()
+    return fuzzy.correct(texte, _spelling_indexes(locale), known)
+
+
+def _apply_lexicon(texte: str, locale: Optional[str] = DEFAULT_LOCALE) -> str:
+    # Les fautes de frappe des mots inconnus sont corrigées avant tout
+    # (les locutions du lexique restent reconnues), puis on applique le
+    # mapping issu du CSV (locution la plus longue d'abord, sur des mots
+    # entiers) et enfin le mapping manuel (français uniquement)
+    texte = get_locale_lexicon(locale).translate(correct_spelling(texte, locale))
+    if not _is_default_locale(locale):
+        return texte
+    return _manual_matcher().translate(texte)
+
+
+def _cache_key(texte: str, locale: Optional[str]) -> str:
+    return texte if _is_default_locale(locale) else f"{locale}|{texte}"
+
+
+def translate_to_en(text: str, locale: Optional[str] = DEFAULT_LOCALE) -> str:
+    """Traduit un texte saisi dans ``locale`` en anglais (lexique, puis
+    traducteur externe pour le reste)."""
+    translator = _get_translator()
+    key = clean_text(text).lower()
+    cached = _cache_get(_cache_key(key, locale))
+    if cached is not None:
+        return cached
+
+    texte = _apply_lexicon(key, locale)
+    try:
+        result = translator.translate(texte, src=locale or DEFAULT_LOCALE, dest="en")
         print(f"🔁 Texte envoyé à Nutritionix : {texte} → {result.text}")
-        return result.text
     except Exception as e:
+        # Un échec n'est pas mémorisé : la traduction sera retentée
         print(f"❌ Erreur traduction : {e}")
         return texte
+    _cache_put(_cache_key(key, locale), result.text)
+    return result.text
+
 
+def translate_fr_en(text_fr: str) -> str:
+    return translate_to_en(text_fr, DEFAULT_LOCALE)
+
+
+def _translate_lines(translator, lines: List[str], src: str = DEFAULT_LOCALE) -> List[Optional[str]]:
+    """Traduit plusieurs lignes en un seul appel au traducteur.
+
+    Si le découpage de la réponse ne correspond pas aux lignes envoyées,
+    chaque ligne est retraduite séparément. ``None`` signale un échec.
+    """
+    try:
+        result = translator.translate("\n".join(lines), src=src, dest="en")
+        outputs = result.text.split("\n")
+        if len(outputs) == len(lines):
+            print(f"🔁 {len(lines)} textes traduits en un appel")
+            return [o.strip() for o in outputs]
+        print("⚠️ Traduction groupée désalignée, traduction ligne à ligne")
+    except Exception as e:
+        print(f"❌ Erreur traduction groupée : {e}")
+    outputs: List[Optional[str]] = []
+    for line in lines:
+        try:
+            outputs.append(translator.translate(line, src=src, dest="en").text)
+        except Exception as e:
+            print(f"❌ Erreur traduction : {e}")
+            outputs.append(None)
+    return outputs
+
+
+def translate_many(texts: List[str], locale: Optional[str] = DEFAULT_LOCALE) -> List[str]:
+    """Traduit une liste de textes vers l'anglais, dans l'ordre d'entrée.
+
+    Les doublons et les textes déjà en cache ne sont traduits qu'une fois ;
+    les autres passent par le lexique puis sont envoyés ensemble au
+    traducteur en un seul appel (un texte sur plusieurs lignes, qui ne peut
+    pas être regroupé, passe par ``translate_to_en``).
+    """
+    translator = _get_translator()
+    keys = [clean_text(t).lower() for t in texts]
+    results: Dict[str, str] = {}
+    pending: List[str] = []
+    for key in dict.fromkeys(keys):
+        if not key:
+            results[key] = key
+            continue
+        if "\n" in key:
+            results[key] = translate_to_en(key, locale)
+            continue
+        cached = _cache_get(_cache_key(key, locale))
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending.append(key)
+
+    if pending:
+        prepared = [_apply_lexicon(k, locale) for k in pending]
+        outputs = _translate_lines(translator, prepared, locale or DEFAULT_LOCALE)
+        for key, texte, out in zip(pending, prepared, outputs):
+            if out is None:
+                results[key] = texte
+            else:
+                results[key] = out
+                _cache_put(_cache_key(key, locale), out)
+    return [results[k] for k in keys]
 
-def translate_activity_fr_en(text_fr: str) -> str:
+
+def translate_activity_fr_en(text_fr: str, locale: Optional[str] = DEFAULT_LOCALE) -> str:
     """Traduit une activité sportive en anglais.
 
-    Utilise d'abord un mapping manuel puis la fonction centrale de
-    traduction pour le reste.
+    Utilise d'abord un mapping manuel (celui du pack pour une autre langue
+    que le français) puis la fonction centrale de traduction pour le reste.
     """
+    if not _is_default_locale(locale):
+        pack = get_locale_pack(locale)
+        texte = pack.sports_matcher.translate(clean_text(text_fr).lower())
+        return translate_to_en(texte, locale)
+
     texte = text_fr.lower()
     # On remplace d'abord les termes français par leurs équivalents anglais
     # en triant les clés par longueur pour éviter les collisions
@@ -332,14 +684,76 @@ def translate_activity_fr_en(text_fr: str) -> str:
     return translate_fr_en(texte)
 
 
+# Champs OpenFoodFacts réellement exploités : on ne télécharge que ceux-ci
+# plutôt que la fiche complète (toutes langues, toutes variantes d'images).
+OFF_PRODUCT_FIELDS: List[str] = [
+    "code",
+    "product_name",
+    "brands",
+    "quantity",
+    "categories",
+    "image_url",
+    "image_front_url",
+    "image_nutrition_url",
+    "image_ingredients_url",
+    "nutriments",
+    "nutriscore_grade",
+    "nutriscore_score",
+    "ecoscore_grade",
+    "ecoscore_score",
+    "nova_group",
+    "labels_tags",
+    "additives_tags",
+    "allergens_tags",
+    "traces_tags",
+    "ingredients_text_fr",
+    "ingredients",
+    "manufacturing_places",
+    "countries",
+    "packaging",
+    "product_quantity",
+    "serving_size",
+    "nova_groups_tags",
+    "categories_tags",
+]
+
+# Champs nécessaires pour un résultat de recherche
+OFF_SEARCH_FIELDS: List[str] = ["code", "product_name", "brands", "nutriments"]
+
+# Nombre de produits demandés à la recherche OpenFoodFacts
+OFF_SEARCH_PAGE_SIZE = int(os.getenv("NUTRIFLOW_OFF_SEARCH_PAGE_SIZE", "1"))
+
+# Délai maximal (secondes) d'un appel OpenFoodFacts
+OFF_TIMEOUT = float(os.getenv("NUTRIFLOW_OFF_TIMEOUT", "10"))
+
+
+def _get_off_json(url: str, params: Optional[Dict] = None) -> Dict:
+    """Appelle OpenFoodFacts et décode la réponse JSON en flux.
+
+    Le corps est lu directement depuis le socket (décompression gzip
+    incluse) sans être d'abord copié en entier en mémoire.
+    """
+    with requests.get(url, params=params, stream=True, timeout=OFF_TIMEOUT) as resp:
+        resp.raise_for_status()
+        resp.raw.decode_content = True
+        return json.load(resp.raw)
+
+
 def get_off_search_nutrition(query: str) -> Optional[Dict]:
     """
     Recherche d'un produit sur OpenFoodFacts par termes de recherche.
     Retourne un dict ou None.
     """
     url = "https://world.openfoodfacts.org/cgi/search.pl"
-    params = {"search_terms": query, "search_simple": 1, "action": "process", "json": 1}
-    data = requests.get(url, params=params).json()
+    params = {
+        "search_terms": query,
+        "search_simple": 1,
+        "action": "process",
+        "json": 1,
+        "page_size": OFF_SEARCH_PAGE_SIZE,
+        "fields": ",".join(OFF_SEARCH_FIELDS),
+    }
+    data = _get_off_json(url, params)
     if data.get("products"):
         p = data["products"][0]
         n = p.get("nutriments", {})
@@ -356,58 +770,61 @@ def get_off_search_nutrition(query: str) -> Optional[Dict]:
     return None
 
 
+def off_product_to_record(p: Dict, barcode: Optional[str] = None) -> Dict:
+    """Réduit une fiche produit OpenFoodFacts aux champs conservés dans
+    la table ``products``."""
+    n = p.get("nutriments") or {}
+    return {
+        "barcode": p.get("code", barcode),
+        "name": p.get("product_name", "Inconnu"),
+        "brand": p.get("brands", "Inconnue"),
+        "quantity": p.get("quantity"),
+        "categories": p.get("categories"),
+        "image_url": p.get("image_url"),
+        "image_front_url": p.get("image_front_url"),
+        "image_nutrition_url": p.get("image_nutrition_url"),
+        "image_ingredients_url": p.get("image_ingredients_url"),
+        "energy_kcal_per_100g": n.get("energy-kcal_100g"),
+        "fat_per_100g": n.get("fat_100g"),
+        "carbs_per_100g": n.get("carbohydrates_100g"),
+        "sugars_per_100g": n.get("sugars_100g"),
+        "proteins_per_100g": n.get("proteins_100g"),
+        "salt_per_100g": n.get("salt_100g"),
+        "nutriscore_grade": p.get("nutriscore_grade"),
+        "nutriscore_score": p.get("nutriscore_score"),
+        "ecoscore_grade": p.get("ecoscore_grade"),
+        "ecoscore_score": p.get("ecoscore_score"),
+        "nova_group": p.get("nova_group"),
+        "labels_tags": ", ".join(p.get("labels_tags") or []),
+        "additives_tags": ", ".join(p.get("additives_tags") or []),
+        "allergens_tags": ", ".join(p.get("allergens_tags") or []),
+        "traces_tags": ", ".join(p.get("traces_tags") or []),
+        "ingredients_text_fr": p.get("ingredients_text_fr"),
+        "ingredients_list": p.get("ingredients") or [],
+        "manufacturing_places": p.get("manufacturing_places"),
+        "countries": p.get("countries"),
+        "packaging": p.get("packaging"),
+        "product_quantity": p.get("product_quantity"),
+        "serving_size": p.get("serving_size"),
+        "nova_groups_tags": ", ".join(p.get("nova_groups_tags") or []),
+        "categories_tags": ", ".join(p.get("categories_tags") or []),
+    }
+
+
 def get_off_nutrition_by_barcode(barcode: str) -> Optional[Dict]:
     """Récupère les informations nutritionnelles via code-barres sur
     OpenFoodFacts et retourne un dictionnaire complet ou ``None``."""
 
     url = f"https://world.openfoodfacts.org/api/v0/product/{barcode}.json"
-    data = requests.get(url).json()
+    data = _get_off_json(url, {"fields": ",".join(OFF_PRODUCT_FIELDS)})
     if data.get("status") == 1:
-        p = data["product"]
-        n = p.get("nutriments", {})
-        return {
-            "barcode": p.get("code", barcode),
-            "name": p.get("product_name", "Inconnu"),
-            "brand": p.get("brands", "Inconnue"),
-            "quantity": p.get("quantity"),
-            "categories": p.get("categories"),
-            "image_url": p.get("image_url"),
-            "image_front_url": p.get("image_front_url"),
-            "image_nutrition_url": p.get("image_nutrition_url"),
-            "image_ingredients_url": p.get("image_ingredients_url"),
-            "energy_kcal_per_100g": n.get("energy-kcal_100g"),
-            "fat_per_100g": n.get("fat_100g"),
-            "carbs_per_100g": n.get("carbohydrates_100g"),
-            "sugars_per_100g": n.get("sugars_100g"),
-            "proteins_per_100g": n.get("proteins_100g"),
-            "salt_per_100g": n.get("salt_100g"),
-            "nutriscore_grade": p.get("nutriscore_grade"),
-            "nutriscore_score": p.get("nutriscore_score"),
-            "ecoscore_grade": p.get("ecoscore_grade"),
-            "ecoscore_score": p.get("ecoscore_score"),
-            "nova_group": p.get("nova_group"),
-            "labels_tags": ", ".join(p.get("labels_tags", [])),
-            "additives_tags": ", ".join(p.get("additives_tags", [])),
-            "allergens_tags": ", ".join(p.get("allergens_tags", [])),
-            "traces_tags": ", ".join(p.get("traces_tags", [])),
-            "ingredients_text_fr": p.get("ingredients_text_fr"),
-            "ingredients_list": p.get("ingredients", []),
-            "manufacturing_places": p.get("manufacturing_places"),
-            "countries": p.get("countries"),
-            "packaging": p.get("packaging"),
-            "product_quantity": p.get("product_quantity"),
-            "serving_size": p.get("serving_size"),
-            "nova_groups_tags": ", ".join(p.get("nova_groups_tags", [])),
-            "categories_tags": ", ".join(p.get("categories_tags", [])),
-        }
+        return off_product_to_record(data["product"], barcode)
     return None
 
 
-def analyze_ingredients_nutritionix(text_fr: str) -> List[Dict]:
-    """
-    Analyse d'ingrédients via Nutritionix Natural Language API.
-    """
-    query = translate_fr_en(text_fr)
+def _natural_nutrients(query: str) -> List[Dict]:
+    """Appelle l'endpoint Nutritionix ``natural/nutrients`` pour une requête
+    déjà en anglais ; les aliments renvoyés enrichissent le catalogue."""
     print(f"\N{CLOCKWISE OPEN CIRCLE ARROW} Requête envoyée à Nutritionix : {query}")
     url = "https://trackapi.nutritionix.com/v2/natural/nutrients"
     headers = {
@@ -417,7 +834,127 @@ def analyze_ingredients_nutritionix(text_fr: str) -> List[Dict]:
     }
     resp = requests.post(url, headers=headers, json={"query": query})
     resp.raise_for_status()
-    return resp.json().get("foods", [])
+    foods = resp.json().get("foods", [])
+    for food in foods:
+        food_catalog.learn(food)
+    return foods
+
+
+def analyze_ingredients_nutritionix(text_fr: str, locale: str = DEFAULT_LOCALE) -> List[Dict]:
+    """
+    Analyse d'ingrédients via Nutritionix Natural Language API.
+    """
+    return _natural_nutrients(translate_to_en(text_fr, locale))
+
+
+def _words(text: str) -> set:
+    return {w.rstrip("s") for w in re.findall(r"[a-z]+", clean_text(text or "").lower())}
+
+
+def _numbers(text: str) -> Set[float]:
+    return {float(n) for n in re.findall(r"\d+(?:\.\d+)?", text or "")}
+
+
+def match_foods_to_lines(foods: List[Dict], lines: List[str]) -> List[Optional[Dict]]:
+    """Associe les aliments d'une réponse Nutritionix aux lignes de la requête.
+
+    Nutritionix peut réordonner ou fusionner les lignes : un aliment est
+    d'abord associé à la seule ligne contenant tous les mots de son nom (ou
+    de ``tags.item``), la quantité (``serving_qty``) départageant plusieurs
+    lignes candidates ; à défaut de nom reconnu, à la seule ligne portant sa
+    quantité. L'ordre ne sert qu'en dernier recours, quand il y a autant
+    d'aliments que de lignes : les lignes et aliments restés sans
+    correspondance sont alors appariés dans l'ordre.
+    Une ligne sans correspondance unique reste à ``None``.
+    """
+    line_words = [_words(line) for line in lines]
+    line_numbers = [_numbers(line) for line in lines]
+    candidates: List[List[int]] = []
+    for food in foods:
+        names = [food.get("food_name"), (food.get("tags") or {}).get("item")]
+        hits = [
+            i for i, words in enumerate(line_words)
+            if any(n and _words(n) and _words(n) <= words for n in names)
+        ]
+        qty = food.get("serving_qty")
+        if len(hits) != 1 and qty is not None:
+            by_qty = [i for i in (hits or range(len(lines))) if float(qty) in line_numbers[i]]
+            if len(by_qty) == 1:
+                hits = by_qty
+        candidates.append(hits)
+
+    matches: List[List[int]] = [[] for _ in lines]
+    for f, hits in enumerate(candidates):
+        if len(hits) == 1:
+            matches[hits[0]].append(f)
+    result = [foods[m[0]] if len(m) == 1 else None for m in matches]
+    if len(foods) == len(lines):
+        # Lignes et aliments restés sans correspondance, appariés dans l'ordre
+        free_lines = [i for i, m in enumerate(matches) if not m]
+        free_foods = [f for f, hits in enumerate(candidates) if not hits]
+        if len(free_lines) == len(free_foods):
+            for i, f in zip(free_lines, free_foods):
+                result[i] = foods[f]
+    return result
+
+
+def analyze_ingredients_batch(
+    queries: List[str], locale: str = DEFAULT_LOCALE
+) -> List[Optional[Dict]]:
+    """Analyse plusieurs ingrédients en un seul appel Nutritionix.
+
+    Les requêtes sont traduites ensemble (``translate_many``) puis envoyées
+    sur des lignes séparées. Retourne, pour chaque requête, l'aliment
+    correspondant ou ``None`` s'il n'a pas pu être identifié (l'appelant
+    l'analyse alors séparément).
+    """
+    if not queries:
+        return []
+    lines = [line.replace("\n", " ") for line in translate_many(queries, locale)]
+    try:
+        foods = _natural_nutrients("\n".join(lines))
+    except Exception as e:
+        print(f"❌ Analyse groupée Nutritionix impossible : {e}")
+        return [None] * len(queries)
+    return match_foods_to_lines(foods, lines)
+
+
+def quantity_to_grams(qty: float, unit: str, entry: Optional[Dict] = None) -> Optional[float]:
+    """Convertit une quantité en grammes.
+
+    Gère les unités de masse et, pour un aliment du catalogue, son unité de
+    portion de référence (ex. ``slice`` pour le pain) ; une pièce vaut alors
+    une portion de référence. Les volumes et portions génériques passent par
+    les tables de ``quantities``. Retourne ``None`` si la conversion n'est
+    pas possible.
+    """
+    u = normalize_unit(unit or "g").lower()
+    if u in quantities.MASS_G:
+        return qty * quantities.MASS_G[u]
+    if entry and entry.get("serving_unit") and entry.get("serving_qty"):
+        serving_unit = normalize_unit(entry["serving_unit"]).lower()
+        if u in (serving_unit, "piece", "serving") or u.rstrip("s") == serving_unit.rstrip("s"):
+            return qty * entry["serving_weight_grams"] / entry["serving_qty"]
+    return quantities.to_grams(qty, u, entry["en_name"] if entry else None)
+
+
+def resolve_food_from_catalog(name: str, qty: float, unit: str) -> Optional[Dict]:
+    """Résout un aliment depuis le catalogue local, mis à l'échelle de la
+    quantité demandée. Retourne ``None`` si l'aliment ou l'unité est inconnu."""
+    entry = food_catalog.lookup(name, count=False)
+    if not entry:
+        key = food_catalog.normalize_name(name)
+        corrected = correct_spelling(key)
+        if corrected != key:
+            entry = food_catalog.lookup(corrected, count=False)
+    # Une seule recherche comptée, correction orthographique comprise
+    food_catalog.count_lookup(entry is not None)
+    if not entry:
+        return None
+    grams = quantity_to_grams(qty, unit, entry)
+    if grams is None:
+        return None
+    return food_catalog.to_nutritionix_food(entry, grams)
 
 
 def convert_nutritionix_to_df(foods: List[Dict]) -> pd.DataFrame:
@@ -452,13 +989,49 @@ def calculate_totals(df: pd.DataFrame) -> Dict[str, float]:
     }
 
 
+# Colonnes absolues de meal_items et colonnes de densité pour 100 g associées
+DENSITY_FIELDS: Dict[str, str] = {
+    "calories": "calories_100g",
+    "proteines_g": "proteines_100g",
+    "glucides_g": "glucides_100g",
+    "lipides_g": "lipides_100g",
+}
+
+
+def nutrient_densities(values: Dict, grams: Optional[float]) -> Dict[str, Optional[float]]:
+    """Calcule les valeurs pour 100 g à partir des valeurs absolues d'une portion."""
+    if not grams:
+        return {col: None for col in DENSITY_FIELDS.values()}
+    return {
+        col: (values.get(field) or 0) * 100.0 / grams
+        for field, col in DENSITY_FIELDS.items()
+    }
+
+
+def scale_nutrients(densities: Dict, grams: float) -> Optional[Dict[str, float]]:
+    """Recalcule les valeurs absolues d'une portion depuis les valeurs pour 100 g.
+
+    Retourne ``None`` si une densité manque.
+    """
+    if any(densities.get(col) is None for col in DENSITY_FIELDS.values()):
+        return None
+    return {
+        field: densities[col] * grams / 100.0 for field, col in DENSITY_FIELDS.items()
+    }
+
+
 def analyze_exercise_nutritionix(
-    text_fr: str, weight_kg: float, height_cm: float, age: int, gender: str = "male"
+    text_fr: str,
+    weight_kg: float,
+    height_cm: float,
+    age: int,
+    gender: str = "male",
+    locale: str = DEFAULT_LOCALE,
 ) -> List[Dict]:
     """
     Analyse d'activité via Nutritionix Exercise API.
     """
-    query = translate_activity_fr_en(text_fr)
+    query = translate_activity_fr_en(text_fr, locale)
     print(f"🔁 Requête envoyée à Nutritionix : {query}")
     url = "https://trackapi.nutritionix.com/v2/natural/exercise"
     headers = {
@@ -582,8 +1155,58 @@ def generate_conseil(objectif: str, balance: float) -> str:
     return "Léger surplus, surveillez si ce n’est pas souhaité."
 
 
-def update_daily_summary(user_id: str, date: Optional[str] = None) -> Dict:
-    """Agrège repas et activités d'une journée et met à jour `daily_summary`."""
+# Bilans à recalculer en fin de lot (``defer_daily_summaries``) ; ``None``
+# hors d'un lot : le recalcul est immédiat
+_DEFERRED_SUMMARIES: ContextVar[Optional[Set[Tuple[str, str]]]] = ContextVar(
+    "deferred_summaries", default=None
+)
+
+
+@contextmanager
+def defer_daily_summaries() -> Iterator[Set[Tuple[str, str]]]:
+    """Diffère les recalculs de ``daily_summary`` du contexte courant.
+
+    Les appels à ``update_daily_summary`` faits dans le bloc (y compris dans
+    les threads qui héritent du contexte) se contentent de noter le couple
+    (utilisateur, jour) dans l'ensemble retourné ; l'appelant le passe
+    ensuite à ``flush_daily_summaries``.
+    """
+    pending: Set[Tuple[str, str]] = set()
+    token = _DEFERRED_SUMMARIES.set(pending)
+    try:
+        yield pending
+    finally:
+        _DEFERRED_SUMMARIES.reset(token)
+
+
+def flush_daily_summaries(pending: Set[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict]:
+    """Recalcule une fois chaque bilan différé."""
+    results = {}
+    for user_id, date_str in sorted(pending):
+        try:
+            results[(user_id, date_str)] = update_daily_summary(
+                user_id, date_str, defer=False
+            )
+        except Exception as e:
+            print(f"❌ Recalcul différé du bilan {user_id}/{date_str} : {e}")
+            results[(user_id, date_str)] = {}
+    return results
+
+
+def summary_topic(user_id: str, date_str: str) -> tuple:
+    """Sujet pub/sub notifié après chaque recalcul du bilan d'un jour."""
+    return ("summary", user_id, str(date_str)[:10])
+
+
+def update_daily_summary(
+    user_id: str, date: Optional[str] = None, defer: bool = True
+) -> Dict:
+    """Agrège repas et activités d'une journée et met à jour `daily_summary`.
+
+    Dans un bloc ``defer_daily_summaries``, le recalcul est différé, sauf si
+    ``defer`` est faux (recalcul demandé explicitement, ou vidage des
+    recalculs différés).
+    """
 
     print(f"update_daily_summary appelé avec user_id={user_id}, date={date}")
     if not user_id:
@@ -592,6 +1215,16 @@ def update_daily_summary(user_id: str, date: Optional[str] = None) -> Dict:
     date_str = date if date else dt_date.today().isoformat()
     if not date_str:
         raise HTTPException(status_code=400, detail="date requise")
+    # Les données du jour ont changé : invalide les ETags déjà distribués
+    caching.bump(user_id, date_str)
+    deferred = _DEFERRED_SUMMARIES.get()
+    if deferred is not None:
+        key = (user_id, str(date_str)[:10])
+        if defer:
+            deferred.add(key)
+            return {"user_id": user_id, "date": key[1], "deferred": True}
+        # Recalculé maintenant : inutile de le refaire en fin de bloc
+        deferred.discard(key)
 
     try:
         meals = db.get_meals(user_id, date_str)
@@ -727,6 +1360,8 @@ def update_daily_summary(user_id: str, date: Optional[str] = None) -> Dict:
                 detail="Upsert daily_summary n'a renvoyé aucune donnée",
             )
         print(f"📝 daily_summary mis à jour pour {user_id} le {date_str}")
+        # Clients abonnés au bilan de ce jour (flux SSE)
+        events.publish(summary_topic(user_id, date_str))
     except HTTPException:
         raise
     except Exception as e:
@@ -769,10 +1404,18 @@ def add_meal_item(
         "barcode": item_data.get("barcode"),
         "source": item_data.get("source"),
     }
+    densities = {col: item_data.get(col) for col in DENSITY_FIELDS.values()}
+    if all(v is None for v in densities.values()) and data["unite"] == "g":
+        densities = nutrient_densities(data, data["quantite"])
+    data.update(densities)
 
     item_id = db.insert_meal_item(meal_id=meal_id, **data)
     item = {"id": item_id, "meal_id": meal_id, **data}
 
+    from nutriflow import autocomplete
+
+    autocomplete.record(user_id, data.get("nom_aliment"))
+
     try:
         update_daily_summary(user_id, ds)
     except Exception as e:
@@ -0,0 +1,4 @@
+-- Lecture des bilans d'une période (vue calendrier / historique) : une seule
+-- requête indexée sur (user_id, date) au lieu d'un appel par jour.
+CREATE INDEX IF NOT EXISTS daily_summary_user_date_idx
+  ON daily_summary (user_id, date);
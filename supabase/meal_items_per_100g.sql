@@ -0,0 +1,18 @@
+-- Valeurs nutritionnelles pour 100 g de chaque aliment d'un repas : permettent
+-- de recalculer calories et macros localement quand seule la quantité change.
+ALTER TABLE meal_items
+  ADD COLUMN IF NOT EXISTS calories_100g numeric,
+  ADD COLUMN IF NOT EXISTS proteines_100g numeric,
+  ADD COLUMN IF NOT EXISTS glucides_100g numeric,
+  ADD COLUMN IF NOT EXISTS lipides_100g numeric;
+
+-- Reprise de l'existant : lignes dont la quantité est exprimée en grammes
+UPDATE meal_items
+SET
+  calories_100g = calories * 100 / quantite,
+  proteines_100g = proteines_g * 100 / quantite,
+  glucides_100g = glucides_g * 100 / quantite,
+  lipides_100g = lipides_g * 100 / quantite
+WHERE unite = 'g'
+  AND quantite > 0
+  AND calories_100g IS NULL;
@@ -0,0 +1,96 @@
+-- Journal des modifications pour la synchronisation des clients hors ligne.
+-- Chaque insertion, mise à jour ou suppression d'un repas, d'un aliment de
+-- repas ou d'une activité ajoute une ligne. Les suppressions restent visibles
+-- (op = 'delete') : ce sont les tombstones.
+--
+-- ``seq`` est attribué à l'insertion, pas à la validation : une transaction
+-- lente peut valider un ``seq`` inférieur à celui qu'un client a déjà lu.
+-- Le jeton ``since`` est donc le couple (txid, seq), et la vue
+-- ``sync_changes_visible`` n'expose que les lignes des transactions plus
+-- anciennes que la plus ancienne transaction en cours : aucune ligne ne peut
+-- plus apparaître avant elles dans cet ordre.
+CREATE TABLE IF NOT EXISTS sync_changes (
+  seq bigserial PRIMARY KEY,
+  txid bigint NOT NULL DEFAULT (pg_current_xact_id()::text)::bigint,
+  user_id uuid NOT NULL,
+  entity text NOT NULL,
+  entity_id text NOT NULL,
+  op text NOT NULL CHECK (op IN ('upsert', 'delete')),
+  changed_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS sync_changes_user_txid_seq_idx
+  ON sync_changes (user_id, txid, seq);
+
+CREATE OR REPLACE VIEW sync_changes_visible AS
+SELECT seq, txid, user_id, entity, entity_id, op, changed_at
+FROM sync_changes
+WHERE txid < (pg_snapshot_xmin(pg_current_snapshot())::text)::bigint;
+
+CREATE OR REPLACE FUNCTION log_sync_change() RETURNS trigger AS $$
+DECLARE
+  target_id text;
+  target_user uuid;
+  meal uuid;
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    target_id := OLD.id::text;
+  ELSE
+    target_id := NEW.id::text;
+  END IF;
+
+  IF TG_TABLE_NAME = 'meal_items' THEN
+    IF TG_OP = 'DELETE' THEN
+      meal := OLD.meal_id;
+    ELSE
+      meal := NEW.meal_id;
+    END IF;
+    SELECT user_id INTO target_user FROM meals WHERE id = meal;
+    -- Repas déjà supprimé : sa tombstone couvre ses aliments
+    IF target_user IS NULL THEN
+      RETURN NULL;
+    END IF;
+  ELSIF TG_OP = 'DELETE' THEN
+    target_user := OLD.user_id;
+  ELSE
+    target_user := NEW.user_id;
+  END IF;
+
+  INSERT INTO sync_changes (user_id, entity, entity_id, op)
+  VALUES (
+    target_user,
+    TG_TABLE_NAME,
+    target_id,
+    CASE WHEN TG_OP = 'DELETE' THEN 'delete' ELSE 'upsert' END
+  );
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS meals_sync_changes ON meals;
+CREATE TRIGGER meals_sync_changes
+  AFTER INSERT OR UPDATE OR DELETE ON meals
+  FOR EACH ROW EXECUTE FUNCTION log_sync_change();
+
+DROP TRIGGER IF EXISTS meal_items_sync_changes ON meal_items;
+CREATE TRIGGER meal_items_sync_changes
+  AFTER INSERT OR UPDATE OR DELETE ON meal_items
+  FOR EACH ROW EXECUTE FUNCTION log_sync_change();
+
+DROP TRIGGER IF EXISTS activities_sync_changes ON activities;
+CREATE TRIGGER activities_sync_changes
+  AFTER INSERT OR UPDATE OR DELETE ON activities
+  FOR EACH ROW EXECUTE FUNCTION log_sync_change();
+
+-- Opérations hors ligne déjà appliquées : un renvoi du même ``op_id``
+-- retourne le résultat enregistré au lieu de rejouer l'écriture. Une ligne
+-- sans ``status`` est une réservation en cours ; passé un délai depuis
+-- ``claimed_at``, elle est considérée comme abandonnée et peut être reprise.
+CREATE TABLE IF NOT EXISTS sync_applied_ops (
+  user_id uuid NOT NULL,
+  op_id text NOT NULL,
+  status integer,
+  response jsonb,
+  claimed_at timestamptz NOT NULL DEFAULT now(),
+  applied_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (user_id, op_id)
+);
@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from nutriflow import services
+
+
+@pytest.fixture(autouse=True)
+def reset_translator():
+    """Chaque test crée son propre client de traduction (éventuellement
+    remplacé par un faux via ``googletrans.Translator``)."""
+    services.reset_translator()
+    yield
+    services.reset_translator()
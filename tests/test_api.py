@@ -80,7 +80,20 @@ SAMPLE_USER = {
 
 
 @pytest.fixture(autouse=True)
-def mock_router(monkeypatch):
+def mock_router(monkeypatch, tmp_path):
+    # Index produits local isolé par test
+    from nutriflow.db import product_index
+
+    monkeypatch.setattr(
+        product_index, "DEFAULT_INDEX_PATH", str(tmp_path / "products.sqlite")
+    )
+    # Catalogue d'aliments appris isolé par test
+    from nutriflow.db import food_catalog
+
+    monkeypatch.setattr(
+        food_catalog, "DEFAULT_CATALOG_PATH", str(tmp_path / "food_catalog.sqlite")
+    )
+
     # Unit test mocks on router module
     monkeypatch.setattr(
         router, "analyze_ingredients_nutritionix", lambda q: SAMPLE_FOODS
@@ -339,8 +352,14 @@ def test_tdee_unit():
 
 
 def test_daily_summary_unit():
-    resp = router.daily_summary(date_str="2023-01-02")
-    assert isinstance(resp, DailyNutritionSummary)
+    async def inner():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            res = await ac.get("/api/daily-summary", params={"date_str": "2023-01-02"})
+            assert res.status_code == 200
+            return res.json()
+
+    resp = DailyNutritionSummary(**run_async(inner()))
     assert resp.calories_goal == 1800
     assert resp.calories_consumed == 0
     expected_prot = round(1.6 * SAMPLE_USER["poids_kg"])
@@ -351,10 +370,151 @@ def test_daily_summary_unit():
     assert resp.carbs_goal == expected_carb
 
 
+def test_dashboard_fetches_shared_inputs_once(monkeypatch):
+    calls = []
+
+    def fake_get_user(*_):
+        calls.append("user")
+        return SAMPLE_USER
+
+    def fake_get_activities(*_):
+        calls.append("activities")
+        return [{"id": "a1", "calories_brulees": 200}]
+
+    monkeypatch.setattr(db, "get_user", fake_get_user)
+    monkeypatch.setattr(db, "get_activities", fake_get_activities)
+    monkeypatch.setattr(db, "get_meals", lambda *_: [{"id": "m1", "type": "d"}])
+    monkeypatch.setattr(db, "get_meal_items", lambda *_: [{"id": "i1"}])
+
+    resp = router.dashboard(date_str="2023-01-02", fields=None)
+    assert sorted(calls) == ["activities", "user"]
+    assert set(resp) == {"date", *router.DASHBOARD_FIELDS}
+    assert resp["summary"].calories_burned == 200
+    assert resp["summary"].calories_goal == 1800
+    assert resp["goals"].tdee == router.ajuster_tdee(1800.0, "maintien") + 200
+    assert resp["meals"] == [{"id": "m1", "type": "d", "ingredients": [{"id": "i1"}]}]
+    assert resp["profile"].poids_kg == SAMPLE_USER["poids_kg"]
+
+    calls.clear()
+    resp = router.dashboard(date_str="2023-01-02", fields="meals")
+    assert set(resp) == {"date", "meals"}
+    assert calls == []
+
+    with pytest.raises(router.HTTPException) as exc:
+        router.dashboard(date_str="2023-01-02", fields="summary,nope")
+    assert exc.value.status_code == 400
+
+
+def test_daily_summary_range_is_columnar(monkeypatch):
+    import base64
+
+    queries = []
+
+    def fake_range(user_id, start, end, columns):
+        queries.append((start, end, columns))
+        return [
+            {"date": "2023-01-02", "has_data": True, "calories_consumed": 1500.0},
+            # Bilan recalculé sans repas ni activité : pas de donnée ce jour
+            {"date": "2023-01-05", "has_data": False, "calories_consumed": 0.0},
+            {"date": "2023-01-10", "has_data": True, "calories_consumed": 2100.0},
+        ]
+
+    monkeypatch.setattr(db, "get_daily_summaries_range", fake_range)
+
+    async def inner():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            res = await ac.get(
+                "/api/daily-summary/range",
+                params={"start": "2023-01-01", "end": "2023-01-10"},
+            )
+            assert res.status_code == 200
+            data = res.json()
+            assert len(data["dates"]) == 10
+            consumed = data["columns"]["calories_consumed"]
+            assert consumed[1] == 1500.0 and consumed[9] == 2100.0
+            assert consumed[0] is None
+            bits = int.from_bytes(base64.b64decode(data["has_data"]), "little")
+            assert [i for i in range(10) if bits >> i & 1] == [1, 9]
+
+            res = await ac.get(
+                "/api/daily-summary/range",
+                params={"start": "2023-02-01", "end": "2023-01-01"},
+            )
+            assert res.status_code == 400
+
+    run_async(inner())
+    assert len(queries) == 1
+    assert queries[0][2].split(",")[:2] == ["date", "has_data"]
+
+
 def test_history_unit():
-    resp = router.get_history(limit=1)
+    async def inner():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            res = await ac.get("/api/history", params={"limit": 1})
+            assert res.status_code == 200
+            return res.json()
+
+    resp = run_async(inner())
     assert isinstance(resp, list)
-    assert isinstance(resp[0], DailySummary)
+    assert DailySummary(**resp[0])
+
+
+def test_history_keyset_pagination_and_ndjson(monkeypatch):
+    import json
+
+    rows = [
+        {
+            "date": f"2023-01-0{d}",
+            "calories_consumed": 1000.0 + d,
+            "calories_burned": 0.0,
+            "tdee": 1800.0,
+            "calorie_balance": 0.0,
+            "goal_feedback": "",
+        }
+        for d in range(5, 0, -1)
+    ]
+    calls = []
+
+    def fake_summaries(user_id, limit=30, before=None, columns="*"):
+        calls.append(columns)
+        older = [r for r in rows if before is None or r["date"] < before]
+        return older[:limit]
+
+    monkeypatch.setattr(db, "get_daily_summaries", fake_summaries)
+
+    async def inner():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            res = await ac.get("/api/history", params={"limit": 2})
+            assert [r["date"] for r in res.json()] == ["2023-01-05", "2023-01-04"]
+            cursor = res.headers["x-next-cursor"]
+            res = await ac.get("/api/history", params={"limit": 2, "before": cursor})
+            assert [r["date"] for r in res.json()] == ["2023-01-03", "2023-01-02"]
+            res = await ac.get(
+                "/api/history", params={"limit": 2, "before": res.headers["x-next-cursor"]}
+            )
+            assert [r["date"] for r in res.json()] == ["2023-01-01"]
+            assert "x-next-cursor" not in res.headers
+
+            res = await ac.get("/api/history", params={"limit": 2, "format": "ndjson"})
+            assert res.headers["content-type"].startswith("application/x-ndjson")
+            lines = [json.loads(line) for line in res.text.splitlines()]
+            assert [r["date"] for r in lines] == [r["date"] for r in rows]
+
+            res = await ac.get("/api/history", params={"before": "hier"})
+            assert res.status_code == 400
+
+            # Limite hors bornes : refusée plutôt que réduite en silence
+            for limit in (0, router.MAX_HISTORY_PAGE + 1):
+                res = await ac.get("/api/history", params={"limit": limit})
+                assert res.status_code == 422
+            res = await ac.get("/api/history", params={"format": "xml"})
+            assert res.status_code == 400
+
+    run_async(inner())
+    assert all(c != "*" and "goal_feedback" in c for c in calls)
 
 
 def test_get_user_profile_unit():
@@ -526,6 +686,416 @@ def test_daily_summary_integration_structure():
     run_async(inner())
 
 
+def test_bounded_map_reuses_shared_pool_and_runs_nested_calls_inline():
+    import threading
+    from nutriflow import concurrency
+
+    lock = threading.Lock()
+    active = [0, 0]
+
+    def work(i):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        # Appel imbriqué depuis un thread du pool : exécuté sur place
+        inner = concurrency.bounded_map(lambda j: j * i, range(3))
+        with lock:
+            active[0] -= 1
+        return threading.current_thread().name, inner
+
+    results = concurrency.bounded_map(work, range(20), max_workers=3)
+    assert [results[i][1] for i in range(20)] == [{0: 0, 1: i, 2: 2 * i} for i in range(20)]
+    assert active[1] <= 3
+    names = {name for name, _ in results.values()}
+    assert all(n.startswith("nutriflow") for n in names)
+    assert len(names) <= concurrency.MAX_CONCURRENCY
+    concurrency.shutdown()
+
+
+def test_daily_summary_reads_concurrently(monkeypatch):
+    import threading
+
+    # Les trois lectures ne passent la barrière qu'ensemble : exécutées en
+    # série, la première échouerait (BrokenBarrierError)
+    barrier = threading.Barrier(3, timeout=5)
+
+    def slow(value):
+        def _fetch(*_):
+            barrier.wait()
+            return value
+
+        return _fetch
+
+    monkeypatch.setattr(db, "get_daily_nutrition", slow({"total_calories": 500}))
+    monkeypatch.setattr(db, "get_user", slow(SAMPLE_USER))
+    monkeypatch.setattr(router, "_fetch_calories_burned", slow(150))
+
+    async def inner():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            res = await ac.get("/api/daily-summary", params={"date_str": "2023-01-02"})
+            assert res.status_code == 200
+            assert res.json()["calories_burned"] == 150
+            stages = [s.split(";")[0] for s in res.headers["server-timing"].split(", ")]
+            assert {"totals", "user", "activities", "fetch", "build", "total"} <= set(stages)
+
+    run_async(inner())
+
+
+def test_daily_summary_etag_returns_304_until_data_changes(monkeypatch):
+    from nutriflow import caching
+
+    reads = []
+
+    def fake_totals(*_):
+        reads.append("totals")
+        return {"total_calories": 500}
+
+    monkeypatch.setattr(db, "get_daily_nutrition", fake_totals)
+    monkeypatch.setattr(db, "get_summary_last_updated", lambda *_: "2023-01-02T10:00:00")
+
+    async def inner():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            params = {"date_str": "2023-01-02"}
+            res = await ac.get("/api/daily-summary", params=params)
+            etag = res.headers["etag"]
+            assert etag.startswith('W/"')
+            assert res.headers["cache-control"] == caching.REVALIDATE
+
+            res = await ac.get(
+                "/api/daily-summary", params=params, headers={"If-None-Match": etag}
+            )
+            assert res.status_code == 304
+            assert reads == ["totals"]
+
+            res = await ac.get(
+                "/api/meals", params=params, headers={"If-None-Match": etag}
+            )
+            assert res.status_code == 200
+
+            caching.bump(router.TEST_USER_ID, "2023-01-02")
+            res = await ac.get(
+                "/api/daily-summary", params=params, headers={"If-None-Match": etag}
+            )
+            assert res.status_code == 200
+            assert res.headers["etag"] != etag
+
+            res = await ac.get("/api/sports")
+            assert res.headers["cache-control"] == router.STATIC_CACHE_CONTROL
+
+    run_async(inner())
+
+
+def test_large_responses_are_compressed(monkeypatch):
+    rows = [
+        {
+            "date": f"2023-01-{d:02d}",
+            "calories_consumed": 1800.0,
+            "calories_burned": 250.0,
+            "tdee": 2100.0,
+            "calorie_balance": -50.0,
+            "goal_feedback": "Balance parfaite pour maintenir votre poids",
+        }
+        for d in range(31, 0, -1)
+    ]
+    monkeypatch.setattr(db, "get_daily_summaries", lambda *a, **k: rows)
+
+    async def inner():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            headers = {"Accept-Encoding": "gzip"}
+            res = await ac.get("/api/history", params={"limit": 31}, headers=headers)
+            assert res.headers["content-encoding"] == "gzip"
+            assert len(res.json()) == 31
+            res = await ac.get("/", headers=headers)
+            assert "content-encoding" not in res.headers
+
+    run_async(inner())
+
+
+def test_summary_stream_pushes_after_recompute(monkeypatch):
+    import threading
+    from nutriflow import events, services
+
+    calories = {"value": 500}
+    monkeypatch.setattr(
+        db, "get_daily_nutrition", lambda *_: {"total_calories": calories["value"]}
+    )
+    topic = services.summary_topic(router.TEST_USER_ID, "2023-01-02")
+
+    async def not_disconnected():
+        return False
+
+    async def inner():
+        sub = events.subscribe(topic)
+        stream = router._summary_events(
+            router.TEST_USER_ID, "2023-01-02", sub, not_disconnected, heartbeat=0.05
+        )
+        assert (await stream.__anext__()).startswith("retry:")
+        first = await stream.__anext__()
+        assert first.startswith("event: summary") and '"calories_consumed":500' in first
+        assert await stream.__anext__() == ": ping\n\n"
+
+        calories["value"] = 900
+        # Publication depuis un autre thread, comme update_daily_summary
+        for _ in range(3):
+            threading.Thread(target=events.publish, args=(topic,)).start()
+        await asyncio.sleep(0.02)
+        update = await stream.__anext__()
+        assert '"calories_consumed":900' in update
+        assert await stream.__anext__() == ": ping\n\n"
+        await stream.aclose()
+        assert not events.has_subscribers(topic)
+
+    run_async(inner())
+
+
+def test_event_subscription_drops_oldest_when_full():
+    from nutriflow import events
+
+    async def inner():
+        sub = events.subscribe("topic", maxsize=2)
+        for i in range(5):
+            events.publish("topic", i)
+        await asyncio.sleep(0)
+        assert sub.drain() == [3, 4]
+        assert sub.dropped == 3
+        events.unsubscribe(sub)
+
+    run_async(inner())
+
+
+def test_batch_runs_reads_concurrently_and_coalesces_summaries(monkeypatch):
+    import threading
+
+    flushed = []
+    monkeypatch.setattr(router, "flush_daily_summaries", lambda p: flushed.append(set(p)))
+    monkeypatch.setattr(db, "insert_meal", lambda *a, **k: f"meal-{a[2]}")
+
+    # Les deux lectures de repas ne passent la barrière qu'ensemble : exécutées
+    # l'une après l'autre, la première échouerait (BrokenBarrierError)
+    barrier = threading.Barrier(2, timeout=5)
+
+    def slow_meals(*_):
+        barrier.wait()
+        return [{"id": "m1", "type": "dejeuner"}]
+
+    monkeypatch.setattr(db, "get_meals", slow_meals)
+
+    ops = [
+        {"id": "a", "method": "POST", "path": "/api/meals",
+         "body": {"type": "dejeuner", "date": "2023-01-02"}},
+        {"id": "b", "method": "post", "path": "/api/meals",
+         "body": {"type": "diner", "date": "2023-01-02"}},
+        {"id": "c", "path": "/api/meals?date_str=2023-01-02"},
+        {"id": "d", "path": "/api/meals?date_str=2023-01-03"},
+        {"id": "e", "path": "/api/sports"},
+    ]
+
+    async def inner():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            res = await ac.post("/api/batch", json={"operations": ops})
+            assert res.status_code == 200
+            results = res.json()
+            assert [r["id"] for r in results] == ["a", "b", "c", "d", "e"]
+            assert results[0]["body"] == {"id": "meal-dejeuner"}
+            assert results[1]["body"] == {"id": "meal-diner"}
+            assert results[2]["body"][0]["id"] == "m1"
+            assert "etag" in results[2]["headers"]
+            assert results[3]["status"] == 200
+            assert isinstance(results[4]["body"], list)
+
+            res = await ac.post(
+                "/api/batch", json={"operations": [{"path": "/api/batch"}]}
+            )
+            assert res.status_code == 400
+
+    run_async(inner())
+    assert flushed == [{(router.TEST_USER_ID, "2023-01-02")}]
+
+
+def test_batch_flushes_summaries_before_reads_and_on_error(monkeypatch):
+    events_log = []
+    monkeypatch.setattr(
+        router, "flush_daily_summaries", lambda p: events_log.append(("flush", set(p)))
+    )
+    monkeypatch.setattr(db, "insert_meal", lambda *a, **k: f"meal-{a[2]}")
+
+    from nutriflow import services
+
+    def fake_update(user_id, date=None, defer=True):
+        pending = services._DEFERRED_SUMMARIES.get()
+        if defer and pending is not None:
+            pending.add((user_id, str(date)[:10]))
+            return {"deferred": True}
+        events_log.append(("update", str(date), defer))
+        return {"user_id": user_id, "date": str(date)}
+
+    monkeypatch.setattr(router, "update_daily_summary", fake_update)
+
+    def get_meals(*_):
+        events_log.append(("read",))
+        return []
+
+    monkeypatch.setattr(db, "get_meals", get_meals)
+
+    ops = [
+        {"method": "POST", "path": "/api/meals",
+         "body": {"type": "dejeuner", "date": "2023-01-02"}},
+        {"method": "POST", "path": "/api/daily-summary/update?date_str=2023-01-02"},
+        {"path": "/api/meals?date_str=2023-01-02"},
+    ]
+
+    async def inner():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            res = await ac.post("/api/batch", json={"operations": ops})
+            assert res.status_code == 200
+            # Le recalcul explicite n'est pas différé
+            assert res.json()[1]["body"] == {
+                "user_id": router.TEST_USER_ID, "date": "2023-01-02"
+            }
+
+    run_async(inner())
+    assert ("update", "2023-01-02", False) in events_log
+    assert events_log.index(("flush", {(router.TEST_USER_ID, "2023-01-02")})) < (
+        events_log.index(("read",))
+    )
+
+    # Une opération qui lève n'empêche pas le recalcul des écritures passées
+    events_log.clear()
+
+    async def broken(client, op):
+        if op.method == "GET":
+            raise ValueError("corps illisible")
+        return await original_run(client, op)
+
+    original_run = router._run_operation
+    monkeypatch.setattr(router, "_run_operation", broken)
+
+    async def inner_error():
+        transport = ASGITransport(app=app, raise_app_exceptions=False)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            res = await ac.post("/api/batch", json={"operations": [ops[0], ops[2]]})
+            assert res.status_code == 500
+
+    run_async(inner_error())
+    assert ("flush", {(router.TEST_USER_ID, "2023-01-02")}) in events_log
+
+
+def test_sync_changes_collapses_log_into_upserts_and_tombstones(monkeypatch):
+    log = [
+        {"txid": 700, "seq": 11, "entity": "meals", "entity_id": "m1", "op": "upsert"},
+        {"txid": 700, "seq": 12, "entity": "meal_items", "entity_id": "i1", "op": "upsert"},
+        {"txid": 701, "seq": 13, "entity": "meal_items", "entity_id": "i1", "op": "delete"},
+        {"txid": 702, "seq": 9, "entity": "activities", "entity_id": "a1", "op": "upsert"},
+        {"txid": 703, "seq": 15, "entity": "meals", "entity_id": "m1", "op": "upsert"},
+    ]
+    calls = []
+    monkeypatch.setattr(
+        db, "get_sync_changes", lambda uid, since, limit: calls.append(since) or log
+    )
+    monkeypatch.setattr(
+        db,
+        "get_rows_by_ids",
+        lambda table, ids: [{"id": i, "table": table} for i in ids if i != "a1"],
+    )
+
+    res = router.sync_changes(since="699-10", limit=5)
+    assert calls == [(699, 10)]
+    assert res.next == "703-15" and res.has_more is True
+    assert res.changes["meals"].upserted == [{"id": "m1", "table": "meals"}]
+    assert res.changes["meal_items"].deleted == ["i1"]
+    assert res.changes["meal_items"].upserted == []
+    # Ligne introuvable : traitée comme supprimée
+    assert res.changes["activities"].deleted == ["a1"]
+
+    monkeypatch.setattr(db, "get_sync_changes", lambda *a: [])
+    res = router.sync_changes(since="703-15")
+    assert res.next == "703-15" and res.has_more is False
+    assert router.sync_changes(since="0").next == "0"
+    with pytest.raises(router.HTTPException):
+        router.sync_changes(since="abc")
+
+
+def test_sync_push_is_idempotent(monkeypatch):
+    store = {}
+    flushed = []
+    monkeypatch.setattr(router, "flush_daily_summaries", lambda p: flushed.append(set(p)))
+    monkeypatch.setattr(
+        db,
+        "get_applied_ops",
+        lambda uid, ids: {i: store[i] for i in ids if i in store},
+    )
+
+    def claim(uid, op_id, timeout):
+        current = store.get(op_id)
+        # Réservation abandonnée (processus arrêté) : reprise
+        if current is not None and not current.get("stale"):
+            return False
+        store[op_id] = {"op_id": op_id, "status": None, "response": None}
+        return True
+
+    monkeypatch.setattr(db, "claim_op", claim)
+    monkeypatch.setattr(
+        db,
+        "complete_op",
+        lambda uid, op_id, status, body: store[op_id].update(status=status, response=body),
+    )
+    monkeypatch.setattr(db, "release_op", lambda uid, op_id: store.pop(op_id))
+    inserted = []
+    monkeypatch.setattr(
+        db, "insert_meal", lambda *a, **k: inserted.append(a[2]) or f"meal-{a[2]}"
+    )
+
+    ops = [
+        {"op_id": "op-1", "method": "POST", "path": "/api/meals",
+         "body": {"type": "dejeuner", "date": "2023-01-02"}},
+        {"op_id": "op-1", "method": "POST", "path": "/api/meals",
+         "body": {"type": "dejeuner", "date": "2023-01-02"}},
+        {"op_id": "op-2", "method": "POST", "path": "/api/meals",
+         "body": {"type": "diner", "date": "2023-01-02"}},
+    ]
+
+    async def inner():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            res = await ac.post("/api/sync/push", json={"operations": ops})
+            assert res.status_code == 200
+            results = res.json()
+            assert [r["op_id"] for r in results] == ["op-1", "op-1", "op-2"]
+            assert [r["replayed"] for r in results] == [False, True, False]
+            assert results[1]["body"] == {"id": "meal-dejeuner"}
+
+            # Renvoi de toute la file après une coupure : rien n'est rejoué
+            res = await ac.post("/api/sync/push", json={"operations": ops})
+            assert all(r["replayed"] for r in res.json())
+
+            res = await ac.post(
+                "/api/sync/push",
+                json={"operations": [{"op_id": "x", "path": "/api/meals"}]},
+            )
+            assert res.status_code == 400
+
+            # Une réservation récente sans résultat répond 409, une
+            # réservation expirée est reprise et l'opération appliquée
+            retry = {"op_id": "op-3", "method": "POST", "path": "/api/meals",
+                     "body": {"type": "collation", "date": "2023-01-02"}}
+            store["op-3"] = {"op_id": "op-3", "status": None, "response": None}
+            res = await ac.post("/api/sync/push", json={"operations": [retry]})
+            assert res.json()[0]["status"] == 409
+            store["op-3"]["stale"] = True
+            res = await ac.post("/api/sync/push", json={"operations": [retry]})
+            assert res.json()[0]["body"] == {"id": "meal-collation"}
+            assert store["op-3"]["status"] == 200
+
+    run_async(inner())
+    assert inserted == ["dejeuner", "diner", "collation"]
+    assert flushed == [{(router.TEST_USER_ID, "2023-01-02")}] * 2
+
+
 def test_history_integration_structure():
     async def inner():
         transport = ASGITransport(app=app)
@@ -755,7 +1325,14 @@ def test_get_daily_nutrition_fallback(monkeypatch):
 
 
 def test_units_endpoint_unit():
-    data = router.get_units()
+    async def inner():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            res = await ac.get("/api/units")
+            assert res.status_code == 200
+            return res.json()
+
+    data = run_async(inner())
     assert isinstance(data, dict)
     assert "cuil. a soupe" in data
 
@@ -901,3 +1478,365 @@ def test_remove_activity_success(monkeypatch):
     assert res.status_code == 200
     assert res.json()["detail"] == "Activity deleted"
     assert record["deleted"] == "act1"
+
+
+def test_barcode_batch_serves_cache_and_bulk_upserts(monkeypatch):
+    cached_row = {**SAMPLE_PRODUCT, "barcode": "11111111"}
+    monkeypatch.setattr(db, "get_products", lambda codes: [cached_row])
+
+    fetched_codes = []
+
+    def fake_off(code):
+        fetched_codes.append(code)
+        if code == "33333333":
+            return None
+        return {**SAMPLE_PRODUCT, "barcode": code}
+
+    upserts = []
+    monkeypatch.setattr(router, "get_off_nutrition_by_barcode", fake_off)
+    monkeypatch.setattr(db, "upsert_products", lambda rows: upserts.append(rows))
+
+    payload = router.BarcodeBatchQuery(
+        barcodes=["11111111", "22222222", "33333333", "abc", "22222222"]
+    )
+    resp = router.barcode_batch(payload)
+
+    assert [r.status for r in resp] == ["cached", "fetched", "not_found", "invalid"]
+    assert sorted(fetched_codes) == ["22222222", "33333333"]
+    assert len(upserts) == 1
+    assert [row["barcode"] for row in upserts[0]] == ["22222222"]
+
+
+def test_search_products_uses_local_index(tmp_path):
+    from nutriflow.db import product_index
+
+    product_index.remember_product(
+        {**SAMPLE_PRODUCT, "barcode": "11111111", "name": "Yaourt à la grecque"}
+    )
+    product_index.remember_product(
+        {**SAMPLE_PRODUCT, "barcode": "22222222", "name": "Crème dessert"}
+    )
+
+    resp = router.search_products(query="yaou grec", page=1, page_size=20)
+    assert [p.barcode for p in resp] == ["11111111"]
+    assert resp[0].name == "Yaourt à la grecque"
+
+    first = router.search(query="creme")
+    assert first.barcode == "22222222"
+
+
+def test_search_products_falls_back_to_off():
+    resp = router.search_products(query="inconnu", page=1, page_size=20)
+    assert [p.barcode for p in resp] == [SAMPLE_PRODUCT["barcode"]]
+
+
+def test_edit_meal_quantity_change_is_recomputed_locally(monkeypatch):
+    def fail_analyze(q):
+        raise AssertionError("Nutritionix ne doit pas être appelé")
+
+    updated = {}
+
+    def fake_update_meal_item(id, data):
+        updated.update(data)
+        updated["id"] = id
+
+    monkeypatch.setattr(router, "analyze_ingredients_nutritionix", fail_analyze)
+    monkeypatch.setattr(
+        db,
+        "get_meal_item",
+        lambda *_: {
+            "id": "i1",
+            "nom_aliment": "apple",
+            "quantite": 100,
+            "unite": "g",
+            "calories": 52,
+            "calories_100g": 52,
+            "proteines_100g": 0.3,
+            "glucides_100g": 14,
+            "lipides_100g": 0.2,
+        },
+    )
+    monkeypatch.setattr(db, "update_meal_item", fake_update_meal_item)
+    monkeypatch.setattr(db, "get_meal_items", lambda *_: [updated])
+    monkeypatch.setattr(router, "get_meal", lambda *_: {"id": "m", "type": "d"})
+
+    item = router.MealItemUpdate(id="i1", nom_aliment="apple", quantite=150, unite="g")
+    router.edit_meal("m", router.MealPatchPayload(update=[item]))
+    assert updated["quantite"] == 150
+    assert updated["calories"] == 78
+    assert updated["glucides_g"] == 21
+
+
+def test_edit_meal_batches_analysis_in_one_call(monkeypatch):
+    batches = []
+    singles = []
+
+    def food(name, kcal):
+        return {
+            "food_name": name,
+            "serving_weight_grams": 100,
+            "nf_calories": kcal,
+            "nf_protein": 1,
+            "nf_total_carbohydrate": 10,
+            "nf_total_fat": 1,
+        }
+
+    def fake_batch(queries):
+        batches.append(queries)
+        # Le dernier ingrédient n'est pas identifiable dans la réponse groupée
+        return [food("bread", 250), food("apple", 52), None]
+
+    def fake_analyze(q):
+        singles.append(q)
+        return [food("rice", 130)]
+
+    inserted = []
+    updated = {}
+    monkeypatch.setattr(router, "analyze_ingredients_batch", fake_batch)
+    monkeypatch.setattr(router, "analyze_ingredients_nutritionix", fake_analyze)
+    monkeypatch.setattr(db, "insert_meal_item", lambda *_, **d: inserted.append(d) or "it")
+    monkeypatch.setattr(db, "get_meal_item", lambda *_: {"id": "i1", "nom_aliment": "riz"})
+    monkeypatch.setattr(db, "update_meal_item", lambda id, d: updated.update(d))
+    monkeypatch.setattr(db, "get_meal_items", lambda *_: inserted)
+    monkeypatch.setattr(router, "get_meal", lambda *_: {"id": "m", "type": "d"})
+
+    payload = router.MealPatchPayload(
+        add=[
+            router.MealItemCreate(nom_aliment="pain", quantite=100, unite="g"),
+            router.MealItemCreate(nom_aliment="pomme", quantite=1, unite="piece"),
+        ],
+        update=[router.MealItemUpdate(id="i1", nom_aliment="riz", quantite=1, unite="tasse")],
+    )
+    router.edit_meal("m", payload)
+    assert len(batches) == 1 and len(batches[0]) == 3
+    assert singles == [batches[0][2]]
+    assert [i["calories"] for i in inserted] == [250, 52]
+    assert updated["calories"] == 130
+
+
+def test_match_foods_to_lines():
+    from nutriflow.services import match_foods_to_lines
+
+    lines = ["2 slices of bread", "1 apple", "1 cup rice"]
+    foods = [{"food_name": "apple"}, {"food_name": "bread"}]
+    matched = match_foods_to_lines(foods, lines)
+    assert [f and f["food_name"] for f in matched] == ["bread", "apple", None]
+
+    # Autant d'aliments que de lignes mais réordonnés : le nom fait foi
+    foods = [{"food_name": "rice"}, {"food_name": "bread"}, {"food_name": "apple"}]
+    matched = match_foods_to_lines(foods, lines)
+    assert [f["food_name"] for f in matched] == ["bread", "apple", "rice"]
+
+    # Nom non reconnu : la quantité, puis la position départagent
+    lines = ["2 slices of bread", "150 g yogurt"]
+    foods = [{"food_name": "greek yoghurt", "serving_qty": 150}, {"food_name": "toast"}]
+    matched = match_foods_to_lines(foods, lines)
+    assert [f["food_name"] for f in matched] == ["toast", "greek yoghurt"]
+
+
+def test_batch_analysis_counts_each_catalog_miss_once(monkeypatch):
+    from nutriflow.db import food_catalog
+
+    monkeypatch.setattr(router, "analyze_ingredients_batch", lambda q: [None] * len(q))
+    monkeypatch.setattr(
+        router,
+        "analyze_ingredients_nutritionix",
+        lambda q: [{"food_name": q, "serving_weight_grams": 100, "nf_calories": 100}],
+    )
+    monkeypatch.setattr(food_catalog, "learn", lambda *a, **k: True)
+    before = food_catalog.stats()["misses"]
+    router._analyze_items([("plat inconnu", 100, "g"), ("autre plat", 50, "g")])
+    assert food_catalog.stats()["misses"] - before == 2
+
+
+def test_analyze_item_stores_densities(monkeypatch):
+    monkeypatch.setattr(
+        router,
+        "analyze_ingredients_nutritionix",
+        lambda q: [
+            {
+                "food_name": "bread",
+                "serving_weight_grams": 50,
+                "nf_calories": 120,
+                "nf_protein": 4,
+                "nf_total_carbohydrate": 20,
+                "nf_total_fat": 2,
+            }
+        ],
+    )
+    values = router._analyze_item("pain", 50, "g")
+    assert values["calories_100g"] == 240
+    assert values["lipides_100g"] == 4
+
+
+def test_analyze_item_learns_and_reuses_catalog(monkeypatch):
+    calls = []
+
+    def fake_analyze(q):
+        calls.append(q)
+        return [
+            {
+                "food_name": "bread",
+                "serving_qty": 1,
+                "serving_unit": "slice",
+                "serving_weight_grams": 30,
+                "nf_calories": 80,
+                "nf_protein": 3,
+                "nf_total_carbohydrate": 15,
+                "nf_total_fat": 1,
+            }
+        ]
+
+    monkeypatch.setattr(router, "analyze_ingredients_nutritionix", fake_analyze)
+
+    first = router._analyze_item("pain", 1, "tranche")
+    assert first["calories"] == 80
+    assert len(calls) == 1
+
+    again = router._analyze_item("Pain", 90, "g")
+    assert len(calls) == 1
+    assert again["nom_aliment"] == "bread"
+    assert again["quantite"] == 90
+    assert again["calories"] == 240
+
+    slices = router._analyze_item("bread", 2, "slice")
+    assert len(calls) == 1
+    assert slices["quantite"] == 60
+
+    metrics = router.get_metrics()["food_catalog"]
+    assert metrics["size"] == 1
+    assert metrics["hits"] >= 2
+
+
+def test_ingredients_resolved_from_catalog(monkeypatch):
+    from nutriflow.db import food_catalog
+
+    food_catalog.learn(
+        {
+            "food_name": "bread",
+            "serving_qty": 1,
+            "serving_unit": "slice",
+            "serving_weight_grams": 30,
+            "nf_calories": 80,
+            "nf_protein": 3,
+            "nf_total_carbohydrate": 15,
+            "nf_total_fat": 1,
+        },
+        aliases=["pain"],
+    )
+
+    def fail(q):
+        raise AssertionError("Nutritionix ne doit pas être appelé")
+
+    monkeypatch.setattr(router, "analyze_ingredients_nutritionix", fail)
+    foods = router._resolve_ingredients_locally("2 tranches de pain et 45g de pain")
+    assert [f["serving_weight_grams"] for f in foods] == [60, 45]
+    assert foods[0]["nf_calories"] == 160
+
+    assert router._resolve_ingredients_locally("2 tranches de pain, 1 pomme") is None
+
+
+def test_french_alias_does_not_steal_english_name():
+    from nutriflow.db import food_catalog
+
+    def food(name, kcal):
+        return {
+            "food_name": name,
+            "serving_qty": 1,
+            "serving_unit": "cup",
+            "serving_weight_grams": 100,
+            "nf_calories": kcal,
+            "nf_protein": 1,
+            "nf_total_carbohydrate": 10,
+            "nf_total_fat": 0,
+        }
+
+    food_catalog.learn(food("orange", 47))
+    # « orange » saisi en français, compris par Nutritionix comme un jus
+    food_catalog.learn(food("orange juice", 45), aliases=["orange"])
+
+    assert food_catalog.lookup("orange", lang="en")["en_name"] == "orange"
+    assert food_catalog.lookup("orange", lang="fr")["en_name"] == "orange juice"
+    assert food_catalog.lookup("orange")["en_name"] == "orange juice"
+
+    # Réapprendre l'aliment anglais ne détourne pas non plus l'alias français
+    food_catalog.learn(food("orange", 47))
+    assert food_catalog.lookup("orange", lang="fr")["en_name"] == "orange juice"
+    assert sorted(food_catalog.list_names(lang="fr")) == ["orange"]
+
+
+def test_admin_reload_lexicon_exposes_version(monkeypatch, tmp_path):
+    from nutriflow import services
+
+    path = tmp_path / "map.csv"
+    path.write_text("fr,en\ntranche,slice\n")
+    services.reload_mapping(str(path))
+    try:
+        before = router.get_metrics()["lexicon"]
+        assert before["entries"] == 1
+
+        # Sans jeton configuré, l'endpoint est fermé
+        monkeypatch.delenv("NUTRIFLOW_ADMIN_TOKEN", raising=False)
+        with pytest.raises(router.HTTPException) as exc:
+            router.reload_lexicon(x_admin_token=None)
+        assert exc.value.status_code == 403
+
+        monkeypatch.setenv("NUTRIFLOW_ADMIN_TOKEN", "secret")
+        for token in ("wrong", None):
+            with pytest.raises(router.HTTPException) as exc:
+                router.reload_lexicon(x_admin_token=token)
+            assert exc.value.status_code == 403
+
+        path.write_text("fr,en\ntranche,slice\npain,bread\n")
+        info = router.reload_lexicon(x_admin_token="secret")
+        assert info["entries"] == 2
+        assert info["version"] != before["version"]
+        assert router.get_metrics()["lexicon"]["version"] == info["version"]
+    finally:
+        services.reload_mapping(services.DEFAULT_MAPPING_PATH)
+
+
+def test_units_served_precomputed_and_invalidated_on_reload(tmp_path):
+    from nutriflow import services
+
+    async def get_units(headers=None):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await ac.get("/api/units", headers=headers or {})
+
+    path = tmp_path / "map.csv"
+    path.write_text("fr,en\ncuil. a soupe,tablespoon\n")
+    services.reload_mapping(str(path))
+    try:
+        res = run_async(get_units())
+        etag = res.headers["etag"]
+        assert res.json() == {"cuil. a soupe": "tablespoon"}
+        assert res.headers["cache-control"] == router.STATIC_CACHE_CONTROL
+        assert run_async(get_units({"If-None-Match": etag})).status_code == 304
+
+        path.write_text("fr,en\ncuil. a soupe,tablespoon\ntasse,cup\n")
+        lex = services.reload_mapping(str(path))
+        # Le corps a été recalculé au rechargement, avant toute requête
+        assert router._STATIC_RESPONSES["units"][0] == lex.version
+        res = run_async(get_units({"If-None-Match": etag}))
+        assert res.status_code == 200
+        assert res.json()["tasse"] == "cup"
+        assert res.headers["etag"] != etag
+    finally:
+        services.reload_mapping(services.DEFAULT_MAPPING_PATH)
+
+
+def test_ingredients_locale(monkeypatch):
+    seen = {}
+
+    def fake_analyze(q, locale="fr"):
+        seen["query"], seen["locale"] = q, locale
+        return SAMPLE_FOODS
+
+    monkeypatch.setattr(router, "analyze_ingredients_nutritionix", fake_analyze)
+    router.ingredients(IngredientQuery(query="2 cucharadas de miel", locale="es"))
+    assert seen == {"query": "2 tablespoon de miel", "locale": "es"}
+
+    with pytest.raises(router.HTTPException) as exc:
+        router.ingredients(IngredientQuery(query="honig", locale="xx"))
+    assert exc.value.status_code == 400
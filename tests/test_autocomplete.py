@@ -0,0 +1,102 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from nutriflow import autocomplete, services
+from nutriflow.autocomplete import FoodAutocomplete
+from nutriflow.db import product_index
+import nutriflow.db.supabase as db
+
+
+def test_suggest_ranks_by_frequency_and_ignores_accents():
+    index = FoodAutocomplete(
+        {"pâtes": 1, "pain": 3, "pain complet": 2, "Pastèque": 1},
+        translations={"pain": "bread"},
+        depth=2,
+    )
+    names = [s["name"] for s in index.suggest("pa")]
+    assert names == ["pain", "pain complet", "Pastèque", "pâtes"]
+
+    # Préfixe plus long que la profondeur précalculée : recherche dichotomique
+    assert [s["name"] for s in index.suggest("PAST")] == ["Pastèque"]
+    assert [s["name"] for s in index.suggest("pate")] == ["pâtes"]
+    assert index.suggest("pain")[0] == {"name": "pain", "en": "bread", "count": 3}
+    assert index.suggest("  ") == []
+
+
+def test_user_history_ranks_first(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        product_index, "DEFAULT_INDEX_PATH", str(tmp_path / "products.sqlite")
+    )
+    monkeypatch.setattr(
+        db, "get_user_food_names", lambda uid: ["pomme de terre sautée"] * 2
+    )
+    autocomplete.invalidate()
+
+    index = autocomplete.get_autocomplete("u1")
+    first = index.suggest("pomme", limit=3)[0]
+    assert first["name"] == "pomme de terre sautée"
+    assert first["count"] == 2 * autocomplete.HISTORY_WEIGHT
+    assert autocomplete.get_autocomplete("u1").history is index.history
+    autocomplete.invalidate("u1")
+    again = autocomplete.get_autocomplete("u1")
+    assert again.history is not index.history
+    # L'index de base n'est pas reconstruit pour un seul utilisateur
+    assert again.base is index.base
+    autocomplete.invalidate()
+
+
+def test_base_index_is_shared_and_histories_are_bounded(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        product_index, "DEFAULT_INDEX_PATH", str(tmp_path / "products.sqlite")
+    )
+    monkeypatch.setattr(autocomplete, "USER_CACHE_SIZE", 2)
+    builds = []
+    original = autocomplete.build_base
+    monkeypatch.setattr(
+        autocomplete, "build_base", lambda: builds.append(1) or original()
+    )
+    fetched = []
+    monkeypatch.setattr(
+        db, "get_user_food_names", lambda uid: fetched.append(uid) or ["pomme"]
+    )
+    autocomplete.invalidate()
+
+    for uid in ("u1", "u2", "u3"):
+        autocomplete.get_autocomplete(uid)
+    assert len(builds) == 1
+    assert list(autocomplete._HISTORIES) == ["u2", "u3"]
+
+    # Un aliment ajouté enrichit l'historique en mémoire sans relecture
+    autocomplete.record("u3", "pomme au four")
+    suggestions = autocomplete.get_autocomplete("u3").suggest("pomme au", limit=3)
+    assert suggestions[0]["name"] == "pomme au four"
+    assert suggestions[0]["count"] == autocomplete.HISTORY_WEIGHT
+    assert fetched == ["u1", "u2", "u3"]
+
+    # Fréquences cumulées : historique et lexique
+    top = autocomplete.get_autocomplete("u3").suggest("pomme", limit=1)[0]
+    assert top["name"] == "pomme"
+    assert top["count"] == autocomplete.HISTORY_WEIGHT + 1
+    autocomplete.invalidate()
+
+
+def test_base_suggests_only_foods(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        product_index, "DEFAULT_INDEX_PATH", str(tmp_path / "products.sqlite")
+    )
+    services.reload_mapping(
+        str(Path(__file__).resolve().parents[1] / "data" / "fr_en_mapping.csv")
+    )
+    autocomplete.invalidate()
+
+    base = autocomplete.get_base()
+    # Ni mots outils, ni types de repas, ni corrections manuelles
+    for prefix in ("d", "de"):
+        names = {s["name"] for s in base.suggest(prefix, limit=50)}
+        assert not names & {"de", "déjeuner", "dîner", "petit-déjeuner"}
+    assert base.suggest("de") == []
+    assert base.suggest("riz") == []
+    assert base.suggest("fraise")[0]["en"] == "strawberry"
+    autocomplete.invalidate()
@@ -0,0 +1,126 @@
+import sys
+import time
+import types
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from nutriflow import fuzzy, services
+
+
+def test_lookup_corrects_typos():
+    index = fuzzy.FuzzyIndex(["poulet", "yaourt", "myrtille", "confiture", "pomme"])
+    assert index.lookup("poullet") == ("poulet", 1)
+    assert index.lookup("yaourth") == ("yaourt", 1)
+    assert index.lookup("myrtile") == ("myrtille", 1)
+    assert index.lookup("confitrue") == ("confiture", 2)
+    # Mots courts et termes trop éloignés : pas de correction
+    assert index.lookup("pome") is None
+    assert index.lookup("saumon") is None
+
+
+def test_lookup_finds_two_substitutions():
+    index = fuzzy.FuzzyIndex(["abcdefgh", "mozzarella"])
+    assert index.lookup("axcdefgx") == ("abcdefgh", 2)
+    assert index.lookup("mozarela") == ("mozzarella", 2)
+    # Une seule faute tolérée sur un mot de moins de 8 lettres
+    assert index.lookup("mozarel") is None
+
+
+def test_lookup_refuses_ties():
+    index = fuzzy.FuzzyIndex(["carotte", "carotta"])
+    assert index.lookup("carotti") is None
+
+
+def test_added_terms_are_found_without_rebuild(monkeypatch):
+    index = fuzzy.FuzzyIndex(["poulet", "yaourt"])
+    assert index.add(["myrtille", "poulet", ""]) == ["myrtille"]
+    assert index.added == 1
+    assert "myrtille" in index
+    assert index.lookup("myrtile") == ("myrtille", 1)
+    assert index.lookup("poullet") == ("poulet", 1)
+
+    # Au-delà du seuil, l'index est refondu en arrière-plan
+    monkeypatch.setattr(fuzzy, "COMPACT_MIN_TERMS", 2)
+    monkeypatch.setitem(fuzzy._INDEXES, "test", ("v1", index))
+    assert fuzzy.add_terms("test", "v0", ["confiture"]) == []
+    assert fuzzy.add_terms("test", "v1", ["confiture"]) == ["confiture"]
+    for _ in range(100):
+        if fuzzy._INDEXES["test"][1] is not index:
+            break
+        time.sleep(0.01)
+    rebuilt = fuzzy._INDEXES["test"][1]
+    assert rebuilt is not index and rebuilt.added == 0
+    assert rebuilt.lookup("confitrue") == ("confiture", 2)
+
+
+def test_correct_spelling_before_translation():
+    services.reload_mapping(
+        str(Path(__file__).resolve().parents[1] / "data" / "fr_en_mapping.csv")
+    )
+    assert services.correct_spelling("2 tranches de poullet et un yaourth") == (
+        "2 tranches de poulet et un yaourt"
+    )
+
+
+def test_valid_french_words_are_not_corrected(monkeypatch):
+    class EchoTranslator:
+        def translate(self, text, src="fr", dest="en"):
+            return types.SimpleNamespace(text=text)
+
+    import googletrans
+
+    monkeypatch.setattr(googletrans, "Translator", lambda: EchoTranslator())
+    services.reload_mapping(
+        str(Path(__file__).resolve().parents[1] / "data" / "fr_en_mapping.csv")
+    )
+    # Le texte envoyé au traducteur garde les mots français valides
+    assert services.translate_fr_en("sel et poivre") == "sel et poivre"
+    assert services.translate_fr_en("mousse au chocolat") == "mousse au chocolat"
+    assert services.translate_fr_en("ananas frais") == "pineapple frais"
+
+
+def test_english_catalog_names_never_rewrite_french_input(monkeypatch, tmp_path):
+    from nutriflow.db import food_catalog
+
+    monkeypatch.setattr(
+        food_catalog, "DEFAULT_CATALOG_PATH", str(tmp_path / "catalog.sqlite")
+    )
+    # Sans vocabulaire français : seuls les index décident
+    monkeypatch.setattr(services, "_VOCABULARY", frozenset())
+    food_catalog.learn(
+        {
+            "food_name": "cheddar cheese",
+            "serving_qty": 1,
+            "serving_unit": "slice",
+            "serving_weight_grams": 28,
+            "nf_calories": 113,
+            "nf_protein": 7,
+            "nf_total_carbohydrate": 0.4,
+            "nf_total_fat": 9,
+        },
+        aliases=["gruyere rape"],
+    )
+    try:
+        assert services.correct_spelling("chedar") == "chedar"
+        assert services.correct_spelling("gruyre") == "gruyere"
+
+        # Un aliment appris complète l'index existant sans le reconstruire
+        index = fuzzy._INDEXES["catalog"][1]
+        food_catalog.learn(
+            {
+                "food_name": "rhubarb",
+                "serving_qty": 1,
+                "serving_unit": "cup",
+                "serving_weight_grams": 122,
+                "nf_calories": 26,
+                "nf_protein": 1.1,
+                "nf_total_carbohydrate": 5.5,
+                "nf_total_fat": 0.2,
+            },
+            aliases=["rhubarbe"],
+        )
+        assert services.correct_spelling("rhubarbre") == "rhubarbe"
+        assert fuzzy._INDEXES["catalog"][1] is index
+    finally:
+        food_catalog.close()
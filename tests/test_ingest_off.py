@@ -0,0 +1,76 @@
+import gzip
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from nutriflow import ingest_off
+from nutriflow.db import product_index
+
+
+def _write_jsonl(path, products):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for p in products:
+            f.write(json.dumps(p) + "\n")
+
+
+def test_ingest_jsonl_and_delta(tmp_path):
+    index = str(tmp_path / "products.sqlite")
+    dump = str(tmp_path / "dump.jsonl.gz")
+    _write_jsonl(
+        dump,
+        [
+            {
+                "code": "12345678",
+                "product_name": "Yaourt nature",
+                "last_modified_t": 100,
+                "nutriments": {"energy-kcal_100g": 60},
+                "images": {"huge": "ignored"},
+            },
+            {"product_name": "Sans code"},
+        ],
+    )
+    stats = ingest_off.ingest_dump(dump, index)
+    assert stats == {"read": 2, "skipped": 1, "written": 1}
+
+    prod = product_index.get_product("12345678", index)
+    assert prod["name"] == "Yaourt nature"
+    assert prod["energy_kcal_per_100g"] == 60
+    assert "images" not in prod
+
+    delta = str(tmp_path / "delta.jsonl.gz")
+    _write_jsonl(
+        delta,
+        [
+            {"code": "12345678", "product_name": "Ancien", "last_modified_t": 90},
+            {"code": "87654321", "product_name": "Skyr", "last_modified_t": 120},
+        ],
+    )
+    stats = ingest_off.ingest_dump(delta, index, delta=True)
+    assert stats["written"] == 1
+    assert product_index.get_product("12345678", index)["name"] == "Yaourt nature"
+    assert product_index.get_product("87654321", index)["name"] == "Skyr"
+    product_index.close(index)
+
+
+def test_ingest_csv(tmp_path):
+    index = str(tmp_path / "products.sqlite")
+    dump = tmp_path / "dump.csv"
+    dump.write_text(
+        "code\tproduct_name\tlabels_tags\tproteins_100g\tlast_modified_t\n"
+        "3017620422003\tPâte à tartiner\ten:vegetarian,en:gluten-free\t6.3\t1700000000\n",
+        encoding="utf-8",
+    )
+    ingest_off.ingest_dump(str(dump), index)
+    prod = product_index.get_product("3017620422003", index)
+    assert prod["name"] == "Pâte à tartiner"
+    assert prod["proteins_per_100g"] == 6.3
+    assert prod["labels_tags"] == "en:vegetarian, en:gluten-free"
+    product_index.close(index)
+
+
+def test_missing_index_returns_none(tmp_path):
+    assert product_index.get_product("1", str(tmp_path / "absent.sqlite")) is None
+    assert not (tmp_path / "absent.sqlite").exists()
+
@@ -0,0 +1,118 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from nutriflow import lexicon
+
+
+def test_read_mapping_validates_and_dedupes(tmp_path, capsys):
+    path = tmp_path / "map.csv"
+    path.write_text("fr;en\nConfiture;jam\n;orphan\nconfiture;marmalade\nmûre;blackberry\n")
+    mapping = lexicon.read_mapping_csv(str(path))
+    assert mapping == {"confiture": "marmalade", "mure": "blackberry"}
+    assert "1 ligne(s) invalide(s), 1 doublon(s)" in capsys.readouterr().out
+
+
+def test_matcher_replaces_whole_words_longest_first():
+    matcher = lexicon.PhraseMatcher(
+        {"cas": "tablespoon", "confiture": "jam", "confiture d'abricot": "apricot jam"}
+    )
+    assert (
+        matcher.translate("2 cas de confiture d'abricot et du cassis")
+        == "2 tablespoon de apricot jam et du cassis"
+    )
+
+
+def test_artifact_reused_until_csv_changes(tmp_path, monkeypatch):
+    path = tmp_path / "map.csv"
+    path.write_text("fr,en\ntranche,slice\n")
+    first = lexicon.load(str(path))
+    assert first.units == {"tranche": "slice"}
+    assert os.path.exists(lexicon.artifact_path(str(path)))
+
+    monkeypatch.setattr(
+        lexicon, "read_mapping_csv", lambda p: (_ for _ in ()).throw(AssertionError)
+    )
+    assert lexicon.load(str(path)).mapping == first.mapping
+    monkeypatch.undo()
+
+    path.write_text("fr,en\ntranche,slice\npain,bread\n")
+    os.utime(path, (1, 1))
+    assert lexicon.load(str(path)).foods == {"pain": "bread"}
+
+
+def test_artifact_is_plain_json_and_readable(tmp_path):
+    import json
+    import stat
+
+    path = tmp_path / "map.csv"
+    path.write_text("fr,en\ntranche,slice\n")
+    target = lexicon.artifact_path(str(path))
+    # Artefact illisible (ancien format binaire) : reconstruit depuis le CSV
+    Path(target).write_bytes(b"\x80\x05garbage")
+    assert lexicon.load(str(path)).units == {"tranche": "slice"}
+
+    with open(target, encoding="utf-8") as f:
+        assert json.load(f)["mapping"] == {"tranche": "slice"}
+    assert stat.S_IMODE(os.stat(target).st_mode) == 0o644
+    again = lexicon.load(str(path))
+    assert again.translate("1 tranche") == "1 slice"
+    assert again.source == str(path)
+
+
+def test_watcher_swaps_lexicon_when_csv_changes(tmp_path):
+    path = tmp_path / "map.csv"
+    path.write_text("fr,en\ntranche,slice\n")
+    state = {"lexicon": lexicon.load(str(path))}
+    old = state["lexicon"]
+
+    def reload():
+        state["lexicon"] = lexicon.load(str(path))
+
+    watcher = lexicon.LexiconWatcher(lambda: state["lexicon"], reload, interval=0)
+    assert watcher.check() is False
+
+    path.write_text("fr,en\ntranche,slice\npain,bread\n")
+    os.utime(path, (old.source_mtime + 10, old.source_mtime + 10))
+    assert watcher.check() is True
+    new = state["lexicon"]
+    assert new is not old and new.version != old.version
+    assert old.translate("pain") == "pain"
+    assert new.translate("pain") == "bread"
+
+
+def _write_pack(root, locale, rows, sports=""):
+    folder = root / locale
+    folder.mkdir()
+    (folder / "mapping.csv").write_text(f"{locale};en\n{rows}")
+    if sports:
+        (folder / "sports.csv").write_text(f"{locale};en\n{sports}")
+
+
+def test_pack_registry_loads_on_demand_and_evicts(tmp_path):
+    _write_pack(tmp_path, "es", "pollo;chicken\ncucharada;tablespoon\n", "correr;running\n")
+    _write_pack(tmp_path, "it", "pollo;chicken\n")
+    _write_pack(tmp_path, "de", "huhn;chicken\n")
+    registry = lexicon.PackRegistry(str(tmp_path), max_loaded=2, idle_ttl=60)
+
+    assert registry.available() == ["de", "es", "it"]
+    assert registry.loaded() == []
+
+    es = registry.get("es")
+    assert es.lexicon.translate("2 cucharada de pollo") == "2 tablespoon de chicken"
+    assert es.lexicon.units == {"cucharada": "tablespoon"}
+    assert es.sports_matcher.translate("correr 30 min") == "running 30 min"
+    assert registry.get("es") is es
+
+    registry.get("it")
+    registry.get("de")
+    assert sorted(registry.loaded()) == ["de", "it"]
+
+    try:
+        registry.get("xx")
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("KeyError attendu")
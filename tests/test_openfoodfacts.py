@@ -0,0 +1,70 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from nutriflow import services
+
+
+class DummyResponse:
+    def __init__(self, payload):
+        self.raw = io.BytesIO(json.dumps(payload).encode("utf-8"))
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+def test_barcode_requests_only_needed_fields(monkeypatch):
+    calls = {}
+
+    def fake_get(url, params=None, **kwargs):
+        calls["url"] = url
+        calls["params"] = params
+        calls["kwargs"] = kwargs
+        return DummyResponse(
+            {
+                "status": 1,
+                "product": {
+                    "code": "12345678",
+                    "product_name": "Yaourt",
+                    "nutriments": {"energy-kcal_100g": 60, "proteins_100g": 4},
+                    "labels_tags": ["en:organic"],
+                },
+            }
+        )
+
+    monkeypatch.setattr(services.requests, "get", fake_get)
+    prod = services.get_off_nutrition_by_barcode("12345678")
+
+    fields = calls["params"]["fields"].split(",")
+    assert set(fields) == set(services.OFF_PRODUCT_FIELDS)
+    assert calls["kwargs"]["stream"] is True
+    assert prod["name"] == "Yaourt"
+    assert prod["energy_kcal_per_100g"] == 60
+    assert prod["labels_tags"] == "en:organic"
+
+
+def test_search_limits_page_size(monkeypatch):
+    calls = {}
+
+    def fake_get(url, params=None, **kwargs):
+        calls["params"] = params
+        return DummyResponse(
+            {"products": [{"code": "1", "product_name": "Skyr", "nutriments": {}}]}
+        )
+
+    monkeypatch.setattr(services.requests, "get", fake_get)
+    prod = services.get_off_search_nutrition("skyr")
+
+    assert calls["params"]["page_size"] == services.OFF_SEARCH_PAGE_SIZE
+    assert calls["params"]["fields"] == ",".join(services.OFF_SEARCH_FIELDS)
+    assert prod["barcode"] == "1"
+    assert prod["name"] == "Skyr"
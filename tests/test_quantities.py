@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from nutriflow import services
+from nutriflow.quantities import parse_ingredients, to_grams
+
+
+def setup_module(module):
+    services.reload_mapping(
+        str(Path(__file__).resolve().parents[1] / "data" / "fr_en_mapping.csv")
+    )
+
+
+def test_parse_ingredients_triples():
+    items = parse_ingredients("2 tranches de pain, 1,5 kg de riz et une pomme")
+    assert [(i.quantity, i.unit, i.food) for i in items] == [
+        (2, "slice", "pain"),
+        (1.5, "kg", "riz"),
+        (1, None, "pomme"),
+    ]
+    assert [i.grams for i in items] == [60, 1500, 150]
+    assert items[0].to_query() == "2 slice pain"
+
+
+def test_volume_uses_density():
+    (item,) = parse_ingredients("½ cuillère à soupe de miel")
+    assert item.unit == "tablespoon"
+    assert round(item.grams, 2) == round(0.5 * 15 * 1.42, 2)
+    assert to_grams(1, "cup", "water") == 240
+    assert to_grams(1, "packet", "biscuits") is None
+
+
+def test_normalize_units_whole_words_only():
+    text = services.normalize_units_text("2 cas de cassis, 3 tranches de pain, 100g de riz")
+    assert text == "2 tablespoon de cassis, 3 slices de pain, 100g de riz"
@@ -44,3 +44,82 @@ def test_translate_activity_course_a_pied(monkeypatch):
 
     assert dummy.called_with == "30 minutes running"
     assert result == "30 minutes running"
+
+
+def test_translate_fr_en_memoized(monkeypatch):
+    calls = []
+
+    class DummyTranslator:
+        def translate(self, text, src="fr", dest="en"):
+            calls.append(text)
+            if text == "panne":
+                raise RuntimeError("service indisponible")
+            return types.SimpleNamespace(text=text.upper())
+
+    import googletrans
+
+    monkeypatch.setattr(googletrans, "Translator", lambda: DummyTranslator())
+
+    assert services.translate_fr_en("Poulet rôti") == "CHICKEN BREAST ROTI"
+    assert services.translate_fr_en("poulet roti") == "CHICKEN BREAST ROTI"
+    assert len(calls) == 1
+    assert services.translation_cache_stats()["hits"] >= 1
+
+    # Les échecs ne sont pas mémorisés
+    assert services.translate_fr_en("panne") == "panne"
+    assert services.translate_fr_en("panne") == "panne"
+    assert len(calls) == 3
+
+    # Cache vidé (comme lors du rechargement du lexique)
+    services.clear_translation_cache()
+    services.translate_fr_en("poulet roti")
+    assert len(calls) == 4
+
+
+def test_translate_many_single_batched_call(monkeypatch):
+    calls = []
+
+    class DummyTranslator:
+        def translate(self, text, src="fr", dest="en"):
+            calls.append(text)
+            return types.SimpleNamespace(text=text.upper())
+
+    import googletrans
+
+    monkeypatch.setattr(googletrans, "Translator", lambda: DummyTranslator())
+
+    services.translate_fr_en("riz cuit")
+    calls.clear()
+    result = services.translate_many(["Pain grillé", "riz cuit", "pain grillé", "thon"])
+    assert result == ["BREAD GRILLE", "RICE CUIT", "BREAD GRILLE", "TUNA"]
+    assert calls == ["bread grille\ntuna"]
+
+
+def test_translate_many_falls_back_when_misaligned(monkeypatch):
+    class DummyTranslator:
+        def translate(self, text, src="fr", dest="en"):
+            # Le service fusionne les lignes : le découpage échoue
+            return types.SimpleNamespace(text=text.replace("\n", " ").upper())
+
+    import googletrans
+
+    monkeypatch.setattr(googletrans, "Translator", lambda: DummyTranslator())
+    assert services.translate_many(["pomme verte", "thon"]) == ["APPLE VERTE", "TUNA"]
+
+
+def test_translate_to_en_with_locale_pack(monkeypatch):
+    calls = []
+
+    class DummyTranslator:
+        def translate(self, text, src="fr", dest="en"):
+            calls.append((text, src))
+            return types.SimpleNamespace(text=text)
+
+    import googletrans
+
+    monkeypatch.setattr(googletrans, "Translator", lambda: DummyTranslator())
+
+    assert services.translate_to_en("2 cucharadas de miel", "es") == "2 tablespoon of honey"
+    assert services.translate_activity_fr_en("Corsa 30 minuti", "it") == "running 30 minuti"
+    assert calls[0] == ("2 tablespoon of honey", "es")
+    assert "es" in services.lexicon_packs_info()["loaded"]